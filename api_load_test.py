@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+GET A BIKE - API LOAD TEST
+Drives generate-luxury-images.py against the mock Together API and reports how it holds up
+
+    python api_load_test.py --mode all --workers 8 --rate 20
+    python api_load_test.py --mode batch --images 300 --async --workers 32 --rate 50 \\
+        --latency lognormal:1.5,0.5 --throttle-rate 0.05 --error-rate 0.02 --max-concurrent 24
+    python api_load_test.py --mode image --images 20 --body-rate 256k --output load.json
+    python api_load_test.py --mode batch --images 200 --latency lognormal:1,0.8 --hedge 90
+
+The mock server runs in a child process (or pass --url to reuse one), so
+the memory figures are the generator's alone. Images are written to a
+temp directory; public/assets, the manifest and the image cache are not
+touched.
+
+Modes: `image` calls generate_image once per image, in sequence; `all`
+runs generate_all_images over the script's real prompt list; `batch`
+runs generate_batch over --images synthetic jobs. Latency percentiles are
+per successful request, from send to the image being on disk.
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import requests
+
+import mock_together_server
+from asset_benchmark import ROOT, load_script
+from asset_manifest import write_json_atomic
+
+PERCENTILES = (50, 95, 99)
+
+
+@contextlib.contextmanager
+def mock_server(args):
+    """Start mock_together_server.py in a child process; yields its generations URL"""
+    argv = [sys.executable, str(ROOT / "mock_together_server.py"), "--port", "0",
+            "--latency", args.latency, "--throttle-rate", str(args.throttle_rate),
+            "--error-rate", str(args.error_rate), "--max-concurrent", str(args.max_concurrent),
+            "--retry-after", str(args.retry_after), "--body-rate", args.body_rate,
+            "--image-format", args.image_format]
+    process = subprocess.Popen(argv, stdout=subprocess.PIPE, text=True)
+    try:
+        line = process.stdout.readline()
+        if not line:
+            raise SystemExit("[FAIL] mock server did not start")
+        yield line.split()[-1]
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def server_stats(url):
+    """Response counts by status from the mock's /stats endpoint"""
+    base = url.removesuffix(mock_together_server.GENERATIONS_PATH)
+    try:
+        return requests.get(f"{base}/stats", timeout=5).json()
+    except (requests.RequestException, ValueError):
+        return {}
+
+
+def synthetic_jobs(script, count):
+    """{category: jobs} cycling through the script's prompts, `count` jobs in all"""
+    prompts = [(category, image) for category in script.CATEGORIES
+               for image in script.category_images(category)]
+    jobs = {}
+    for i in range(count):
+        category, (prompt, _, width, height) = prompts[i % len(prompts)]
+        jobs.setdefault(category, []).append((prompt, f"load-{i:05d}.jpg", width, height))
+    return jobs
+
+
+def run_mode(script, args):
+    """Run the selected generator entry point; returns (succeeded, failed, stats)"""
+    if args.mode == "image":
+        client = script.together_client.TogetherClient(workers=1, rate=args.rate)
+        jobs = synthetic_jobs(script, args.images)
+        results = [script.generate_image(*image, client=client)
+                   for images in jobs.values() for image in images]
+        client.close()
+        return results.count(True), results.count(False), client.stats
+    if args.mode == "all":
+        return script.generate_all_images(args.workers, args.rate, args.use_async)
+    return script.generate_batch(synthetic_jobs(script, args.images), args.workers, args.rate,
+                                 args.use_async)
+
+
+def peak_rss_mib():
+    """Peak resident set size of this process (ru_maxrss is KiB on Linux, bytes on macOS)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+
+
+def load_test(args, url):
+    with tempfile.TemporaryDirectory(prefix="api-load-") as work_dir:
+        # The script creates public/assets and image_stream its temp dir
+        # relative to the working directory
+        previous_dir = os.getcwd()
+        os.chdir(work_dir)
+        try:
+            script = load_script("generate-luxury-images.py")
+            script.API_URL = url
+            script.TOGETHER_API_KEY = "mock-key"
+            script.FORCE = True
+            script.CACHE = None
+            if args.hedge is not None:
+                script.HEDGE = script.together_client.HedgePolicy(args.hedge, args.hedge_budget)
+
+            output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+            tracemalloc.start()
+            start = time.perf_counter()
+            with output:
+                succeeded, failed, stats = run_mode(script, args)
+            elapsed = time.perf_counter() - start
+            _, traced_peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        finally:
+            os.chdir(previous_dir)
+
+    return {
+        "mode": args.mode,
+        "async": args.use_async,
+        "workers": args.workers,
+        "rate": args.rate,
+        "succeeded": succeeded,
+        "failed": failed,
+        "seconds": elapsed,
+        "images_per_second": succeeded / elapsed if elapsed else 0.0,
+        "latency": {f"p{pct}": stats.percentile(pct) for pct in PERCENTILES},
+        "requests": stats.requests,
+        "retries": stats.retries,
+        "request_failures": stats.failures,
+        "hedges": stats.hedges,
+        "hedge_wins": stats.hedge_wins,
+        "hedge_saved_seconds": stats.hedge_saved,
+        "server_statuses": server_stats(url),
+        "peak_rss_mib": peak_rss_mib(),
+        "traced_peak_mib": traced_peak / 2**20,
+    }
+
+
+def print_report(report):
+    print(f"{report['mode']} ({'async' if report['async'] else 'threads'}, "
+          f"{report['workers']} workers, {report['rate']:g}/s)")
+    print(f"  images:      {report['succeeded']} ok, {report['failed']} failed "
+          f"in {report['seconds']:.2f}s ({report['images_per_second']:.2f} images/s)")
+    latency = "  ".join(f"{name} {value * 1000:.0f}ms" if value is not None else f"{name} -"
+                        for name, value in report["latency"].items())
+    print(f"  latency:     {latency}")
+    print(f"  requests:    {report['requests']} sent, {report['retries']} retried, "
+          f"{report['request_failures']} gave up")
+    if report["hedges"]:
+        print(f"  hedging:     {report['hedges']} duplicates, {report['hedge_wins']} finished first, "
+              f"~{report['hedge_saved_seconds']:.1f}s saved")
+    statuses = ", ".join(f"{status}: {n}" for status, n in sorted(report["server_statuses"].items()))
+    print(f"  server:      {statuses or 'no stats'}")
+    print(f"  memory:      {report['peak_rss_mib']:.1f} MiB peak RSS, "
+          f"{report['traced_peak_mib']:.1f} MiB peak Python allocations")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the image generator against a mock Together API")
+    parser.add_argument("--mode", choices=("image", "all", "batch"), default="all",
+                        help="generate_image in sequence, generate_all_images, or generate_batch (default all)")
+    parser.add_argument("--images", type=int, default=50, help="images for the image and batch modes (default 50)")
+    parser.add_argument("--workers", "-j", type=int, default=4, help="concurrent requests (default 4)")
+    parser.add_argument("--rate", type=float, default=20.0, help="request starts per second (default 20)")
+    parser.add_argument("--async", dest="use_async", action="store_true", help="use the asyncio job stream")
+    parser.add_argument("--hedge", type=float, metavar="PCT",
+                        help="hedge requests running past this latency percentile")
+    parser.add_argument("--hedge-budget", type=float, default=0.1,
+                        help="duplicates allowed per request (default 0.1)")
+    parser.add_argument("--url", help="use an already running mock server at this generations URL")
+    parser.add_argument("--output", "-o", help="write the report as JSON here")
+    parser.add_argument("--verbose", "-v", action="store_true", help="show the generator's own output")
+    mock_together_server.add_arguments(parser)
+    args = parser.parse_args(argv)
+    if args.workers < 1 or args.rate <= 0:
+        parser.error("--workers must be at least 1 and --rate must be positive")
+    try:
+        mock_together_server.config_from_args(args)
+    except ValueError as e:
+        parser.error(str(e))
+
+    with contextlib.ExitStack() as stack:
+        url = args.url or stack.enter_context(mock_server(args))
+        report = load_test(args, url)
+
+    print_report(report)
+    if args.output:
+        write_json_atomic(args.output, report)
+        print(f"\nWrote report to {args.output}")
+    return 1 if report["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
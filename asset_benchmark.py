@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+GET A BIKE - ASSET BENCHMARKS
+Times the image generators' building blocks and full assets across canvas sizes
+
+    python asset_benchmark.py run --output bench.json
+    python asset_benchmark.py compare baseline.json bench.json --threshold 0.10
+
+`run` writes every timing plus the machine it ran on as JSON. `compare`
+exits non-zero when any benchmark's median got slower than the threshold,
+so a CI step can catch a regression before the site rebuild times out.
+
+Caches (vignette masks, grain tiles, bike sprites) stay warm between
+repeats, so numbers are steady-state costs, like every asset after the
+first one in a real build.
+"""
+
+import argparse
+import contextlib
+import datetime
+import importlib.util
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import PIL
+from PIL import ImageDraw
+
+from asset_manifest import write_json_atomic
+
+ROOT = Path(__file__).resolve().parent
+RESULTS_VERSION = 1
+
+# Canvas widths for the size sweep; heights follow each asset's aspect ratio
+SIZES = (256, 512, 1024, 1920, 3840)
+
+# Timings below this many seconds are dominated by noise and never fail compare
+NOISE_FLOOR = 0.002
+
+
+def load_script(filename):
+    """Import one of the hyphenated generator scripts as a module"""
+    name = filename.replace('-', '_').removesuffix('.py')
+    spec = importlib.util.spec_from_file_location(name, ROOT / filename)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def time_call(func, repeat=5, max_time=2.0):
+    """Run func once to warm up, then up to `repeat` timed runs.
+
+    Stops early once `max_time` seconds have been spent, but always keeps
+    at least three runs. Returns the list of run times in seconds.
+    """
+    func()
+    times = []
+    budget_start = time.perf_counter()
+    while len(times) < repeat:
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+        if len(times) >= 3 and time.perf_counter() - budget_start > max_time:
+            break
+    return times
+
+
+@contextlib.contextmanager
+def canvas_sizes(module, width):
+    """Temporarily scale every *_SIZE canvas constant of module to `width`"""
+    names = ('HERO_SIZE', 'BIKE_SIZE', 'AVATAR_SIZE', 'INSTAGRAM_SIZE', 'OG_SIZE')
+    saved = {name: getattr(module, name) for name in names}
+    try:
+        for name, (w, h) in saved.items():
+            setattr(module, name, (width, max(1, round(h * width / w))))
+        yield
+    finally:
+        for name, size in saved.items():
+            setattr(module, name, size)
+
+
+def function_benchmarks(premium, basic, sizes):
+    """(name, callable) pairs for the shared drawing helpers at each size"""
+    colors = premium.COLORS
+    for width in sizes:
+        height = width * 9 // 16
+        canvas = premium.create_gradient(width, height, colors['bg_black'], colors['bg_dark'])
+        scale = width / premium.BIKE_SIZE[0]
+        yield (f"premium.create_gradient[{width}]",
+               lambda w=width, h=height: premium.create_gradient(w, h, colors['bg_black'], colors['bg_dark']))
+        yield (f"premium.create_gradient.radial[{width}]",
+               lambda w=width, h=height: premium.create_gradient(w, h, colors['bg_black'], colors['bg_dark'], 'radial'))
+        yield (f"premium.add_vignette[{width}]", lambda img=canvas: premium.add_vignette(img, 0.5))
+        yield (f"premium.add_noise[{width}]", lambda img=canvas: premium.add_noise(img, 0.01, seed=1))
+        yield (f"premium.draw_luxury_bike_frame[{width}]",
+               lambda img=canvas, s=scale: premium.draw_luxury_bike_frame(
+                   ImageDraw.Draw(img.copy()), img.width // 2, img.height // 2, s))
+        yield (f"basic.create_gradient_bg[{width}]",
+               lambda w=width, h=height: basic.create_gradient_bg(w, h, '#0a0a0f', '#1a1a2e'))
+        yield (f"basic.draw_bike_frame[{width}]",
+               lambda img=canvas, s=width / 640: basic.draw_bike_frame(
+                   ImageDraw.Draw(img.copy()), img.width // 2, img.height // 2, s))
+
+
+def asset_benchmarks(premium, basic, sizes, output_dir):
+    """(name, callable) pairs rendering and saving complete assets"""
+    premium.OUTPUT_DIR = Path(output_dir)
+    basic.OUTPUT_DIR = str(output_dir)
+    generators = [
+        ('hero', premium.generate_hero_image, ()),
+        ('bike', premium.generate_bike_product, (1,) + premium.BIKES[0]),
+        ('avatar', premium.generate_avatar, (1, premium.AVATARS[0])),
+        ('og', premium.generate_og_image, ()),
+    ] + [(f"instagram.{style}", premium.generate_instagram, (i, style))
+         for i, style in enumerate(('detail', 'lifestyle', 'bike'), 1)]
+
+    for width in sizes:
+        for label, func, args in generators:
+            def render(func=func, args=args, width=width):
+                with canvas_sizes(premium, width):
+                    func(*args)
+            yield f"premium.generate_{label}[{width}]", render
+        yield (f"premium.render_hero_tiled[{width}]",
+               lambda w=width: premium.render_hero_tiled(w, w * 9 // 16, 'bench-poster.png'))
+
+    # The basic generators have fixed canvas sizes
+    colors = basic.COLORS
+    path = lambda name: os.path.join(output_dir, name)
+    yield ("basic.generate_bike_image",
+           lambda: basic.generate_bike_image(path('bike.jpg'), "Bench Bike", "Road", "Road | 56cm",
+                                             "$1,000", colors['accent_red'], ('#0a0a0f', '#1a1a2e')))
+    yield "basic.generate_avatar", lambda: basic.generate_avatar(path('avatar.jpg'), "A. B.", "Rider",
+                                                                 colors['accent_blue'])
+    yield "basic.generate_instagram_tile", lambda: basic.generate_instagram_tile(
+        path('insta-trail.jpg'), "trail", ('#1a1a2e', '#0a0a0f'))
+    yield "basic.generate_hero_poster", lambda: basic.generate_hero_poster(path('hero-poster.jpg'))
+    yield "basic.generate_video_thumbnail", lambda: basic.generate_video_thumbnail(path('video.jpg'))
+
+
+def machine_info():
+    """Where and with what a result file was produced"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'hostname': platform.node(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+        'python': platform.python_version(),
+        'pillow': PIL.__version__,
+        'numpy': np.__version__,
+        'commit': commit,
+    }
+
+
+def run_benchmarks(args):
+    sizes = tuple(int(s) for s in args.sizes.split(',')) if args.sizes else SIZES
+    premium = load_script('generate-luxury-images-premium.py')
+    basic = load_script('generate-images.py')
+    results = {}
+    with tempfile.TemporaryDirectory(prefix='asset-bench-') as output_dir:
+        suites = [function_benchmarks(premium, basic, sizes)]
+        if not args.functions_only:
+            suites.append(asset_benchmarks(premium, basic, sizes, output_dir))
+        for suite in suites:
+            for name, func in suite:
+                if args.filter and args.filter not in name:
+                    continue
+                # Generators print progress; keep the report readable
+                with contextlib.redirect_stdout(io.StringIO()):
+                    times = time_call(func, args.repeat, args.max_time)
+                results[name] = {
+                    'median': statistics.median(times),
+                    'min': min(times),
+                    'runs': len(times),
+                }
+                print(f"{name:<48}{results[name]['median'] * 1000:>10.2f} ms  "
+                      f"(min {results[name]['min'] * 1000:.2f}, n={len(times)})")
+
+    data = {
+        'version': RESULTS_VERSION,
+        'created': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'machine': machine_info(),
+        'results': results,
+    }
+    if args.output:
+        write_json_atomic(args.output, data)
+        print(f"\nWrote {len(results)} results to {args.output}")
+    return 0
+
+
+def load_results(path):
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    if data.get('version') != RESULTS_VERSION:
+        raise SystemExit(f"{path}: unsupported results version {data.get('version')!r}")
+    return data
+
+
+def compare_results(args):
+    base, new = load_results(args.baseline), load_results(args.current)
+    if base['machine'].get('hostname') != new['machine'].get('hostname'):
+        print(f"[WARN] results come from different machines "
+              f"({base['machine'].get('hostname')} vs {new['machine'].get('hostname')})")
+    regressions = []
+    print(f"{'benchmark':<48}{'baseline':>12}{'current':>12}{'change':>9}")
+    for name in sorted(set(base['results']) & set(new['results'])):
+        before, after = base['results'][name]['median'], new['results'][name]['median']
+        change = after / before - 1 if before else 0.0
+        flag = ""
+        if change > args.threshold and after > NOISE_FLOOR:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<48}{before * 1000:>10.2f}ms{after * 1000:>10.2f}ms{change:>+9.1%}{flag}")
+    for name in sorted(set(base['results']) - set(new['results'])):
+        print(f"[WARN] {name} missing from {args.current}")
+
+    if regressions:
+        print(f"\n[FAIL] {len(regressions)} benchmark(s) slower than +{args.threshold:.0%}: "
+              f"{', '.join(regressions)}")
+        return 1
+    print(f"\n[OK] no benchmark slower than +{args.threshold:.0%}")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the image generators")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help="time every benchmark and optionally save JSON")
+    run.add_argument('--output', '-o', help="write results JSON here")
+    run.add_argument('--sizes', help=f"comma-separated canvas widths (default {','.join(map(str, SIZES))})")
+    run.add_argument('--filter', '-k', help="only run benchmarks whose name contains this text")
+    run.add_argument('--repeat', type=int, default=5, help="timed runs per benchmark (default 5)")
+    run.add_argument('--max-time', type=float, default=2.0,
+                     help="stop repeating a benchmark after this many seconds (default 2)")
+    run.add_argument('--functions-only', action='store_true', help="skip the full-asset benchmarks")
+    run.set_defaults(handler=run_benchmarks)
+
+    compare = commands.add_parser('compare', help="fail if current results regressed against a baseline")
+    compare.add_argument('baseline')
+    compare.add_argument('current')
+    compare.add_argument('--threshold', type=float, default=0.10,
+                         help="allowed slowdown of the median as a fraction (default 0.10)")
+    compare.set_defaults(handler=compare_results)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
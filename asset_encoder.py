@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+GET A BIKE - ASSET ENCODER
+Quality-searched JPEG/WebP/AVIF encoding against a similarity target or byte budget
+
+Our backgrounds are mostly flat dark gradients, which compress far better
+than the blanket quality=95 suggests. For each image and format this module
+binary-searches the encoder quality for the smallest file that still scores
+`target_ssim` against the original pixels, optionally capped by `max_bytes`.
+
+Used by the PIL generators' save step, or standalone on existing files:
+    python asset_encoder.py public/assets/*.jpg --out-dir encoded --jobs 8
+
+Standalone runs never replace their inputs, since re-encoding an encoded
+file compounds the loss; an output that would land on its source needs
+--out-dir.
+"""
+
+import argparse
+import io
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+from PIL import Image, features
+
+# Pillow format name, file suffix, MIME type and extra options for searched encodes
+FORMATS = {
+    'jpeg': ('JPEG', '.jpg', 'image/jpeg', {'optimize': True, 'progressive': True}),
+    'webp': ('WEBP', '.webp', 'image/webp', {'method': 6}),
+    'avif': ('AVIF', '.avif', 'image/avif', {'speed': 6}),
+}
+
+DEFAULT_FORMATS = ('jpeg', 'webp', 'avif')
+DEFAULT_TARGET_SSIM = 0.985
+QUALITY_RANGE = (40, 95)
+# The quality every asset used to be saved at; the "before" in size reports
+BASELINE_QUALITY = 95
+
+
+def available_formats(formats=DEFAULT_FORMATS):
+    """Drop formats this Pillow build cannot write (AVIF needs libavif)"""
+    return tuple(f for f in formats if f == 'jpeg' or features.check(f))
+
+
+def encode_bytes(img, fmt, quality, searched=True):
+    """Encode img in memory; `searched` adds the format's size-only options"""
+    pil_format, _, _, extra = FORMATS[fmt]
+    buf = io.BytesIO()
+    img.save(buf, pil_format, quality=quality, **(extra if searched else {}))
+    return buf.getvalue()
+
+
+def ssim(a, b, block=8):
+    """Mean structural similarity of two images' luma over block x block tiles"""
+    x = np.asarray(a.convert('L'), dtype=np.float64)
+    y = np.asarray(b.convert('L'), dtype=np.float64)
+    h, w = (x.shape[0] // block) * block, (x.shape[1] // block) * block
+    if h == 0 or w == 0:
+        return 1.0
+    x = x[:h, :w].reshape(h // block, block, w // block, block)
+    y = y[:h, :w].reshape(h // block, block, w // block, block)
+    mx, my = x.mean(axis=(1, 3)), y.mean(axis=(1, 3))
+    vx, vy = x.var(axis=(1, 3)), y.var(axis=(1, 3))
+    cov = ((x - mx[:, None, :, None]) * (y - my[:, None, :, None])).mean(axis=(1, 3))
+    c1, c2 = (0.01 * 255) ** 2, (0.03 * 255) ** 2
+    score = ((2 * mx * my + c1) * (2 * cov + c2)) / ((mx**2 + my**2 + c1) * (vx + vy + c2))
+    return float(score.mean())
+
+
+def search_quality(img, fmt, target_ssim=None, max_bytes=None, quality_range=QUALITY_RANGE):
+    """Pick an encoder quality for img; returns (quality, data, ssim).
+
+    Finds the lowest quality that reaches target_ssim and, if max_bytes is
+    set, the highest quality that fits the budget; the budget wins when the
+    two disagree. Each quality is encoded at most once.
+    """
+    img = img.convert('RGB')
+    encodes = {}
+
+    def encode(q):
+        if q not in encodes:
+            data = encode_bytes(img, fmt, q)
+            encodes[q] = (data, None)
+        return encodes[q][0]
+
+    def score(q):
+        data = encode(q)
+        if encodes[q][1] is None:
+            encodes[q] = (data, ssim(img, Image.open(io.BytesIO(data))))
+        return encodes[q][1]
+
+    qmin, qmax = quality_range
+    quality = qmax
+    if target_ssim is not None:
+        lo, hi = qmin, qmax
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if score(mid) >= target_ssim:
+                hi = mid
+            else:
+                lo = mid + 1
+        quality = lo
+    if max_bytes is not None and len(encode(quality)) > max_bytes:
+        lo, hi = qmin, quality
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if len(encode(mid)) <= max_bytes:
+                lo = mid
+            else:
+                hi = mid - 1
+        quality = lo
+    return quality, encode(quality), score(quality)
+
+
+def encode_asset(img, path, formats=('jpeg',), quality=BASELINE_QUALITY,
+                 target_ssim=None, max_bytes=None):
+    """Write img as path (JPEG) plus sibling files for the other formats.
+
+    Without a target or budget every format is written at the fixed
+    `quality` with plain settings, exactly like a bare img.save(). Returns
+    one result dict per format: format, path, quality, bytes, ssim.
+    """
+    path = Path(path)
+    searched = target_ssim is not None or max_bytes is not None
+    results = []
+    for fmt in formats:
+        out = path.with_suffix(FORMATS[fmt][1])
+        if searched:
+            q, data, score = search_quality(img, fmt, target_ssim, max_bytes)
+        else:
+            q, data, score = quality, encode_bytes(img.convert('RGB'), fmt, quality, searched=False), None
+        with open(out, 'wb') as f:
+            f.write(data)
+        results.append({'format': fmt, 'path': str(out), 'quality': q,
+                        'bytes': len(data), 'ssim': score})
+    return results
+
+
+def print_size_report(rows, formats):
+    """Print before/after bytes per asset; rows are (name, baseline_bytes, results)"""
+    if not rows:
+        return
+    header = f"{'asset':<28}{'before':>10}" + "".join(f"{fmt:>16}" for fmt in formats)
+    print(header)
+    print("-" * len(header))
+    totals = {fmt: 0 for fmt in formats}
+    total_before = 0
+    for name, before, results in sorted(rows):
+        by_format = {r['format']: r for r in results}
+        line = f"{name:<28}{before / 1024:>9.1f}K"
+        for fmt in formats:
+            r = by_format.get(fmt)
+            if r is None:
+                line += f"{'-':>16}"
+                continue
+            totals[fmt] += r['bytes']
+            cell = f"{r['bytes'] / 1024:.1f}K q{r['quality']}"
+            line += f"{cell:>16}"
+        total_before += before
+        print(line)
+    print("-" * len(header))
+    line = f"{'TOTAL':<28}{total_before / 1024:>9.1f}K"
+    for fmt in formats:
+        saved = 1 - totals[fmt] / total_before if total_before else 0
+        cell = f"{totals[fmt] / 1024:.1f}K -{saved:.0%}"
+        line += f"{cell:>16}"
+    print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-encode images with quality search")
+    parser.add_argument('inputs', nargs='+', help="images to encode")
+    parser.add_argument('--formats', default=','.join(DEFAULT_FORMATS),
+                        help="comma-separated output formats (default: jpeg,webp,avif)")
+    parser.add_argument('--target-ssim', type=float, default=DEFAULT_TARGET_SSIM,
+                        help=f"minimum similarity to the source (default {DEFAULT_TARGET_SSIM})")
+    parser.add_argument('--max-kb', type=float, help="per-file byte budget in KiB")
+    parser.add_argument('--out-dir', help="write here instead of next to each input")
+    parser.add_argument('--jobs', '-j', type=int, default=os.cpu_count() or 1,
+                        help="parallel encodes")
+    args = parser.parse_args(argv)
+
+    requested = tuple(f.strip() for f in args.formats.split(',') if f.strip())
+    unknown = [f for f in requested if f not in FORMATS]
+    if unknown:
+        parser.error(f"unknown format(s): {', '.join(unknown)}")
+    formats = available_formats(requested)
+    max_bytes = int(args.max_kb * 1024) if args.max_kb else None
+
+    def output_path(src):
+        return Path(args.out_dir) / src.name if args.out_dir else src
+
+    sources = {Path(src).resolve() for src in args.inputs}
+    for src in map(Path, args.inputs):
+        for fmt in formats:
+            out = output_path(src).with_suffix(FORMATS[fmt][1])
+            if out.resolve() in sources:
+                parser.error(f"{out} would overwrite an input image; pass an --out-dir outside the input folders")
+
+    def encode_one(src):
+        src = Path(src)
+        before = src.stat().st_size
+        with Image.open(src) as img:
+            img.load()
+        return src.name, before, encode_asset(img, output_path(src), formats,
+                                              target_ssim=args.target_ssim, max_bytes=max_bytes)
+
+    if args.out_dir:
+        Path(args.out_dir).mkdir(parents=True, exist_ok=True)
+    # Pillow releases the GIL while encoding, so threads scale across cores
+    with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+        rows = list(pool.map(encode_one, args.inputs))
+    print_size_report(rows, formats)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,179 @@
+"""
+GET A BIKE - ASSET BUILD MANIFEST
+Content-addressed record of generated images so rebuilds skip unchanged assets
+
+Each entry maps an output filename to the hash of everything that produced it
+(generator source, parameters, palette, seed, encoder settings) and the hash
+of the bytes that were written. An asset is rebuilt only when either changes.
+"""
+
+import functools
+import hashlib
+import inspect
+import json
+import os
+import sys
+import tempfile
+import threading
+import types
+from pathlib import Path
+
+MANIFEST_NAME = "build-manifest.json"
+MANIFEST_VERSION = 1
+# Functions and classes defined here are followed by function_fingerprint()
+REPO_ROOT = Path(__file__).resolve().parent
+
+# Module-level values folded into a function fingerprint when it references them
+_PLAIN_TYPES = (bool, int, float, str, bytes, tuple, list, dict, frozenset)
+
+_lock = threading.Lock()
+
+
+def _code_names(code):
+    """Global names used by a code object, including nested lambdas/comprehensions"""
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            names |= _code_names(const)
+    return names
+
+
+def _in_repo(path):
+    """True for source files of this repository (not the stdlib or site-packages)"""
+    return path is not None and Path(path).resolve().parent == REPO_ROOT
+
+
+@functools.lru_cache(maxsize=None)
+def _source(obj):
+    """Source of a function or class; every job shares the same helpers"""
+    try:
+        return inspect.getsource(obj)
+    except OSError:
+        # Generated classes such as namedtuples have no source of their own
+        return repr(getattr(obj, "_fields", obj.__qualname__))
+
+
+def function_fingerprint(func):
+    """Hash a function's source together with everything it pulls from this repo.
+
+    Helper functions and classes it uses are followed transitively, across
+    modules as long as they live in this repository, so a change to e.g.
+    draw_luxury_bike_frame, bike_sprite.stamp_sprite or
+    asset_encoder.encode_asset invalidates every generator that uses it.
+    Plain constants such as COLORS, HERO_SIZE or bike_sprite.SUPERSAMPLE are
+    hashed by value, whether used by name or as a module attribute.
+    """
+    digest = hashlib.sha256()
+    seen = set()
+    stack = [func]
+    while stack:
+        current = stack.pop()
+        ident = (current.__module__, current.__qualname__)
+        if ident in seen:
+            continue
+        seen.add(ident)
+        digest.update(_source(current).encode("utf-8"))
+        if inspect.isclass(current):
+            stack.extend(value for value in vars(current).values() if inspect.isfunction(value))
+            continue
+        names = sorted(_code_names(current.__code__))
+        for name in names:
+            value = current.__globals__.get(name)
+            if isinstance(value, types.ModuleType) and _in_repo(getattr(value, "__file__", None)):
+                # module.attr: the attribute name is among the code's names too
+                found = [(f"{name}.{attr}", getattr(value, attr)) for attr in names if hasattr(value, attr)]
+            else:
+                found = [(name, value)]
+            for label, value in found:
+                # lru_cache and other decorators keep the real function in __wrapped__
+                value = inspect.unwrap(value) if callable(value) else value
+                if inspect.isfunction(value) and _in_repo(value.__globals__.get("__file__")):
+                    stack.append(value)
+                elif inspect.isclass(value) and _in_repo(getattr(sys.modules.get(value.__module__), "__file__", None)):
+                    stack.append(value)
+                elif isinstance(value, _PLAIN_TYPES):
+                    digest.update(f"{label}={value!r}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def input_key(*parts):
+    """Stable hash of JSON-serializable build inputs"""
+    blob = json.dumps(parts, sort_keys=True, default=repr, ensure_ascii=False)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def file_digest(path):
+    """SHA-256 of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_manifest(output_dir):
+    """Read the manifest in output_dir, or return an empty one"""
+    path = Path(output_dir) / MANIFEST_NAME
+    try:
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {"version": MANIFEST_VERSION, "assets": {}}
+    if manifest.get("version") != MANIFEST_VERSION:
+        return {"version": MANIFEST_VERSION, "assets": {}}
+    return manifest
+
+
+def write_json_atomic(path, data):
+    """Write JSON via a temp file and rename, so readers never see a partial file"""
+    path = Path(path)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.stem}-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, sort_keys=True)
+            f.write("\n")
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def save_manifest(output_dir, manifest):
+    """Write the manifest atomically so an interrupted build never corrupts it"""
+    write_json_atomic(Path(output_dir) / MANIFEST_NAME, manifest)
+
+
+def is_fresh(manifest, output_dir, filename, key):
+    """True if filename was built from `key` and is still the file that was written"""
+    entry = manifest["assets"].get(filename)
+    if not entry or entry.get("key") != key:
+        return False
+    path = Path(output_dir) / filename
+    try:
+        if path.stat().st_size != entry.get("bytes"):
+            return False
+    except OSError:
+        return False
+    # Derived files (e.g. responsive variants) only need to still exist
+    if not all((Path(output_dir) / name).exists() for name in entry.get("variants", [])):
+        return False
+    return file_digest(path) == entry.get("sha256")
+
+
+def record_output(manifest, output_dir, filename, key, **extra):
+    """Record a freshly written output under its input key"""
+    path = Path(output_dir) / filename
+    manifest["assets"][filename] = {
+        "key": key,
+        "sha256": file_digest(path),
+        "bytes": path.stat().st_size,
+        **extra,
+    }
+
+
+def update_manifest(output_dir, filename, key, **extra):
+    """Record one output and save immediately; safe to call from several threads"""
+    with _lock:
+        manifest = load_manifest(output_dir)
+        record_output(manifest, output_dir, filename, key, **extra)
+        save_manifest(output_dir, manifest)
@@ -0,0 +1,254 @@
+"""
+GET A BIKE - RUN METRICS
+Per-asset and per-run build metrics, exported as JSON and Prometheus text
+
+The generators note what happened to every asset (its outcome, the seconds
+it took to render or request, the bytes it wrote and the time spent in the
+encoder) with `asset()`, and run-wide figures such as API requests and
+retries with `count()`, `gauge()` and `observe()`. Like asset_profile,
+recording costs one flag check until `enable()` is called (the scripts'
+--metrics flag).
+
+`write(prefix)` then saves PREFIX.json, with every asset and the run
+totals, and PREFIX.prom in the Prometheus text exposition format, ready
+for node_exporter's textfile collector or a Pushgateway. Per-asset figures
+become summaries (p50/p90/p99, sum, count) and counters by outcome.
+"""
+
+import math
+import os
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+
+from asset_manifest import write_json_atomic
+
+NAMESPACE = "getabike"
+QUANTILES = (0.5, 0.9, 0.99)
+
+# Prometheus type and help text of every metric; per-asset fields are
+# folded into the asset_* and bytes_written_total series on export
+METRICS = {
+    "assets_total": ("counter", "Assets handled this run, by outcome (built, up_to_date, cached, stale, failed)"),
+    "asset_seconds": ("summary", "Seconds to render or request one asset"),
+    "encode_seconds": ("summary", "Seconds one asset spent in the image encoder"),
+    "bytes_written_total": ("counter", "Bytes of image files written, variants included"),
+    "requests_total": ("counter", "API requests sent, retries included"),
+    "retries_total": ("counter", "API requests retried after a transient failure"),
+    "request_failures_total": ("counter", "API requests given up on"),
+    "throttled_total": ("counter", "API requests answered 429 or 503"),
+    "hedges_total": ("counter", "Duplicate API requests sent for slow requests"),
+    "hedge_wins_total": ("counter", "Duplicate API requests that finished first"),
+    "hedge_saved_seconds_total": ("counter", "Estimated seconds saved by duplicates that finished first"),
+    "request_attempt_seconds": ("summary", "Seconds of each successful API attempt, send to body consumed"),
+    "run_seconds": ("gauge", "Wall-clock seconds of the run"),
+    "run_timestamp_seconds": ("gauge", "Unix time the run's metrics were written"),
+}
+
+_enabled = False
+_labels = {}
+_lock = threading.Lock()
+_assets = {}
+_counters = Counter()
+_gauges = {}
+_observations = defaultdict(list)
+
+
+def enable(**labels):
+    """Start recording; `labels` (e.g. script=...) are attached to every series"""
+    global _enabled
+    _enabled = True
+    _labels.update(labels)
+
+
+def enabled():
+    return _enabled
+
+
+def _series(name, labels):
+    if name not in METRICS:
+        raise KeyError(f"unknown metric {name!r}")
+    return name, tuple(sorted(labels.items()))
+
+
+def asset(filename, **fields):
+    """Merge fields into an asset's record; later values win.
+
+    Known fields: outcome, seconds, bytes, encode_seconds. Others are kept
+    in the JSON export only.
+    """
+    if not _enabled:
+        return
+    with _lock:
+        _assets.setdefault(filename, {}).update(fields)
+
+
+def count(name, value=1, **labels):
+    if not _enabled:
+        return
+    with _lock:
+        _counters[_series(name, labels)] += value
+
+
+def gauge(name, value, **labels):
+    if not _enabled:
+        return
+    with _lock:
+        _gauges[_series(name, labels)] = value
+
+
+def observe(name, values, **labels):
+    """Add one value, or an iterable of them, to a summary"""
+    if not _enabled:
+        return
+    values = list(values) if isinstance(values, (list, tuple)) else [values]
+    with _lock:
+        _observations[_series(name, labels)].extend(values)
+
+
+def record_requests(stats):
+    """Add a together_client.RequestStats to the run's API counters"""
+    count("requests_total", stats.requests)
+    count("retries_total", stats.retries)
+    count("request_failures_total", stats.failures)
+    count("hedges_total", stats.hedges)
+    count("hedge_wins_total", stats.hedge_wins)
+    count("hedge_saved_seconds_total", stats.hedge_saved)
+    with stats.lock:
+        latencies = list(stats.latencies)
+    observe("request_attempt_seconds", latencies)
+
+
+def files_bytes(output_dir, names):
+    """Total size of the named files in output_dir; missing files count as 0"""
+    total = 0
+    for name in names:
+        try:
+            total += os.path.getsize(Path(output_dir) / name)
+        except OSError:
+            pass
+    return total
+
+
+def quantile(values, q):
+    """Nearest-rank quantile (0-1) of a list of numbers, or None if empty"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(1, math.ceil(q * len(ordered))) - 1]
+
+
+def _summary(values):
+    summary = {f"p{round(q * 100)}": quantile(values, q) for q in QUANTILES}
+    summary.update(sum=sum(values), count=len(values))
+    return summary
+
+
+def _collect():
+    """(counters, gauges, observations) with the per-asset records folded in"""
+    with _lock:
+        assets = {name: dict(fields) for name, fields in _assets.items()}
+        counters = Counter(_counters)
+        gauges = dict(_gauges)
+        observations = {key: list(values) for key, values in _observations.items()}
+    for fields in assets.values():
+        if "outcome" in fields:
+            counters[_series("assets_total", {"outcome": fields["outcome"]})] += 1
+        if fields.get("bytes"):
+            counters[_series("bytes_written_total", {})] += fields["bytes"]
+        for field, name in (("seconds", "asset_seconds"), ("encode_seconds", "encode_seconds")):
+            if fields.get(field) is not None:
+                observations.setdefault(_series(name, {}), []).append(fields[field])
+    return assets, counters, gauges, observations
+
+
+def snapshot():
+    """Everything recorded so far, as the JSON export's dict"""
+    assets, counters, gauges, observations = _collect()
+
+    def flat(series):
+        name, labels = series
+        return name + ("{" + ",".join(f"{k}={v}" for k, v in labels) + "}" if labels else "")
+
+    return {
+        "labels": dict(_labels),
+        "assets": assets,
+        "counters": {flat(series): value for series, value in sorted(counters.items())},
+        "gauges": {flat(series): value for series, value in sorted(gauges.items())},
+        "summaries": {flat(series): _summary(values) for series, values in sorted(observations.items())},
+    }
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value):
+    return str(value) if isinstance(value, int) else repr(float(value))
+
+
+def _label_text(labels, extra=()):
+    pairs = list(_labels.items()) + list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def prometheus_text():
+    """Everything recorded so far in the Prometheus text exposition format"""
+    _, counters, gauges, observations = _collect()
+    by_name = defaultdict(list)
+    for series, value in list(counters.items()) + list(gauges.items()):
+        by_name[series[0]].append((series[1], value))
+    for series, values in observations.items():
+        by_name[series[0]].append((series[1], values))
+
+    lines = []
+    for name in METRICS:
+        if name not in by_name:
+            continue
+        kind, help_text = METRICS[name]
+        full = f"{NAMESPACE}_{name}"
+        lines += [f"# HELP {full} {help_text}", f"# TYPE {full} {kind}"]
+        for labels, value in sorted(by_name[name], key=lambda item: item[0]):
+            if kind != "summary":
+                lines.append(f"{full}{_label_text(labels)} {_number(value)}")
+                continue
+            for q in QUANTILES:
+                if value:
+                    lines.append(f"{full}{_label_text(labels, [('quantile', q)])} {_number(quantile(value, q))}")
+            lines.append(f"{full}_sum{_label_text(labels)} {_number(sum(value))}")
+            lines.append(f"{full}_count{_label_text(labels)} {len(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def write_text_atomic(path, text):
+    """Write text via a temp file and rename, so scrapers never read a partial file"""
+    path = Path(path)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.stem}-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def write(prefix):
+    """Write PREFIX.json and PREFIX.prom; returns their paths"""
+    gauge("run_timestamp_seconds", round(time.time(), 3))
+    prefix = Path(prefix)
+    prefix.parent.mkdir(parents=True, exist_ok=True)
+    json_path, prom_path = prefix.with_name(prefix.name + ".json"), prefix.with_name(prefix.name + ".prom")
+    write_json_atomic(json_path, snapshot())
+    write_text_atomic(prom_path, prometheus_text())
+    return json_path, prom_path
+
+
+def report(prefix):
+    """Write the metrics files and say where they went"""
+    json_path, prom_path = write(prefix)
+    print(f"[METRICS] {len(_assets)} assets written to {json_path} and {prom_path}")
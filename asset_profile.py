@@ -0,0 +1,183 @@
+"""
+GET A BIKE - BUILD PROFILER
+Per-stage timing and memory probes with Chrome trace output
+
+Generators mark their stages with `stage()` or `@profiled()`; both cost a
+single flag check until `enable()` is called (the scripts' --profile flag).
+Each finished stage becomes a Chrome trace "complete" event carrying the
+asset it belongs to, its peak Python/numpy allocation (tracemalloc) and
+the process RSS. Load the written file in chrome://tracing or Perfetto, or
+read the per-asset summary printed at the end of the build.
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from contextlib import contextmanager
+
+_enabled = False
+_events = []
+_events_lock = threading.Lock()
+_local = threading.local()
+
+
+def enable(memory=True):
+    """Start recording stages in this process; `memory` turns on tracemalloc"""
+    global _enabled
+    _enabled = True
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def enabled():
+    return _enabled
+
+
+def _rss_bytes():
+    """Current resident set size, or 0 where /proc is unavailable"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def _stack():
+    if not hasattr(_local, 'stack'):
+        _local.stack = []
+    return _local.stack
+
+
+def _fold_peak(stack):
+    """Credit the tracemalloc peak since the last reset to every open stage"""
+    if not tracemalloc.is_tracing():
+        return
+    _, peak = tracemalloc.get_traced_memory()
+    for frame in stack:
+        frame['peak'] = max(frame['peak'], peak)
+    tracemalloc.reset_peak()
+
+
+@contextmanager
+def stage(name, cat='stage', asset=None, **args):
+    """Record the enclosed block as one trace event.
+
+    `asset` defaults to the innermost enclosing stage's asset, so only the
+    outermost stage of a build step needs to name it.
+    """
+    if not _enabled:
+        yield
+        return
+    stack = _stack()
+    if asset is None and stack:
+        asset = stack[-1]['asset']
+    _fold_peak(stack)
+    current = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0
+    frame = {'asset': asset, 'peak': current}
+    stack.append(frame)
+    start = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        end = time.perf_counter_ns()
+        _fold_peak(stack)
+        stack.pop()
+        event_args = dict(args, asset=asset, rss_mb=round(_rss_bytes() / 2**20, 1))
+        if tracemalloc.is_tracing():
+            event_args['py_peak_kb'] = (frame['peak'] - current) // 1024
+        event = {
+            'name': name,
+            'cat': cat,
+            'ph': 'X',
+            # perf_counter is CLOCK_MONOTONIC, shared by all worker processes
+            'ts': start // 1000,
+            'dur': max(1, (end - start) // 1000),
+            'pid': os.getpid(),
+            'tid': threading.get_ident(),
+            'args': event_args,
+        }
+        with _events_lock:
+            _events.append(event)
+
+
+def profiled(name=None, cat='stage'):
+    """Decorator form of stage(), named after the function by default"""
+    def decorate(func):
+        label = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with stage(label, cat):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def take_events():
+    """Return and clear the events recorded so far in this process"""
+    with _events_lock:
+        events = list(_events)
+        _events.clear()
+    return events
+
+
+def self_times(events):
+    """Each event's duration minus its direct children's, keyed by id(event)"""
+    result = {}
+    by_thread = defaultdict(list)
+    for event in events:
+        by_thread[event['pid'], event['tid']].append(event)
+    for thread_events in by_thread.values():
+        thread_events.sort(key=lambda e: (e['ts'], -e['dur']))
+        open_events = []
+        for event in thread_events:
+            while open_events and event['ts'] >= open_events[-1]['ts'] + open_events[-1]['dur']:
+                open_events.pop()
+            result[id(event)] = event['dur']
+            if open_events:
+                result[id(open_events[-1])] -= event['dur']
+            open_events.append(event)
+    return result
+
+
+def write_trace(path, events):
+    """Write events as a Chrome trace-event JSON file"""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+
+
+def print_summary(events, top=5):
+    """Print each asset's most expensive stages by self time"""
+    own = self_times(events)
+    per_asset = defaultdict(lambda: defaultdict(lambda: [0, 0]))
+    totals = defaultdict(int)
+    for event in events:
+        asset = event['args'].get('asset') or '(no asset)'
+        # An asset-level event's own time is the generator's inline drawing
+        name = '(inline)' if event['cat'] == 'asset' else event['name']
+        entry = per_asset[asset][name]
+        entry[0] += own[id(event)]
+        entry[1] = max(entry[1], event['args'].get('py_peak_kb', 0))
+        totals[asset] += own[id(event)]
+
+    print(f"{'asset / stage':<36}{'self ms':>10}{'share':>8}{'py peak':>11}")
+    print("-" * 65)
+    for asset in sorted(per_asset, key=totals.get, reverse=True):
+        print(f"{asset:<36}{totals[asset] / 1000:>10.1f}")
+        stages = sorted(per_asset[asset].items(), key=lambda item: item[1][0], reverse=True)
+        for name, (micros, peak_kb) in stages[:top]:
+            share = micros / totals[asset] if totals[asset] else 0
+            print(f"  {name:<34}{micros / 1000:>10.1f}{share:>8.0%}{peak_kb / 1024:>9.1f}MB")
+
+
+def report(path, events, top=5):
+    """Write the trace and print the summary"""
+    write_trace(path, events)
+    print_summary(events, top)
+    print(f"\n[PROFILE] {len(events)} stage events written to {path}")
@@ -0,0 +1,125 @@
+"""
+GET A BIKE - JOB SCHEDULING
+Page-derived asset priorities and a build deadline for the generators
+
+page_priorities() reads app/page.js and ranks every /assets/ image by
+where the page first renders it: an image in the JSX ranks by its own
+position, one listed in a data array (bikes, testimonials, ...) by the
+first `.map(` over that array or a value derived from it. The hero poster
+comes first and the Instagram gallery last; images the page never shows
+rank after all of them. The generators start jobs in that order.
+
+A Deadline is an optional time budget for a run. Jobs that have not
+started when it passes are dropped, and the page keeps the output it
+already has (or the API script restores one from the image cache), so a
+rebuild before a deploy never runs past it by more than the jobs already
+in flight.
+"""
+
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+
+PAGE = Path(__file__).resolve().parent / "app" / "page.js"
+
+ASSET_RE = re.compile(r"/assets/([\w.-]+\.(?:jpe?g|png|webp|avif))")
+CONST_RE = re.compile(r"\bconst\s+(\w+)\s*=")
+DERIVED_RE = re.compile(r"\bconst\s+(\w+)\s*=([^;]*);", re.S)
+COMPONENT_MARK = "export default function"
+
+
+def _render_offset(text, name, start):
+    """Offset of the first .map( over `name` or a const derived from it, after `start`"""
+    names = {name}
+    for match in DERIVED_RE.finditer(text, start):
+        if re.search(rf"\b{re.escape(name)}\b", match.group(2)):
+            names.add(match.group(1))
+    pattern = re.compile(r"\b(?:" + "|".join(map(re.escape, sorted(names))) + r")\.map\(")
+    match = pattern.search(text, start)
+    return match.start() if match else None
+
+
+def page_priorities(page=PAGE):
+    """{filename: rank} for every image page.js renders; 0 is shown first.
+
+    Images rendered from the same array share a rank. Returns {} if the
+    page can't be read, which leaves jobs in list order.
+    """
+    try:
+        text = Path(page).read_text(encoding="utf-8")
+    except OSError:
+        return {}
+    start = text.find(COMPONENT_MARK)
+    if start < 0:
+        start = 0
+    offsets = {}
+    for match in ASSET_RE.finditer(text):
+        offset = match.start()
+        if offset < start:
+            # A data array above the component: ranked by where it is rendered
+            consts = list(CONST_RE.finditer(text, 0, offset))
+            if consts:
+                offset = _render_offset(text, consts[-1].group(1), start) or offset
+        name = match.group(1)
+        offsets[name] = min(offset, offsets.get(name, offset))
+    positions = sorted(set(offsets.values()))
+    return {name: positions.index(offset) for name, offset in offsets.items()}
+
+
+def priority(filename, priorities, aliases=None):
+    """Rank of an output in page_priorities() order; unlisted files rank last.
+
+    `aliases` maps an output to the page file it stands in for, e.g. a
+    render that is copied to hero-poster.jpg.
+    """
+    name = (aliases or {}).get(filename, filename)
+    return priorities.get(name, len(priorities))
+
+
+def prioritize(items, priorities, filename=lambda item: item, aliases=None):
+    """items sorted by their output's priority; ties keep their order"""
+    return sorted(items, key=lambda item: priority(filename(item), priorities, aliases))
+
+
+class Deadline:
+    """A time budget starting now; Deadline(None) never expires"""
+
+    def __init__(self, seconds=None):
+        self.seconds = seconds
+        self.at = time.monotonic() + seconds if seconds is not None else None
+
+    def expired(self):
+        return self.at is not None and time.monotonic() >= self.at
+
+    def remaining(self):
+        """Seconds left (never negative), or None without a deadline"""
+        if self.at is None:
+            return None
+        return max(0.0, self.at - time.monotonic())
+
+
+def describe_priorities(priorities):
+    """Rank-ordered lines for printing the schedule"""
+    by_rank = {}
+    for name, rank in priorities.items():
+        by_rank.setdefault(rank, []).append(name)
+    return [f"{rank}: {', '.join(sorted(names))}" for rank, names in sorted(by_rank.items())]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Show the asset priorities derived from app/page.js")
+    parser.add_argument("--page", default=str(PAGE), help="page to read (default app/page.js)")
+    args = parser.parse_args(argv)
+    priorities = page_priorities(args.page)
+    if not priorities:
+        print(f"No /assets/ images found in {args.page}")
+        return 1
+    for line in describe_priorities(priorities):
+        print(line)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+"""
+GET A BIKE - BIKE SPRITE CACHE
+Renders each bike silhouette once as an antialiased RGBA stamp and reuses it
+
+Scenes call stamp_sprite() with one of the generators' existing draw functions
+(draw_luxury_bike_frame, draw_bike_frame). The draw function runs once per
+(style, scale, colors) on a supersampled transparent canvas. After that,
+placing the bike is a single masked paste, so a showroom wall of bikes costs
+one render plus one paste per bike.
+"""
+
+import math
+from functools import lru_cache
+
+from PIL import Image, ImageDraw
+
+import asset_profile
+
+# Render sprites at up to this multiple of their final size, then downsample for AA
+SUPERSAMPLE = 4
+
+# Sprite canvas half-extent in output pixels: scaled part + fixed padding.
+# Covers both bike styles (wheels reach ~190 * scale from the anchor) plus
+# the unscaled handlebar/fork/crank offsets.
+HALF_WIDTH = (200, 48)
+HALF_HEIGHT = (110, 56)
+
+
+class ScaledDraw:
+    """ImageDraw stand-in that maps (x, y) to (x * factor + dx, y * factor + dy).
+
+    Stroke widths are scaled too. Used to supersample sprites and to draw a
+    scene laid out at design size into a larger canvas or a band of it.
+    """
+
+    def __init__(self, draw, factor, offset=(0, 0)):
+        self.draw = draw
+        self.factor = factor
+        self.offset = offset
+
+    def _xy(self, xy, snap=False):
+        f, (dx, dy) = self.factor, self.offset
+        # ImageDraw truncates line coordinates, so snap them to the grid
+        # before offsetting; otherwise a band starting mid-line rasterizes
+        # it differently from the full canvas
+        scale = (lambda v: math.floor(v * f)) if snap else (lambda v: v * f)
+        if xy and isinstance(xy[0], (tuple, list)):
+            return [(scale(x) + dx, scale(y) + dy) for x, y in xy]
+        # Flat [x0, y0, x1, y1, ...] sequence
+        return [scale(v) + (dy if i % 2 else dx) for i, v in enumerate(xy)]
+
+    def _width(self, width):
+        return int(round(width * self.factor))
+
+    def line(self, xy, fill=None, width=0, **kwargs):
+        self.draw.line(self._xy(xy, snap=True), fill=fill, width=self._width(width), **kwargs)
+
+    def ellipse(self, xy, fill=None, outline=None, width=1):
+        self.draw.ellipse(self._xy(xy), fill=fill, outline=outline, width=self._width(width))
+
+
+@lru_cache(maxsize=32)
+def render_sprite(draw_func, scale=1.0, *args):
+    """Render draw_func(draw, cx, cy, scale, *args) once as a cropped RGBA sprite.
+
+    Returns (sprite, (ax, ay)) where (ax, ay) is the position of the draw
+    anchor (cx, cy) inside the sprite. Cached per style, scale and colors;
+    treat the sprite as read-only.
+    """
+    half_w = int(HALF_WIDTH[0] * scale) + HALF_WIDTH[1]
+    half_h = int(HALF_HEIGHT[0] * scale) + HALF_HEIGHT[1]
+    # Large bikes have thick strokes and need less supersampling; this keeps
+    # the temporary canvas roughly the size of a 1x bike at full SUPERSAMPLE
+    factor = max(2, min(SUPERSAMPLE, round(SUPERSAMPLE / scale)))
+    size = (2 * half_w * factor, 2 * half_h * factor)
+    canvas = Image.new('RGBA', size, (0, 0, 0, 0))
+    draw_func(ScaledDraw(ImageDraw.Draw(canvas), factor), half_w, half_h, scale, *args)
+
+    # Box-average the supersampled pixels; resize() premultiplies alpha, so
+    # edges do not pick up the transparent black backdrop
+    sprite = canvas.resize((2 * half_w, 2 * half_h), Image.BOX)
+    bbox = sprite.getbbox()
+    if bbox is None:
+        return sprite, (half_w, half_h)
+    return sprite.crop(bbox), (half_w - bbox[0], half_h - bbox[1])
+
+
+@asset_profile.profiled('sprite')
+def stamp_sprite(img, draw_func, cx, cy, scale=1.0, *args):
+    """Composite the cached sprite for draw_func onto img, anchored at (cx, cy)"""
+    sprite, (ax, ay) = render_sprite(draw_func, scale, *args)
+    img.paste(sprite, (int(cx) - ax, int(cy) - ay), sprite)
@@ -4,12 +4,23 @@ Generate high-quality placeholder images for Get A Bike website
 """
 
 from PIL import Image, ImageDraw, ImageFont, ImageFilter
+import PIL
+import argparse
 import os
 import math
 import random
+import time
+
+import asset_manifest
+import asset_metrics
+import asset_profile
+import asset_schedule
+from bike_sprite import stamp_sprite
+from responsive_images import VARIANT_WIDTHS, save_variants, update_srcset, variant_files
 
 # Create output directories
-os.makedirs("public/assets", exist_ok=True)
+OUTPUT_DIR = "public/assets"
+os.makedirs(OUTPUT_DIR, exist_ok=True)
 
 # Color palette - professional, cycling-themed
 COLORS = {
@@ -29,6 +40,24 @@ def hex_to_rgb(hex_color):
     hex_color = hex_color.lstrip('#')
     return tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
 
+def save_image(img, filename, **options):
+    """Save an image plus its responsive downscales; returns the srcset entry"""
+    encode_seconds = 0.0
+
+    def encode(image, path):
+        nonlocal encode_seconds
+        start = time.perf_counter()
+        image.save(path, **options)
+        encode_seconds += time.perf_counter() - start
+
+    with asset_profile.stage('encode'):
+        encode(img, filename)
+    with asset_profile.stage('variants'):
+        srcset = save_variants(img, OUTPUT_DIR, os.path.basename(filename), encode, VARIANT_WIDTHS)
+    asset_metrics.asset(os.path.basename(filename), encode_seconds=encode_seconds)
+    return srcset
+
+@asset_profile.profiled('gradient')
 def create_gradient_bg(width, height, color1, color2, direction='vertical'):
     """Create a gradient background"""
     img = Image.new('RGB', (width, height))
@@ -128,7 +157,7 @@ def generate_bike_image(filename, bike_name, bike_type, specs, price, frame_colo
         draw.point((x, y), fill=(255, 255, 255, 10))
     
     # Draw bike
-    draw_bike_frame(draw, 320, 220, scale=1.2, frame_color=frame_color)
+    stamp_sprite(img, draw_bike_frame, 320, 220, 1.2, frame_color)
     
     # Add text
     try:
@@ -161,8 +190,9 @@ def generate_bike_image(filename, bike_name, bike_type, specs, price, frame_colo
     price_width = draw.textlength(price, font=font_price)
     draw.text((width - 30 - price_width, 360), price, fill=hex_to_rgb(COLORS['accent_red']), font=font_price)
     
-    img.save(filename, quality=95)
+    srcset = save_image(img, filename, quality=95)
     print(f"Generated: {filename}")
+    return srcset
 
 def generate_avatar(filename, name, role, color_scheme):
     """Generate a professional avatar image"""
@@ -189,8 +219,9 @@ def generate_avatar(filename, name, role, color_scheme):
     # Body/Shoulders
     draw.ellipse([cx-60, cy+20, cx+60, cy+80], fill=(80, 80, 90))
     
-    img.save(filename, quality=95)
+    srcset = save_image(img, filename, quality=95)
     print(f"Generated: {filename}")
+    return srcset
 
 def generate_instagram_tile(filename, type_name, bg_colors):
     """Generate Instagram lifestyle image"""
@@ -221,15 +252,16 @@ def generate_instagram_tile(filename, type_name, bg_colors):
             draw.line([(50, y), (350, y)], fill=hex_to_rgb(COLORS['metal']), width=3)
     else:
         # Generic cycling - bike silhouette
-        draw_bike_frame(draw, 200, 200, scale=0.8, frame_color=COLORS['accent_red'])
+        stamp_sprite(img, draw_bike_frame, 200, 200, 0.8, COLORS['accent_red'])
     
     # Vignette effect
     for i in range(50):
         alpha = int(255 * (i / 50) * 0.3)
         draw.rectangle([i, i, width-i, height-i], outline=(0, 0, 0))
     
-    img.save(filename, quality=90)
+    srcset = save_image(img, filename, quality=90)
     print(f"Generated: {filename}")
+    return srcset
 
 def generate_hero_poster(filename):
     """Generate hero poster image"""
@@ -247,10 +279,11 @@ def generate_hero_poster(filename):
         draw.ellipse([x, y, x+size, y+size], fill=(255, 255, 255, 30))
     
     # Draw hero bike (larger, more detailed)
-    draw_bike_frame(draw, width//2, height//2 + 100, scale=2.5, frame_color=COLORS['accent_red'])
+    stamp_sprite(img, draw_bike_frame, width//2, height//2 + 100, 2.5, COLORS['accent_red'])
     
-    img.save(filename, quality=95)
+    srcset = save_image(img, filename, quality=95)
     print(f"Generated: {filename}")
+    return srcset
 
 def generate_video_thumbnail(filename):
     """Generate video thumbnail with play button"""
@@ -264,7 +297,7 @@ def generate_video_thumbnail(filename):
     colors = [COLORS['accent_red'], COLORS['accent_blue'], COLORS['accent_gold']]
     
     for pos, color in zip(positions, colors):
-        draw_bike_frame(draw, pos[0], pos[1], scale=0.8, frame_color=color)
+        stamp_sprite(img, draw_bike_frame, pos[0], pos[1], 0.8, color)
     
     # Play button
     cx, cy = width // 2, height // 2
@@ -272,11 +305,51 @@ def generate_video_thumbnail(filename):
     draw.regular_polygon((cx, cy, triangle_size), 3, rotation=90, 
                          fill=hex_to_rgb(COLORS['accent_red']))
     
-    img.save(filename, quality=95)
+    srcset = save_image(img, filename, quality=95)
     print(f"Generated: {filename}")
+    return srcset
+
+def build_asset(manifest, func, filename, *args, force=False):
+    """Render one asset into OUTPUT_DIR unless the manifest says it is current"""
+    # The filename doubles as the random seed, so reruns are reproducible
+    key = asset_manifest.input_key(
+        asset_manifest.function_fingerprint(func), filename, args, PIL.__version__
+    )
+    if not force and asset_manifest.is_fresh(manifest, OUTPUT_DIR, filename, key):
+        print(f"Up to date: {filename}")
+        asset_metrics.asset(filename, outcome='up_to_date')
+        return
+    random.seed(filename)
+    start = time.perf_counter()
+    with asset_profile.stage(filename, 'asset', filename):
+        srcset = func(os.path.join(OUTPUT_DIR, filename), *args)
+    asset_metrics.asset(filename, outcome='built', seconds=time.perf_counter() - start,
+                        bytes=asset_metrics.files_bytes(OUTPUT_DIR, [filename, *variant_files(srcset)]))
+    update_srcset(OUTPUT_DIR, {filename: srcset})
+    asset_manifest.record_output(manifest, OUTPUT_DIR, filename, key, variants=variant_files(srcset))
+    asset_manifest.save_manifest(OUTPUT_DIR, manifest)
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate placeholder images for the Get A Bike site")
+    parser.add_argument('--force', action='store_true',
+                        help="rebuild every asset even if the manifest says it is current")
+    parser.add_argument('--profile', nargs='?', const='asset-trace.json', metavar='TRACE',
+                        help="time every stage and write a Chrome trace (default asset-trace.json)")
+    parser.add_argument('--metrics', nargs='?', const='asset-metrics', metavar='PREFIX',
+                        help="write per-asset render time, encoder time and bytes to PREFIX.json "
+                             "and PREFIX.prom (default asset-metrics)")
+    parser.add_argument('--deadline', type=float, metavar='SECONDS',
+                        help="start no new assets after this many seconds; the rest keep their existing files")
+    options = parser.parse_args()
     print("Generating high-quality bike shop images...")
+    if options.profile:
+        asset_profile.enable()
+    if options.metrics:
+        asset_metrics.enable(script='generate-images')
+    deadline = asset_schedule.Deadline(options.deadline)
+    start = time.perf_counter()
+    builds = []
+    manifest = asset_manifest.load_manifest(OUTPUT_DIR)
     
     # Generate bike images
     bikes = [
@@ -290,8 +363,7 @@ if __name__ == "__main__":
          '#e76f51', ('#0a0a0f', '#1a0f0a')),
     ]
     
-    for bike in bikes:
-        generate_bike_image(f"public/assets/{bike[0]}", *bike[1:])
+    builds += [(generate_bike_image, bike) for bike in bikes]
     
     # Generate avatars
     avatars = [
@@ -300,8 +372,7 @@ if __name__ == "__main__":
         ("avatar-3.jpg", "Morgan K.", "Commuter", COLORS['accent_red']),
     ]
     
-    for avatar in avatars:
-        generate_avatar(f"public/assets/{avatar[0]}", *avatar[1:])
+    builds += [(generate_avatar, avatar) for avatar in avatars]
     
     # Generate Instagram tiles
     insta_tiles = [
@@ -313,11 +384,34 @@ if __name__ == "__main__":
         ("insta-6.jpg", "community", ('#1a0f0a', '#0a0a0f')),
     ]
     
-    for tile in insta_tiles:
-        generate_instagram_tile(f"public/assets/{tile[0]}", *tile[1:])
+    builds += [(generate_instagram_tile, tile) for tile in insta_tiles]
     
     # Generate hero poster and video thumbnail
-    generate_hero_poster("public/assets/hero-poster.jpg")
-    generate_video_thumbnail("public/assets/video-placeholder.jpg")
-    
-    print("\n✅ All images generated successfully!")
+    builds += [(generate_hero_poster, ("hero-poster.jpg",)), (generate_video_thumbnail, ("video-placeholder.jpg",))]
+    
+    # Build in the order app/page.js shows the assets, hero first
+    priorities = asset_schedule.page_priorities()
+    late = []
+    for func, args in asset_schedule.prioritize(builds, priorities, lambda build: build[1][0]):
+        if deadline.expired():
+            late.append(args[0])
+            continue
+        build_asset(manifest, func, *args, force=options.force)
+    missing = [filename for filename in late if not os.path.exists(os.path.join(OUTPUT_DIR, filename))]
+    for filename in late:
+        print(f"Deadline reached: {filename} {'was not built' if filename in missing else 'keeps its existing file'}")
+        asset_metrics.asset(filename, outcome='failed' if filename in missing else 'stale')
+    
+    if missing:
+        print(f"\n⚠️  Deadline reached with no image for: {', '.join(missing)}")
+    elif late:
+        print(f"\n⏰ Deadline reached: {len(late)} image(s) kept their existing files")
+    else:
+        print("\n✅ All images generated successfully!")
+    if asset_profile.enabled():
+        print()
+        asset_profile.report(options.profile, asset_profile.take_events())
+    if asset_metrics.enabled():
+        asset_metrics.gauge('run_seconds', time.perf_counter() - start)
+        print()
+        asset_metrics.report(options.metrics)
@@ -5,12 +5,32 @@ Generates premium placeholder images with luxury black & gold aesthetic
 No API key required - uses PIL/Pillow for high-quality graphics
 """
 
-from PIL import Image, ImageDraw, ImageFont, ImageFilter, ImageEnhance
+from PIL import Image, ImageChops, ImageDraw, ImageFont, ImageFilter, ImageEnhance
+import PIL
+import numpy as np
+import argparse
+import contextlib
+import io
 import os
 import math
-import random
+import struct
+import sys
+import time
+import traceback
+import zlib
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, TimeoutError, as_completed
+from functools import lru_cache
 from pathlib import Path
 
+import asset_encoder
+import asset_manifest
+import asset_metrics
+import asset_profile
+import asset_schedule
+from bike_sprite import ScaledDraw, stamp_sprite
+from responsive_images import VARIANT_WIDTHS, add_sources, save_variants, update_srcset, variant_files
+
 # Create output directories
 OUTPUT_DIR = Path("public/assets")
 OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
@@ -37,87 +57,277 @@ COLORS = {
     'carbon_fiber': '#2d2d3a',
 }
 
+# Canvas sizes per asset type (width, height)
+HERO_SIZE = (1792, 1024)
+BIKE_SIZE = (1024, 768)
+AVATAR_SIZE = (512, 512)
+INSTAGRAM_SIZE = (1024, 1024)
+OG_SIZE = (1200, 630)
+
+# Encoder settings for every saved asset (part of the rebuild manifest key)
+JPEG_OPTIONS = {'quality': 95}
+
+# Quality search and extra formats (--optimize / --formats); the defaults
+# write plain JPEG_OPTIONS files. Set per run by configure_encoding().
+ENCODE_SETTINGS = {'formats': ('jpeg',), 'target_ssim': None, 'max_bytes': None}
+
+# Widths of the responsive downscales written next to each asset
+RESPONSIVE_WIDTHS = VARIANT_WIDTHS
+
+# Band height for tiled poster rendering; peak memory scales with width * this
+TILE_HEIGHT = 256
+
+# Outputs that stand in for a different file on the page, for job priorities
+PAGE_ALIASES = {'hero-showroom-2.jpg': 'hero-poster.jpg'}
+
 def hex_to_rgb(hex_color):
     """Convert hex color to RGB tuple"""
     hex_color = hex_color.lstrip('#')
     return tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
 
-def create_gradient(width, height, color1, color2, direction='diagonal'):
+def configure_encoding(settings):
+    """Install ENCODE_SETTINGS for this process"""
+    ENCODE_SETTINGS.update(settings)
+
+def init_worker(settings, profile=False):
+    """Process pool initializer: encoder settings and profiling state"""
+    configure_encoding(settings)
+    if profile:
+        asset_profile.enable()
+
+def save_jpeg(img, filename):
+    """Save an asset and its responsive downscales into OUTPUT_DIR.
+
+    Every file uses the shared encoder settings, plus any extra formats from
+    ENCODE_SETTINGS. Returns the asset's srcset entry (see
+    responsive_images.save_variants); with a quality search enabled it also
+    carries the base file's sizes under 'encoding' for the size report.
+    The seconds spent encoding every file ride along under 'encode_seconds'
+    for the run metrics; run_jobs() takes both off before the entry is saved.
+    """
+    formats = ENCODE_SETTINGS['formats']
+    target_ssim, max_bytes = ENCODE_SETTINGS['target_ssim'], ENCODE_SETTINGS['max_bytes']
+    encode_seconds = 0.0
+
+    def encode(image, path):
+        nonlocal encode_seconds
+        start = time.perf_counter()
+        try:
+            return asset_encoder.encode_asset(image, path, formats, JPEG_OPTIONS['quality'],
+                                              target_ssim, max_bytes)
+        finally:
+            encode_seconds += time.perf_counter() - start
+
+    with asset_profile.stage('encode'):
+        results = encode(img, OUTPUT_DIR / filename)
+    with asset_profile.stage('variants'):
+        entry = save_variants(img, OUTPUT_DIR, filename, encode, RESPONSIVE_WIDTHS)
+    add_sources(entry, [(asset_encoder.FORMATS[fmt][2], asset_encoder.FORMATS[fmt][1])
+                        for fmt in formats if fmt != 'jpeg'])
+    if target_ssim is not None or max_bytes is not None:
+        baseline = asset_encoder.encode_bytes(img, 'jpeg', asset_encoder.BASELINE_QUALITY, searched=False)
+        entry['encoding'] = (len(baseline), results)
+    entry['encode_seconds'] = encode_seconds
+    return entry
+
+def _gradient_index(width, height, direction, rows=None):
+    """Split a gradient into its distinct ratios and a per-pixel index into them.
+
+    Diagonal, horizontal and vertical gradients depend on one integer per
+    pixel (x + y, x, y or the squared distance from center), so colors are
+    computed once per distinct value and then gathered. When a radial band
+    spans more distances than it has pixels, ratios are returned per pixel
+    with index None. `rows` = (y0, y1) restricts the result to that band.
+    """
+    y0, y1 = rows or (0, height)
+    y, x = np.ogrid[y0:y1, 0:width]
+    if direction == 'diagonal':
+        return np.arange(y0, y1 + width - 1) / (width + height), x + y - y0
+    elif direction == 'horizontal':
+        return np.arange(width) / width, x
+    elif direction == 'radial':
+        cx, cy = width // 2, height // 2
+        max_dist = math.sqrt(cx**2 + cy**2)
+        dist_sq = (x - cx)**2 + (y - cy)**2
+        lo, hi = dist_sq.min(), dist_sq.max()
+        if hi - lo < dist_sq.size:
+            return np.sqrt(np.arange(lo, hi + 1)) / max_dist, dist_sq - lo
+        return np.sqrt(dist_sq) / max_dist, None
+    # 'vertical' and unknown directions
+    return np.arange(y0, y1) / height, y - y0
+
+def _interpolate_stops(ratio, stops):
+    """Colors for an array of gradient ratios, with a trailing RGB axis"""
+    if len(stops) < 2:
+        raise ValueError("A gradient needs at least two stops")
+    positions = np.array([float(pos) for pos, _ in stops])
+    colors = np.array([hex_to_rgb(color) for _, color in stops], dtype=np.float64)
+    if np.any(np.diff(positions) <= 0):
+        raise ValueError("Gradient stop positions must be strictly increasing")
+
+    seg = np.clip(np.searchsorted(positions, ratio, side='right') - 1, 0, len(stops) - 2)
+    p0, p1 = positions[seg], positions[seg + 1]
+    local = np.clip((ratio - p0) / (p1 - p0), 0.0, 1.0)[..., None]
+    c0, c1 = colors[seg], colors[seg + 1]
+    # astype truncates like int() did in the per-pixel version
+    return (c0 + (c1 - c0) * local).astype(np.uint8)
+
+@asset_profile.profiled('gradient')
+def create_gradient_stops(width, height, stops, direction='diagonal', rows=None):
+    """Create multi-stop gradient background from (position, color) pairs.
+
+    Positions run 0-1 along the gradient direction and must be increasing,
+    e.g. [(0, COLORS['bg_black']), (0.6, COLORS['carbon']), (1, COLORS['bg_dark'])].
+    With rows=(y0, y1) only that band of the width x height canvas is built.
+    """
+    y0, y1 = rows or (0, height)
+    ratio, index = _gradient_index(width, height, direction, rows)
+    rgb = _interpolate_stops(ratio, stops)
+    if index is not None:
+        rgb = rgb[index]
+    rgb = np.broadcast_to(rgb, (y1 - y0, width, 3))
+    return Image.fromarray(np.ascontiguousarray(rgb))
+
+def create_gradient(width, height, color1, color2, direction='diagonal', rows=None):
     """Create smooth gradient background"""
-    img = Image.new('RGB', (width, height))
-    draw = ImageDraw.Draw(img)
-    c1 = hex_to_rgb(color1)
-    c2 = hex_to_rgb(color2)
-    
-    for y in range(height):
-        for x in range(width):
-            if direction == 'diagonal':
-                ratio = (x + y) / (width + height)
-            elif direction == 'vertical':
-                ratio = y / height
-            elif direction == 'horizontal':
-                ratio = x / width
-            elif direction == 'radial':
-                cx, cy = width // 2, height // 2
-                max_dist = math.sqrt(cx**2 + cy**2)
-                dist = math.sqrt((x - cx)**2 + (y - cy)**2)
-                ratio = dist / max_dist
-            else:
-                ratio = y / height
-            
-            r = int(c1[0] + (c2[0] - c1[0]) * ratio)
-            g = int(c1[1] + (c2[1] - c1[1]) * ratio)
-            b = int(c1[2] + (c2[2] - c1[2]) * ratio)
-            draw.point((x, y), fill=(r, g, b))
-    
-    return img
-
-def add_noise(img, intensity=0.02):
-    """Add subtle film grain noise"""
-    pixels = img.load()
-    width, height = img.size
-    for y in range(height):
-        for x in range(width):
-            if random.random() < intensity:
-                r, g, b = pixels[x, y]
-                noise = random.randint(-10, 10)
-                pixels[x, y] = (
-                    max(0, min(255, r + noise)),
-                    max(0, min(255, g + noise)),
-                    max(0, min(255, b + noise))
-                )
-    return img
-
-def add_vignette(img, strength=0.4):
-    """Add luxury vignette effect"""
+    return create_gradient_stops(width, height, [(0, color1), (1, color2)], direction, rows)
+
+# Grain is cut from a small pool of cached tiles; each asset's seed picks a
+# tile and a wrap-around offset so neighbouring images don't share a pattern
+GRAIN_TILE_SIZE = 512
+GRAIN_TILE_VARIANTS = 4
+GRAIN_MODES = ('mono', 'chroma')
+
+def asset_seed(name):
+    """Stable per-asset seed derived from the output filename"""
+    return zlib.crc32(name.encode('utf-8'))
+
+@lru_cache(maxsize=16)
+def grain_tile(variant, density, amplitude, mode='mono'):
+    """Signed noise tile of shape (GRAIN_TILE_SIZE, GRAIN_TILE_SIZE, channels).
+
+    Only a `density` fraction of pixels receive grain, with offsets drawn
+    uniformly from [-amplitude, amplitude]. 'mono' shifts all channels
+    together, 'chroma' shifts each channel independently.
+    """
+    if mode not in GRAIN_MODES:
+        raise ValueError(f"Unknown grain mode: {mode}")
+    rng = np.random.default_rng([variant, int(density * 1e6), amplitude, GRAIN_MODES.index(mode)])
+    size = GRAIN_TILE_SIZE
+    channels = 1 if mode == 'mono' else 3
+    hit = rng.random((size, size, 1)) < density
+    noise = rng.integers(-amplitude, amplitude + 1, (size, size, channels), dtype=np.int16)
+    tile = np.where(hit, noise, 0).astype(np.int16)
+    tile.setflags(write=False)
+    return tile
+
+@asset_profile.profiled('grain')
+def add_noise(img, intensity=0.02, amplitude=10, mode='mono', seed=0, y0=0):
+    """Add subtle film grain noise.
+
+    `intensity` is the fraction of pixels that receive grain. The same seed
+    always produces the same grain, so builds are byte-for-byte repeatable.
+    For tiled rendering, y0 is the canvas row where img starts.
+    """
+    rng = np.random.default_rng(seed)
+    variant = int(rng.integers(GRAIN_TILE_VARIANTS))
+    oy, ox = rng.integers(GRAIN_TILE_SIZE, size=2)
+    tile = grain_tile(variant, intensity, amplitude, mode)
+
     width, height = img.size
-    vignette = Image.new('L', (width, height), 0)
-    draw = ImageDraw.Draw(vignette)
-    
-    for y in range(height):
-        for x in range(width):
-            # Distance from center (normalized 0-1)
-            cx, cy = width / 2, height / 2
-            dx = abs(x - cx) / cx
-            dy = abs(y - cy) / cy
-            dist = max(dx, dy)
-            
-            # Vignette intensity
-            val = int(255 * (1 - dist * strength))
-            draw.point((x, y), fill=max(0, min(255, val)))
-    
-    vignette = vignette.filter(ImageFilter.GaussianBlur(width // 4))
-    img = Image.composite(img, Image.new('RGB', (width, height), (0, 0, 0)), vignette)
-    return img
-
-def draw_glow_line(draw, x1, y1, x2, y2, color, width_line=2, glow_radius=10):
-    """Draw glowing line for luxury effect"""
-    # Draw glow
-    for r in range(glow_radius, 0, -2):
-        alpha = int(50 * (r / glow_radius))
-        glow_color = (*hex_to_rgb(color), alpha)
-        draw.line([(x1, y1), (x2, y2)], fill=color, width=width_line + r*2)
-    # Draw core line
+    rows = (np.arange(y0, y0 + height) + oy) % GRAIN_TILE_SIZE
+    cols = (np.arange(width) + ox) % GRAIN_TILE_SIZE
+    grain = tile[rows[:, None], cols[None, :]]
+    pixels = np.asarray(img.convert('RGB'), dtype=np.int16) + grain
+    return Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+
+# Exponent of the distance norm per vignette shape. The per-pixel version
+# used max(dx, dy) and a width // 4 blur to hide its hard diagonals; a
+# superellipse norm keeps the rectangular falloff but is smooth everywhere.
+VIGNETTE_SHAPES = {
+    'rect': 4.0,
+    'ellipse': 2.0,
+}
+
+def _vignette_values(width, height, strength, shape, rows=None):
+    """Vignette multiplier (0-255) for rows y0:y1 of a width x height canvas"""
+    if shape not in VIGNETTE_SHAPES:
+        raise ValueError(f"Unknown vignette shape: {shape}")
+    y0, y1 = rows or (0, height)
+    p = VIGNETTE_SHAPES[shape]
+    # Distance from center, normalized to 0-1 at the edges
+    cx, cy = width / 2, height / 2
+    dx = np.abs(np.arange(width) + 0.5 - cx)[None, :] / cx
+    dy = np.abs(np.arange(y0, y1) + 0.5 - cy)[:, None] / cy
+    dist = np.minimum((dx**p + dy**p) ** (1 / p), 1.0)
+    # Smoothstep falloff: flat at the center, no crease, edges at 1 - strength
+    falloff = dist * dist * (3 - 2 * dist)
+    return np.clip(255 * (1 - falloff * strength), 0, 255).astype(np.uint8)
+
+@lru_cache(maxsize=8)
+def vignette_mask(size, strength=0.4, shape='rect'):
+    """Closed-form vignette mask as an RGB image (white center, darkened edges).
+
+    Masks are cached by (size, strength, shape) so every image of the same
+    size reuses one mask. Treat the returned image as read-only.
+    """
+    mask = Image.fromarray(_vignette_values(size[0], size[1], strength, shape))
+    return Image.merge('RGB', (mask, mask, mask))
+
+@asset_profile.profiled('vignette')
+def add_vignette(img, strength=0.4, shape='rect', canvas_size=None, y0=0):
+    """Add luxury vignette effect.
+
+    For tiled rendering, pass the full canvas_size and the row y0 where img
+    starts; the band's slice of the mask is computed without caching.
+    """
+    if canvas_size is None:
+        mask = vignette_mask(img.size, strength, shape)
+    else:
+        band = Image.fromarray(_vignette_values(*canvas_size, strength, shape, (y0, y0 + img.height)))
+        mask = Image.merge('RGB', (band, band, band))
+    return ImageChops.multiply(img.convert('RGB'), mask)
+
+# Glow strokes for one scene accumulate in `mask` (additive RGB, black =
+# no glow); apply_glow blurs the whole layer once and adds it to the image
+GlowLayer = namedtuple('GlowLayer', ['mask', 'draw', 'radius', 'intensity'])
+
+def new_glow_layer(size, radius=12, intensity=1.0):
+    """Start an empty glow layer for a canvas of the given size"""
+    mask = Image.new('RGB', size, (0, 0, 0))
+    return GlowLayer(mask, ImageDraw.Draw(mask), radius, intensity)
+
+def fast_blur(img, radius):
+    """Large-radius blur approximated by downsample, small blur, upsample.
+
+    Shrinking by ~radius / 4 first keeps the work per pixel flat no matter
+    how wide the glow is; the bilinear upsample hides the low resolution.
+    """
+    factor = max(1, min(8, int(radius // 4)))
+    if factor == 1:
+        return img.filter(ImageFilter.GaussianBlur(radius))
+    small = img.reduce(factor)
+    small = small.filter(ImageFilter.GaussianBlur(radius / factor))
+    return small.resize(img.size, Image.BILINEAR)
+
+@asset_profile.profiled('glow')
+def apply_glow(img, glow):
+    """Blur a scene's glow layer once and blend it additively into img"""
+    if glow.mask.getbbox() is None:
+        return img
+    halo = fast_blur(glow.mask, glow.radius)
+    if glow.intensity != 1.0:
+        halo = halo.point(lambda v: min(255, int(v * glow.intensity)))
+    return ImageChops.add(img.convert('RGB'), halo)
+
+def draw_glow_line(draw, x1, y1, x2, y2, color, width_line=2, glow=None):
+    """Draw glowing line for luxury effect.
+
+    The core line goes straight onto `draw`; with a glow layer the stroke is
+    also added to it, to be blurred with the rest of the scene's glow.
+    """
+    if glow is not None:
+        glow.draw.line([(x1, y1), (x2, y2)], fill=color, width=width_line * 2)
     draw.line([(x1, y1), (x2, y2)], fill=color, width=width_line)
 
 def draw_luxury_bike_frame(draw, cx, cy, scale=1.0, frame_color='gold', accent_color='gold_light'):
@@ -204,15 +414,17 @@ def draw_luxury_bike_frame(draw, cx, cy, scale=1.0, frame_color='gold', accent_c
     highlight_offset = 2
     draw.line([seat_cluster, head_tube_top], fill=COLORS['gold_light'], width=1)
 
-def generate_hero_image():
-    """Generate premium hero/showroom background"""
-    print("[ART] Generating hero-showroom-2.jpg...")
-    
-    width, height = 1792, 1024
-    
-    # Create dark gradient background
-    img = create_gradient(width, height, COLORS['bg_black'], COLORS['bg_dark'], 'diagonal')
-    draw = ImageDraw.Draw(img)
+@asset_profile.profiled('scene')
+def draw_hero_scene(img, canvas_size=HERO_SIZE, y0=0):
+    """Draw the showroom floor, bikes and ceiling lights onto img.
+
+    The layout is designed for HERO_SIZE and scaled to canvas_size by its
+    width. img may be a horizontal band of the canvas starting at row y0,
+    which is how the tiled poster renderer draws it.
+    """
+    k = canvas_size[0] / HERO_SIZE[0]
+    width, height = HERO_SIZE[0], canvas_size[1] / k
+    draw = ScaledDraw(ImageDraw.Draw(img), k, (0, -y0))
     
     # Add subtle grid pattern (floor)
     floor_y = height * 0.65
@@ -223,7 +435,7 @@ def generate_hero_image():
                   fill=COLORS['gray_900'], width=1)
     
     # Add horizontal lines
-    for y in range(int(floor_y), height, 40):
+    for y in range(int(floor_y), int(height), 40):
         draw.line([(0, y), (width, y)], fill=COLORS['gray_900'], width=1)
     
     # Draw luxury bikes silhouettes
@@ -234,43 +446,108 @@ def generate_hero_image():
     ]
     
     for bx, by, scale in bike_positions:
-        draw_luxury_bike_frame(draw, int(bx), int(by), scale)
+        stamp_sprite(img, draw_luxury_bike_frame, int(bx * k), int(by * k) - y0, scale * k)
     
     # Add gold accent lights (ceiling spots)
     for i in range(5):
         x = width * 0.15 + i * width * 0.18
         # Light cone effect
         for r in range(100, 0, -5):
-            alpha = int(10 * (r / 100))
-            color = (*hex_to_rgb(COLORS['gold']), alpha)
             draw.ellipse([x - r, 0, x + r, r * 2], fill=None, outline=COLORS['gold_dark'])
+
+def generate_hero_image():
+    """Generate premium hero/showroom background"""
+    print("[ART] Generating hero-showroom-2.jpg...")
+    
+    width, height = HERO_SIZE
+    
+    # Create dark gradient background
+    img = create_gradient(width, height, COLORS['bg_black'], COLORS['bg_dark'], 'diagonal')
+    draw_hero_scene(img, (width, height))
     
     # Add vignette
     img = add_vignette(img, 0.5)
     
     # Add noise for texture
-    img = add_noise(img, 0.01)
+    img = add_noise(img, 0.01, seed=asset_seed('hero-showroom-2.jpg'))
     
-    img.save(OUTPUT_DIR / 'hero-showroom-2.jpg', 'JPEG', quality=95)
+    srcset = save_jpeg(img, 'hero-showroom-2.jpg')
     print("[OK] Saved hero-showroom-2.jpg")
+    return srcset
+
+def _png_chunk(f, tag, data):
+    f.write(struct.pack('>I', len(data)) + tag + data)
+    f.write(struct.pack('>I', zlib.crc32(tag + data)))
+
+def save_png_bands(path, width, height, bands):
+    """Stream RGB bands (uint8 arrays of shape rows x width x 3) into a PNG.
+
+    Only one band is held at a time, so peak memory follows the band size
+    rather than the canvas. Rows use PNG's Sub filter, which suits our
+    smooth gradients. The file is written under a temp name and renamed.
+    """
+    tmp_path = Path(path).with_name(Path(path).name + '.part')
+    compressor = zlib.compressobj(6)
+    rows_written = 0
+    with open(tmp_path, 'wb') as f:
+        f.write(b'\x89PNG\r\n\x1a\n')
+        _png_chunk(f, b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+        for band in bands:
+            rows = band.reshape(band.shape[0], width * 3)
+            filtered = np.empty((rows.shape[0], width * 3 + 1), dtype=np.uint8)
+            filtered[:, 0] = 1  # Sub filter: each byte minus the pixel to its left
+            filtered[:, 1:4] = rows[:, :3]
+            np.subtract(rows[:, 3:], rows[:, :-3], out=filtered[:, 4:], dtype=np.uint8)
+            data = compressor.compress(filtered.tobytes())
+            if data:
+                _png_chunk(f, b'IDAT', data)
+            rows_written += rows.shape[0]
+        _png_chunk(f, b'IDAT', compressor.flush())
+        _png_chunk(f, b'IEND', b'')
+    if rows_written != height:
+        os.unlink(tmp_path)
+        raise ValueError(f"Expected {height} rows, got {rows_written}")
+    os.replace(tmp_path, path)
+
+def render_hero_tiled(width, height, filename=None, tile_height=TILE_HEIGHT):
+    """Render the hero at poster size one horizontal band at a time.
+
+    Gradient, scene drawing, vignette and grain are all evaluated per band
+    and streamed into a PNG, so memory depends on width * tile_height only.
+    """
+    filename = filename or f"hero-poster-{width}x{height}.png"
+    print(f"[ART] Rendering {filename} in {tile_height}px bands...")
+    seed = asset_seed('hero-showroom-2.jpg')
+
+    def bands():
+        for y0 in range(0, height, tile_height):
+            y1 = min(height, y0 + tile_height)
+            band = create_gradient(width, height, COLORS['bg_black'], COLORS['bg_dark'],
+                                   'diagonal', rows=(y0, y1))
+            draw_hero_scene(band, (width, height), y0)
+            band = add_vignette(band, 0.5, canvas_size=(width, height), y0=y0)
+            band = add_noise(band, 0.01, seed=seed, y0=y0)
+            yield np.asarray(band)
+
+    save_png_bands(OUTPUT_DIR / filename, width, height, bands())
+    print(f"[OK] Saved {filename}")
 
 def generate_bike_product(index, name, color_scheme='gold'):
     """Generate premium bike product shot"""
     filename = f"bike-{index}.jpg"
     print(f"[ART] Generating {filename} ({name})...")
     
-    width, height = 1024, 768
+    width, height = BIKE_SIZE
     
     # Create clean gradient background (studio look)
     img = create_gradient(width, height, COLORS['bg_card'], COLORS['bg_elevated'], 'vertical')
-    draw = ImageDraw.Draw(img)
     
     # Center position
     cx, cy = width // 2, height // 2 + 50
     
     # Draw bike frame
     scale = 1.5
-    draw_luxury_bike_frame(draw, cx, cy, scale, color_scheme)
+    stamp_sprite(img, draw_luxury_bike_frame, cx, cy, scale, color_scheme)
     
     # Add subtle shadow beneath bike
     shadow = Image.new('RGBA', (width, height), (0, 0, 0, 0))
@@ -282,15 +559,16 @@ def generate_bike_product(index, name, color_scheme='gold'):
     # Add subtle vignette
     img = add_vignette(img, 0.3)
     
-    img.save(OUTPUT_DIR / filename, 'JPEG', quality=95)
+    srcset = save_jpeg(img, filename)
     print(f"[OK] Saved {filename}")
+    return srcset
 
 def generate_avatar(index, name):
     """Generate professional avatar placeholder"""
     filename = f"avatar-{index}.jpg"
     print(f"[ART] Generating {filename} ({name})...")
     
-    size = 512
+    size = AVATAR_SIZE[0]
     img = Image.new('RGB', (size, size), hex_to_rgb(COLORS['bg_card']))
     draw = ImageDraw.Draw(img)
     
@@ -327,17 +605,19 @@ def generate_avatar(index, name):
     # Add subtle vignette
     img = add_vignette(img, 0.4)
     
-    img.save(OUTPUT_DIR / filename, 'JPEG', quality=95)
+    srcset = save_jpeg(img, filename)
     print(f"[OK] Saved {filename}")
+    return srcset
 
 def generate_instagram(index, style='detail'):
     """Generate Instagram post image"""
     filename = f"insta-{index}.jpg"
     print(f"[ART] Generating {filename}...")
     
-    size = 1024
+    size = INSTAGRAM_SIZE[0]
     img = Image.new('RGB', (size, size), hex_to_rgb(COLORS['bg_dark']))
     draw = ImageDraw.Draw(img)
+    glow = new_glow_layer(img.size, radius=24, intensity=0.8)
     
     if style == 'detail':
         # Macro detail style - drivetrain closeup
@@ -385,24 +665,26 @@ def generate_instagram(index, style='detail'):
             draw.line([(left, y), (right, y)], fill=(gray, gray, gray))
         
         # Gold sunset line
-        draw.line([(0, horizon_y), (size, horizon_y)], 
-                  fill=hex_to_rgb(COLORS['gold']), width=3)
+        draw_glow_line(draw, 0, horizon_y, size, horizon_y, COLORS['gold'], width_line=3, glow=glow)
     
     else:
         # Bike silhouette
-        draw_luxury_bike_frame(draw, size // 2, size // 2 + 100, 1.5)
+        stamp_sprite(img, draw_luxury_bike_frame, size // 2, size // 2 + 100, 1.5)
+    
+    img = apply_glow(img, glow)
     
     # Add vignette
     img = add_vignette(img, 0.4)
     
-    img.save(OUTPUT_DIR / filename, 'JPEG', quality=95)
+    srcset = save_jpeg(img, filename)
     print(f"[OK] Saved {filename}")
+    return srcset
 
 def generate_og_image():
     """Generate Open Graph social sharing image"""
     print("[ART] Generating og-image.jpg...")
     
-    width, height = 1200, 630
+    width, height = OG_SIZE
     img = Image.new('RGB', (width, height), hex_to_rgb(COLORS['bg_black']))
     draw = ImageDraw.Draw(img)
     
@@ -415,72 +697,303 @@ def generate_og_image():
         draw.line([(0, y), (width, y)], fill=(r, g, b))
     
     # Draw bikes on left side
-    draw_luxury_bike_frame(draw, 300, 400, 1.2)
+    stamp_sprite(img, draw_luxury_bike_frame, 300, 400, 1.2)
     
     # Gold accent line separator
-    draw.line([(width // 2, 100), (width // 2, height - 100)],
-              fill=hex_to_rgb(COLORS['gold']), width=2)
+    glow = new_glow_layer(img.size, radius=16, intensity=0.7)
+    draw_glow_line(draw, width // 2, 100, width // 2, height - 100, COLORS['gold'],
+                   width_line=2, glow=glow)
     
     # Gold decorative elements
     draw.rectangle([width - 100, 0, width, 10], fill=hex_to_rgb(COLORS['gold']))
     draw.rectangle([width - 50, height - 10, width, height], fill=hex_to_rgb(COLORS['gold']))
+    img = apply_glow(img, glow)
     
     # Add vignette
     img = add_vignette(img, 0.3)
     
-    img.save(OUTPUT_DIR / 'og-image.jpg', 'JPEG', quality=95)
+    srcset = save_jpeg(img, 'og-image.jpg')
     print("[OK] Saved og-image.jpg")
+    return srcset
+
+# Asset lists rendered by main()
+BIKES = [
+    ("Trek Madone SLR 9", 'gold'),
+    ("Specialized S-Works Tarmac", 'gold'),
+    ("Cervélo R5 Disc", 'gold'),
+    ("3T Exploro Racemax", 'gold'),
+    ("Specialized Turbo Levo", 'gold'),
+    ("Santa Cruz Hightower", 'gold'),
+    ("Canyon Grail CF SLX", 'gold'),
+    ("BMC Roadmachine 01", 'gold'),
+]
+AVATARS = ["Marcus Chen", "Sarah Williams", "David Rodriguez"]
+INSTAGRAM_STYLES = ['detail', 'lifestyle', 'bike', 'detail', 'lifestyle', 'bike']
+
+AssetJob = namedtuple('AssetJob', ['filename', 'func', 'args', 'cost'])
+
+def build_jobs():
+    """List every asset as an independent render job; cost is the canvas pixel count"""
+    jobs = [AssetJob('hero-showroom-2.jpg', generate_hero_image, (), HERO_SIZE[0] * HERO_SIZE[1])]
+    for i, (name, color) in enumerate(BIKES, 1):
+        jobs.append(AssetJob(f"bike-{i}.jpg", generate_bike_product, (i, name, color), BIKE_SIZE[0] * BIKE_SIZE[1]))
+    for i, name in enumerate(AVATARS, 1):
+        jobs.append(AssetJob(f"avatar-{i}.jpg", generate_avatar, (i, name), AVATAR_SIZE[0] * AVATAR_SIZE[1]))
+    for i, style in enumerate(INSTAGRAM_STYLES, 1):
+        jobs.append(AssetJob(f"insta-{i}.jpg", generate_instagram, (i, style), INSTAGRAM_SIZE[0] * INSTAGRAM_SIZE[1]))
+    jobs.append(AssetJob('og-image.jpg', generate_og_image, (), OG_SIZE[0] * OG_SIZE[1]))
+    return jobs
 
-def main():
+def run_job(job, capture=False):
+    """Render one asset; returns (filename, seconds, pid, log, result, error, trace).
+
+    Exceptions are returned as a formatted `error` instead of raised.
+    `trace` holds the profiler events recorded while rendering (see --profile).
+
+    With capture=True the generator's own output is collected into `log` so
+    that pool workers don't interleave their lines on the console.
+    """
+    log = io.StringIO()
+    start = time.perf_counter()
+    result = error = None
+    try:
+        with contextlib.redirect_stdout(log if capture else sys.stdout), \
+                asset_profile.stage(job.filename, 'asset', job.filename):
+            result = job.func(*job.args)
+    except Exception:
+        error = traceback.format_exc()
+    return (job.filename, time.perf_counter() - start, os.getpid(), log.getvalue(), result, error,
+            asset_profile.take_events())
+
+def job_key(job):
+    """Manifest key: generator code and constants, arguments, seed and encoder"""
+    return asset_manifest.input_key(
+        asset_manifest.function_fingerprint(job.func),
+        job.args,
+        asset_seed(job.filename),
+        JPEG_OPTIONS,
+        ENCODE_SETTINGS,
+        RESPONSIVE_WIDTHS,
+        PIL.__version__,
+        np.__version__,
+    )
+
+def run_jobs(jobs, workers=1, manifest=None, sizes=None, trace=None, deadline=None, late=None):
+    """Render jobs by page priority on a process pool; returns the failed filenames.
+
+    When a manifest is given, each successful output is recorded in it.
+    Responsive variants are recorded in the srcset manifest as jobs finish.
+    Quality-search results are appended to `sizes` as (filename, baseline
+    bytes, results) rows for asset_encoder.print_size_report(). Profiler
+    events from every worker are appended to `trace`.
+
+    Jobs not started when `deadline` (an asset_schedule.Deadline) passes
+    are dropped: those whose output already exists are appended to `late`
+    and keep it, the others count as failed.
+    """
+    # Critical assets first; within a priority, the most expensive renders
+    # first so they don't set the tail
+    priorities = asset_schedule.page_priorities()
+    jobs = sorted(jobs, key=lambda job: (asset_schedule.priority(job.filename, priorities, PAGE_ALIASES),
+                                         -job.cost))
+    keys = {job.filename: job_key(job) for job in jobs} if manifest is not None else {}
+    deadline = deadline or asset_schedule.Deadline()
+    failed = []
+
+    def drop(job):
+        if (OUTPUT_DIR / job.filename).exists():
+            print(f"[LATE] {job.filename} - deadline reached, keeping the existing file")
+            asset_metrics.asset(job.filename, outcome='stale', fallback='existing')
+            if late is not None:
+                late.append(job.filename)
+        else:
+            print(f"[LATE] {job.filename} - deadline reached and no existing file")
+            asset_metrics.asset(job.filename, outcome='failed', error='deadline')
+            failed.append(job.filename)
+
+    def report(done, result):
+        filename, elapsed, pid, log, srcset, error, events = result
+        if trace is not None:
+            trace.extend(events)
+        if log:
+            print(log, end="")
+        if error:
+            failed.append(filename)
+            print(f"[FAIL] [{done}/{len(jobs)}] {filename} (worker {pid})")
+            print(error.rstrip())
+            asset_metrics.asset(filename, outcome='failed', seconds=elapsed)
+        else:
+            print(f"[DONE] [{done}/{len(jobs)}] {filename} in {elapsed:.2f}s (worker {pid})")
+            encoding = srcset.pop('encoding', None)
+            if encoding and sizes is not None:
+                sizes.append((filename, *encoding))
+            asset_metrics.asset(filename, outcome='built', seconds=elapsed, worker=pid,
+                                encode_seconds=srcset.pop('encode_seconds', None),
+                                bytes=asset_metrics.files_bytes(OUTPUT_DIR, [filename, *variant_files(srcset)]))
+            update_srcset(OUTPUT_DIR, {filename: srcset})
+            if manifest is not None:
+                asset_manifest.record_output(manifest, OUTPUT_DIR, filename, keys[filename],
+                                             variants=variant_files(srcset))
+                asset_manifest.save_manifest(OUTPUT_DIR, manifest)
+
+    if workers <= 1:
+        for done, job in enumerate(jobs, 1):
+            if deadline.expired():
+                drop(job)
+            else:
+                report(done, run_job(job))
+        return failed
+
+    # Pass settings explicitly so spawn-started workers see them too
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                             initargs=(ENCODE_SETTINGS, asset_profile.enabled())) as pool:
+        futures = {pool.submit(run_job, job, True): job for job in jobs}
+        pending = set(futures)
+        done = 0
+        try:
+            for future in as_completed(futures, timeout=deadline.remaining()):
+                pending.discard(future)
+                done += 1
+                report(done, future.result())
+        except TimeoutError:
+            # Drop what no worker has picked up; renders already under way finish
+            for future, job in futures.items():
+                if future in pending and future.cancel():
+                    pending.discard(future)
+                    drop(job)
+            for future in as_completed(pending):
+                done += 1
+                report(done, future.result())
+    return failed
+
+def main(argv=None):
     """Generate all luxury images"""
+    parser = argparse.ArgumentParser(description="Generate premium placeholder images")
+    parser.add_argument('--jobs', '-j', type=int, default=1,
+                        help="parallel worker processes (0 = one per CPU core)")
+    parser.add_argument('--force', action='store_true',
+                        help="rebuild every asset even if the manifest says it is current")
+    parser.add_argument('--poster', action='append', default=[], metavar='WIDTHxHEIGHT',
+                        help="render the hero as a tiled PNG poster at this size instead (repeatable)")
+    parser.add_argument('--tile-height', type=int, default=TILE_HEIGHT,
+                        help=f"band height in pixels for --poster (default {TILE_HEIGHT})")
+    parser.add_argument('--optimize', action='store_true',
+                        help="search each file's quality for the smallest output and also write "
+                             "WebP/AVIF where supported")
+    parser.add_argument('--formats', metavar='LIST',
+                        help="comma-separated output formats (jpeg, webp, avif; default jpeg, "
+                             "or all supported with --optimize)")
+    parser.add_argument('--target-ssim', type=float,
+                        help=f"minimum similarity to the render for the quality search "
+                             f"(default {asset_encoder.DEFAULT_TARGET_SSIM} with --optimize)")
+    parser.add_argument('--max-kb', type=float, help="per-file byte budget in KiB for the quality search")
+    parser.add_argument('--profile', nargs='?', const='asset-trace.json', metavar='TRACE',
+                        help="time every stage and write a Chrome trace (default asset-trace.json)")
+    parser.add_argument('--deadline', type=float, metavar='SECONDS',
+                        help="start no new renders after this many seconds; the rest keep their existing files")
+    parser.add_argument('--metrics', nargs='?', const='asset-metrics', metavar='PREFIX',
+                        help="write per-asset render time, encoder time and bytes to PREFIX.json "
+                             "and PREFIX.prom (default asset-metrics)")
+    args = parser.parse_args(argv)
+    deadline = asset_schedule.Deadline(args.deadline)
+    if args.profile:
+        asset_profile.enable()
+    if args.metrics:
+        asset_metrics.enable(script='generate-luxury-images-premium')
+    workers = args.jobs or os.cpu_count() or 1
+
+    if args.formats:
+        formats = tuple(f.strip() for f in args.formats.split(',') if f.strip())
+        unknown = [f for f in formats if f not in asset_encoder.FORMATS]
+        if unknown or 'jpeg' not in formats:
+            parser.error("--formats must include jpeg and only list jpeg, webp or avif")
+    else:
+        formats = asset_encoder.DEFAULT_FORMATS if args.optimize else ('jpeg',)
+    target_ssim = args.target_ssim
+    if target_ssim is None and args.optimize:
+        target_ssim = asset_encoder.DEFAULT_TARGET_SSIM
+    configure_encoding({
+        # JPEG first so the base file is written before its alternates
+        'formats': ('jpeg',) + tuple(f for f in asset_encoder.available_formats(formats) if f != 'jpeg'),
+        'target_ssim': target_ssim,
+        'max_bytes': int(args.max_kb * 1024) if args.max_kb else None,
+    })
+
+    if args.poster:
+        for size in args.poster:
+            try:
+                width, height = (int(v) for v in size.lower().split('x'))
+            except ValueError:
+                parser.error(f"invalid poster size: {size}")
+            filename = f"hero-poster-{width}x{height}.png"
+            start = time.perf_counter()
+            with asset_profile.stage(filename, 'asset', filename):
+                render_hero_tiled(width, height, filename, tile_height=args.tile_height)
+            asset_metrics.asset(filename, outcome='built', seconds=time.perf_counter() - start,
+                                bytes=asset_metrics.files_bytes(OUTPUT_DIR, [filename]))
+        if args.profile:
+            print()
+            asset_profile.report(args.profile, asset_profile.take_events())
+        if args.metrics:
+            asset_metrics.report(args.metrics)
+        return 0
+
     print("=" * 70)
     print("GET A BIKE - LUXURY IMAGE GENERATION (PREMIUM EDITION)")
     print("=" * 70)
     print()
-    
-    # Generate hero image
-    generate_hero_image()
-    
-    # Generate bike product images
-    bikes = [
-        ("Trek Madone SLR 9", 'gold'),
-        ("Specialized S-Works Tarmac", 'gold'),
-        ("Cervélo R5 Disc", 'gold'),
-        ("3T Exploro Racemax", 'gold'),
-        ("Specialized Turbo Levo", 'gold'),
-        ("Santa Cruz Hightower", 'gold'),
-        ("Canyon Grail CF SLX", 'gold'),
-        ("BMC Roadmachine 01", 'gold'),
-    ]
-    
-    for i, (name, color) in enumerate(bikes, 1):
-        generate_bike_product(i, name, color)
-    
-    # Generate avatars
-    avatars = ["Marcus Chen", "Sarah Williams", "David Rodriguez"]
-    for i, name in enumerate(avatars, 1):
-        generate_avatar(i, name)
-    
-    # Generate Instagram images
-    styles = ['detail', 'lifestyle', 'bike', 'detail', 'lifestyle', 'bike']
-    for i, style in enumerate(styles, 1):
-        generate_instagram(i, style)
-    
-    # Generate OG image
-    generate_og_image()
-    
+
+    start = time.perf_counter()
+    manifest = asset_manifest.load_manifest(OUTPUT_DIR)
+    jobs = []
+    skipped = 0
+    for job in build_jobs():
+        if not args.force and asset_manifest.is_fresh(manifest, OUTPUT_DIR, job.filename, job_key(job)):
+            skipped += 1
+            print(f"[SKIP] {job.filename} - up to date")
+            asset_metrics.asset(job.filename, outcome='up_to_date')
+        else:
+            jobs.append(job)
+    sizes = []
+    trace = []
+    late = []
+    failed = run_jobs(jobs, workers, manifest, sizes, trace, deadline, late)
+    elapsed = time.perf_counter() - start
+    if sizes:
+        print()
+        asset_encoder.print_size_report(sizes, ENCODE_SETTINGS['formats'])
+    if args.profile:
+        print()
+        asset_profile.report(args.profile, trace)
+    if args.metrics:
+        asset_metrics.gauge('run_seconds', elapsed)
+        print()
+        asset_metrics.report(args.metrics)
+
     print()
     print("=" * 70)
-    print("ALL IMAGES GENERATED SUCCESSFULLY!")
+    if failed:
+        print(f"[FAIL] {len(failed)} OF {len(jobs)} IMAGES FAILED: {', '.join(sorted(failed))}")
+    elif late:
+        print(f"[LATE] DEADLINE REACHED: {len(late)} IMAGES KEPT THEIR EXISTING FILES")
+    elif not jobs:
+        print("ALL IMAGES UP TO DATE")
+    else:
+        print("ALL IMAGES GENERATED SUCCESSFULLY!")
     print("=" * 70)
     print(f"\n📁 Output directory: {OUTPUT_DIR.absolute()}")
-    print(f"[COUNT] Total images: 19")
+    print(f"[COUNT] Total images: {len(jobs) - len(failed) - len(late)} built, {skipped} up to date"
+          + (f", {len(late)} left for the next run" if late else ""))
+    print(f"[TIME] {elapsed:.2f}s with {workers} worker(s)")
     print()
+    if failed:
+        return 1
     print("Next steps:")
     print("  1. Copy hero-showroom-2.jpg to hero-poster.jpg")
     print("  2. Run 'npm run build' to rebuild the site")
     print("  3. Deploy to hosting")
     print()
+    return 0
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -8,16 +8,84 @@ Requires: TOGETHER_API_KEY environment variable
 
 import os
 import requests
-import base64
+import asyncio
+import time
 from pathlib import Path
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from time import sleep
+
+import asset_manifest
+import asset_metrics
+import asset_profile
+import asset_schedule
+import image_postprocess
+import image_previews
+import image_scoring
+import image_stream
+import job_journal
+import response_cache
+import together_client
 
 # Configuration
 TOGETHER_API_KEY = os.getenv("TOGETHER_API_KEY", "")
+# TOGETHER_API_URL points the generator elsewhere, e.g. at mock_together_server.py
+API_URL = os.getenv("TOGETHER_API_URL", "https://api.together.xyz/v1/images/generations")
 OUTPUT_DIR = Path("public/assets")
 IMAGE_WIDTH = 1536
 IMAGE_HEIGHT = 1024
+MODEL = "black-forest-labs/FLUX.1-pro"  # High quality model
+STEPS = 50
+
+# Regenerate images even when the build manifest says they are current
+FORCE = False
+
+# Local store of every image the API returned (a response_cache.ResponseCache),
+# or None to always call the API
+CACHE = None
+# Request fields a cached download must share to stand in for a request
+# the deadline dropped
+FALLBACK_FIELDS = ("model", "steps", "width", "height")
+
+# Fit downloads to their display size (DISPLAY_SIZES) and re-encode them;
+# False keeps the API's bytes as they are
+POSTPROCESS = True
+# Post-processing threads; None means one per CPU
+POSTPROCESS_WORKERS = None
+
+# Candidates requested per prompt (the API's "n"). Above 1, the best by
+# image_scoring goes to OUTPUT_DIR and the others are kept in CACHE
+VARIANTS = 1
+
+# Request hedging (a together_client.HedgePolicy shared by the whole run),
+# or None to send each request once
+HEDGE = None
+
+# Job state log (a job_journal.JobJournal), or None to keep no journal
+JOURNAL = None
+
+# Only run jobs the journal last recorded as failed
+RETRY_FAILED = False
+
+# Preview pass: render quickly at reduced size into image_previews.PREVIEW_DIR
+PREVIEW = False
+PREVIEW_MODEL = MODEL
+PREVIEW_STEPS = 12
+# {category: fraction of the final size}; missing categories use image_previews.DEFAULT_SCALE
+PREVIEW_SCALE = {}
+
+# Preview index ({filename: entry} with prompt and seed), see image_previews
+PREVIEWS = {}
+
+# {filename: rank} from where app/page.js shows each image; batches start
+# the lowest ranks first
+PRIORITIES = asset_schedule.page_priorities()
+
+# Time budget for the run (an asset_schedule.Deadline). Jobs not started
+# when it passes keep their current or cached image instead
+DEADLINE = asset_schedule.Deadline()
+
+# (filename, fallback) for every job the deadline dropped; fallback is
+# "existing", "cached" or None when the page has no image for it
+LATE = []
 
 # Ensure output directory exists
 OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
@@ -317,70 +385,560 @@ Professional service, expertise, personalized attention mood.""",
     },
 ]
 
+# Every category with the size its images default to
+CATEGORIES = {
+    "hero": (HERO_IMAGES, (IMAGE_WIDTH, IMAGE_HEIGHT)),
+    "bikes": (BIKE_IMAGES, (IMAGE_WIDTH, IMAGE_HEIGHT)),
+    "avatars": (AVATAR_IMAGES, (1024, 1024)),
+    "instagram": (INSTAGRAM_IMAGES, (1024, 1024)),
+    "extra": (ADDITIONAL_IMAGES, (IMAGE_WIDTH, IMAGE_HEIGHT)),
+}
+
+
+# Largest size each category is shown at on the site (app/page.js and
+# app/globals.css), doubled for high-density screens. (width, None) keeps
+# the aspect ratio; (width, height) crops like object-fit: cover.
+DISPLAY_SIZES = {
+    # .hero-video: full-bleed background
+    "hero": (1920, None),
+    # .bike-image: 4:3 cover, widest (~590px) in the one-column layout under 640px
+    "bikes": (1200, 900),
+    # .author-avatar: 48x48
+    "avatars": (96, 96),
+    # .insta-item: square tiles, three across the community card
+    "instagram": (480, 480),
+    # Not placed on the page yet; capped like the hero
+    "extra": (1920, None),
+}
+
+
+def image_category(filename):
+    """Category an output filename belongs to, or None"""
+    for category, (images, _) in CATEGORIES.items():
+        if any(img["filename"] == filename for img in images):
+            return category
+    return None
+
+
+def category_images(category):
+    """(prompt, filename, width, height) for every image in a category, at preview size in PREVIEW mode"""
+    images, (width, height) = CATEGORIES[category]
+    jobs = [(img["prompt"], img["filename"], img.get("width", width), img.get("height", height))
+            for img in images]
+    if PREVIEW:
+        scale = PREVIEW_SCALE.get(category, image_previews.DEFAULT_SCALE)
+        jobs = [(prompt, filename, *image_previews.preview_size(w, h, scale))
+                for prompt, filename, w, h in jobs]
+    return jobs
+
 # ============================================================================
 # IMAGE GENERATION FUNCTION
 # ============================================================================
 
-def generate_image(prompt, filename, width=IMAGE_WIDTH, height=IMAGE_HEIGHT):
-    """Generate a single image using Together AI API"""
+def api_headers():
+    return {
+        "Authorization": f"Bearer {TOGETHER_API_KEY}",
+        "Content-Type": "application/json",
+    }
+
+
+def request_payload(prompt, width=IMAGE_WIDTH, height=IMAGE_HEIGHT, seed=None):
+    """JSON body for a Together AI image generation request"""
+    payload = {
+        "model": PREVIEW_MODEL if PREVIEW else MODEL,
+        "prompt": prompt,
+        "width": width,
+        "height": height,
+        "steps": PREVIEW_STEPS if PREVIEW else STEPS,
+        "n": VARIANTS,
+        "response_format": "b64_json",
+    }
+    if seed is not None:
+        payload["seed"] = seed
+    return payload
+
+
+def image_seed(prompt, filename):
+    """Seed to request an image with, or None to let the API pick.
+
+    A preview keeps its seed while its prompt is unchanged. A final render
+    uses the seed of its promoted preview, else the seed the current file
+    was made with, so promoted images stay up to date on later runs.
+    """
+    entry = PREVIEWS.get(filename)
+    if entry and entry["prompt"] == prompt and (PREVIEW or entry.get("promoted")):
+        return entry["seed"]
+    if PREVIEW:
+        return None
+    return asset_manifest.load_manifest(OUTPUT_DIR)["assets"].get(filename, {}).get("seed")
+
+
+def manifest_fields(payload):
+    """Extra manifest fields recorded for an image generated from payload"""
+    fields = {"model": payload["model"]}
+    if "seed" in payload:
+        fields["seed"] = payload["seed"]
+    return fields
+
+
+def postprocess_spec(filename):
+    """image_postprocess settings for an output, or None to keep the downloaded bytes"""
+    if not POSTPROCESS or PREVIEW:
+        return None
+    width, height = DISPLAY_SIZES.get(image_category(filename), DISPLAY_SIZES["extra"])
+    return image_postprocess.make_spec(filename, width, height)
+
+
+def image_key(payload, filename):
+    """Manifest and journal key: the request plus how its result is post-processed.
+
+    Changing only the processing re-processes the cached download instead
+    of calling the API again.
+    """
+    spec = postprocess_spec(filename)
+    if spec is None:
+        return asset_manifest.input_key(payload)
+    return asset_manifest.input_key(payload, spec)
+
+
+def job_key(prompt, filename, width, height):
+    """Manifest and journal key of the request for one image"""
+    return image_key(request_payload(prompt, width, height, image_seed(prompt, filename)), filename)
+
+
+def journal(key, state, filename, **fields):
+    """Record a job state change in JOURNAL, if there is one"""
+    if JOURNAL:
+        JOURNAL.record(key, state, filename=filename, **fields)
+
+
+def journal_done(key, filename):
+    journal(key, "done", filename, sha256=asset_manifest.file_digest(OUTPUT_DIR / filename))
+
+
+def assign_preview_seeds(jobs):
+    """Give each preview a seed, kept while its prompt is unchanged (a new one with FORCE)"""
+    for images in jobs.values():
+        for prompt, filename, width, height in images:
+            entry = PREVIEWS.get(filename)
+            if FORCE or not entry or entry["prompt"] != prompt:
+                PREVIEWS[filename] = {
+                    "prompt": prompt,
+                    "seed": image_previews.new_seed(),
+                    "approved": False,
+                    "promoted": False,
+                }
+            PREVIEWS[filename].update(width=width, height=height, model=PREVIEW_MODEL, steps=PREVIEW_STEPS)
+    image_previews.save_index(PREVIEWS)
+
+
+def queue_jobs(jobs):
+    """Prepare a batch: seed previews and journal the jobs as queued.
+
+    With RETRY_FAILED, only the jobs that last failed are kept.
+    """
+    if RETRY_FAILED:
+        jobs = {category: [image for image in images
+                           if JOURNAL.state(job_key(*image)) == "failed"]
+                for category, images in jobs.items()}
+        jobs = {category: images for category, images in jobs.items() if images}
+    if PREVIEW:
+        assign_preview_seeds(jobs)
+    for images in jobs.values():
+        for prompt, filename, width, height in images:
+            key = job_key(prompt, filename, width, height)
+            # An interrupted --force run stays forced until its jobs finish
+            force = FORCE or bool(JOURNAL and JOURNAL.interrupted_force(key))
+            journal(key, "queued", filename, force=force)
+    return jobs
+
+
+def pending_request(prompt, filename, width, height):
+    """(payload, manifest key) for an image that needs the API, or None.
+
+    None means the file is already current, or was just restored from
+    CACHE because the same request was generated before.
+    """
+    payload = request_payload(prompt, width, height, image_seed(prompt, filename))
+    key = image_key(payload, filename)
+    force = FORCE or bool(JOURNAL and JOURNAL.interrupted_force(key))
     
-    if not TOGETHER_API_KEY:
-        print(f"❌ Skipping {filename} - No API key found")
+    # Skip only if the file on disk came from this exact request
+    manifest = asset_manifest.load_manifest(OUTPUT_DIR)
+    if not force and asset_manifest.is_fresh(manifest, OUTPUT_DIR, filename, key):
+        print(f"⏭️  Skipping {filename} - up to date")
+        asset_metrics.asset(filename, outcome="up_to_date")
+        journal_done(key, filename)
+        return None
+    if not force and CACHE and CACHE.materialize(response_cache.cache_key(payload), OUTPUT_DIR / filename):
+        print(f"♻️  Restored: {filename} - from cache")
+        asset_metrics.asset(filename, outcome="cached")
+        process_image(filename, key, payload)
+        return None
+    return payload, key
+
+
+def stream_image(response, filename, race=None):
+    """Decode a streamed generation response into OUTPUT_DIR/filename.
+
+    Memory stays at one chunk. The image only appears once it is complete
+    and looks like an image; otherwise ValueError is raised and nothing is
+    written. With a together_client.HedgeRace, only the attempt that
+    finishes first writes the file.
+    """
+    with image_stream.ImageResponseFile(OUTPUT_DIR / filename) as out:
+        for chunk in response.iter_content(image_stream.CHUNK_SIZE):
+            if race:
+                race.check()
+            out.feed(chunk)
+        with asset_profile.stage("commit", asset=filename):
+            if race:
+                race.claim()
+            return out.commit()
+
+
+def job_priority(image):
+    """Sort key for a (prompt, filename, width, height) job"""
+    return asset_schedule.priority(image[1], PRIORITIES)
+
+
+def fall_back(filename, payload):
+    """Stand in for a job the deadline caught before its request; True if an image remains.
+
+    The current file is kept, or the newest cached download for this
+    output made with the same model, steps and size as `payload` is
+    restored and post-processed, so a preview never stands in for a final
+    image. Nothing is recorded in the manifest and the job stays queued
+    in the journal, so the next run generates it properly.
+    """
+    path = OUTPUT_DIR / filename
+    match = {field: payload[field] for field in FALLBACK_FIELDS}
+    fallback = None
+    if path.exists():
+        fallback = "existing"
+    elif CACHE and (cached := CACHE.latest(filename, **match)) and CACHE.materialize(cached, path):
+        spec = postprocess_spec(filename)
+        if spec is not None:
+            image_postprocess.process_image(path, spec)
+        fallback = "cached"
+    LATE.append((filename, fallback))
+    if fallback is None:
+        print(f"⏰ Deadline: {filename} not generated and there is no earlier image")
+        asset_metrics.asset(filename, outcome="failed", error="deadline")
         return False
+    print(f"⏰ Deadline: {filename} keeps its {fallback} image")
+    asset_metrics.asset(filename, outcome="stale", fallback=fallback)
+    return True
+
+
+def candidate_paths(filename):
+    """Temp paths for the VARIANTS candidates of one image"""
+    path = Path(filename)
+    return [image_stream.TEMP_DIR / "candidates" / f"{path.stem}-{i}{path.suffix}" for i in range(VARIANTS)]
+
+
+def stream_candidates(response, filename, race=None):
+    """Decode every image of an n > 1 response to its candidate path; returns the paths written"""
+    paths = candidate_paths(filename)
+    paths[0].parent.mkdir(parents=True, exist_ok=True)
+    with image_stream.ImageResponseFiles(paths) as out:
+        for chunk in response.iter_content(image_stream.CHUNK_SIZE):
+            if race:
+                race.check()
+            out.feed(chunk)
+        with asset_profile.stage("commit", asset=filename):
+            if race:
+                race.claim()
+            return out.commit()
+
+
+def post_image(client, filename, payload):
+    """Send one generation request, hedged with HEDGE; returns the candidate paths with VARIANTS > 1"""
+    stream = stream_candidates if VARIANTS > 1 else stream_image
+    if HEDGE:
+        return client.post_hedged(API_URL, lambda response, race: stream(response, filename, race), HEDGE,
+                                  headers=api_headers(), json=payload)
+    return client.post(API_URL, lambda response: stream(response, filename),
+                       headers=api_headers(), json=payload)
+
+
+def select_variant(filename, payload, candidates):
+    """Move the best-scoring candidate to OUTPUT_DIR/filename and cache the others.
+
+    Candidates that lose are stored in CACHE under
+    response_cache.candidate_key(), or deleted without a cache.
+    """
+    with asset_profile.stage("score", asset=filename):
+        best, ranked, measurements = image_scoring.pick_best(candidates)
+    os.replace(candidates[best], OUTPUT_DIR / filename)
+    for i, path in enumerate(candidates):
+        if i == best:
+            continue
+        if CACHE:
+            CACHE.put(response_cache.candidate_key(payload, i), path, filename=filename, candidate=i,
+                      score=round(ranked[i], 3), model=payload["model"], steps=payload["steps"],
+                      preview=PREVIEW, width=payload["width"], height=payload["height"])
+        path.unlink()
+    print(f"🏆 Picked candidate {best + 1}/{len(candidates)} for {filename}: "
+          f"{image_scoring.describe(measurements[best], ranked[best])}")
+    asset_metrics.asset(filename, candidates=len(candidates), candidate=best, score=ranked[best])
+
+
+def record_image(filename, key, payload):
+    """Register a finished image in the manifest and the journal"""
+    asset_manifest.update_manifest(OUTPUT_DIR, filename, key, **manifest_fields(payload))
+    asset_metrics.asset(filename, bytes=(OUTPUT_DIR / filename).stat().st_size)
+    journal_done(key, filename)
+    print(f"✅ Saved: {filename}")
+
+
+def record_failure(key, filename, error):
+    """Journal a failed job and count it in the run metrics"""
+    journal(key, "failed", filename, error=error)
+    asset_metrics.asset(filename, outcome="failed", error=error)
+
+
+def process_image(filename, key, payload, pipeline=None):
+    """Post-process a downloaded image, then record it.
+
+    With a pipeline (an image_postprocess.PostProcessPipeline) this only
+    queues the work; failures are journaled and collected in
+    pipeline.failed. Without one, errors propagate to the caller.
+    """
+    spec = postprocess_spec(filename)
+    if spec is None:
+        record_image(filename, key, payload)
+        return
     
-    output_path = OUTPUT_DIR / filename
+    def on_done(result, error):
+        if error is not None:
+            print(f"❌ Post-processing failed: {filename} - {error}")
+            record_failure(key, filename, f"post-processing: {error}")
+            return
+        print(image_postprocess.describe(filename, result))
+        asset_metrics.asset(filename, encode_seconds=result["encode_seconds"])
+        record_image(filename, key, payload)
     
-    # Skip if already exists
-    if output_path.exists():
-        print(f"⏭️  Skipping {filename} - already exists")
-        return True
+    if pipeline:
+        pipeline.submit(OUTPUT_DIR / filename, spec, on_done)
+    else:
+        on_done(image_postprocess.process_image(OUTPUT_DIR / filename, spec), None)
+
+
+def finish_image(filename, key, payload, pipeline=None):
+    """Cache a fresh download as the API sent it, then post-process and record it"""
+    if CACHE:
+        CACHE.put(response_cache.cache_key(payload), OUTPUT_DIR / filename, filename=filename,
+                  model=payload["model"], steps=payload["steps"], preview=PREVIEW,
+                  width=payload["width"], height=payload["height"])
+    process_image(filename, key, payload, pipeline)
+
+
+def generate_image(prompt, filename, width=IMAGE_WIDTH, height=IMAGE_HEIGHT, client=None, pipeline=None):
+    """Generate a single image using Together AI API
+
+    `client` (a together_client.TogetherClient) is shared across a batch so
+    requests reuse pooled connections, are rate-limited together and retry
+    transient errors. Without one, a single-connection client is used.
+    With `pipeline`, post-processing is queued there and still pending
+    when this returns.
+    """
     
-    print(f"🎨 Generating: {filename}")
+    if not TOGETHER_API_KEY:
+        print(f"❌ Skipping {filename} - No API key found")
+        return False
     
+    key = own_client = None
     try:
-        response = requests.post(
-            "https://api.together.xyz/v1/images/generations",
-            headers={
-                "Authorization": f"Bearer {TOGETHER_API_KEY}",
-                "Content-Type": "application/json",
-            },
-            json={
-                "model": "black-forest-labs/FLUX.1-pro",  # High quality model
-                "prompt": prompt,
-                "width": width,
-                "height": height,
-                "steps": 50,
-                "n": 1,
-                "response_format": "b64_json",
-            },
-            timeout=120,
-        )
-        
-        response.raise_for_status()
-        data = response.json()
-        
-        if "data" in data and len(data["data"]) > 0:
-            image_data = base64.b64decode(data["data"][0]["b64_json"])
-            
-            with open(output_path, "wb") as f:
-                f.write(image_data)
-            
-            print(f"✅ Saved: {filename}")
+        # A cache restore or deadline fallback post-processes here, so its
+        # errors fail this image like any other
+        pending = pending_request(prompt, filename, width, height)
+        if pending is None:
             return True
-        else:
-            print(f"❌ Failed: {filename} - No image data in response")
-            return False
+        if DEADLINE.expired():
+            return fall_back(filename, pending[0])
+        print(f"🎨 Generating: {filename}")
+        payload, key = pending
+        if client is None:
+            client = own_client = together_client.TogetherClient(workers=1)
+        journal(key, "in-flight", filename)
+        start = time.perf_counter()
+        with asset_profile.stage("request", "http", filename, model=MODEL):
+            candidates = post_image(client, filename, payload)
+        # Before post-processing, so a failure there can still overrule it
+        asset_metrics.asset(filename, outcome="built", seconds=time.perf_counter() - start)
+        if VARIANTS > 1:
+            select_variant(filename, payload, candidates)
+        finish_image(filename, key, payload, pipeline)
+        return True
             
+    except ValueError as e:
+        print(f"❌ Failed: {filename} - {e}")
+        record_failure(key or job_key(prompt, filename, width, height), filename, str(e))
+        return False
     except requests.exceptions.RequestException as e:
         print(f"❌ Error generating {filename}: {e}")
+        record_failure(key or job_key(prompt, filename, width, height), filename, str(e))
         return False
     except Exception as e:
         print(f"❌ Unexpected error for {filename}: {e}")
+        record_failure(key or job_key(prompt, filename, width, height), filename, str(e))
         return False
+    finally:
+        if own_client:
+            own_client.close()
+
 
+def generate_batch(jobs, workers=1, rate=together_client.DEFAULT_RATE, use_async=False):
+    """Generate {category: [(prompt, filename, width, height)]} jobs
 
-def generate_all_images():
-    """Generate all images in batches"""
+    Returns (succeeded, failed, stats), where stats is the client's
+    together_client.RequestStats. Up to `workers` requests run at
+    once over one pooled session. A token bucket spaces request starts to
+    `rate` per second, concurrency backs off on 429/503, and transient
+    errors are retried before an image counts as failed. With `use_async`
+    the jobs run on one asyncio stream instead (see generate_async).
+    
+    Jobs start in PRIORITIES order. Once DEADLINE passes, jobs that have
+    not started fall back to the image already there (see fall_back).
+    """
+    if use_async:
+        result = asyncio.run(generate_async(jobs, workers, rate))
+        report_deadline()
+        return result
+    
+    images = sorted((image for category_jobs in jobs.values() for image in category_jobs), key=job_priority)
+    client = together_client.TogetherClient(workers, rate)
+    success_count = 0
+    fail_count = 0
+    
+    # Downloads feed the post-processing workers as they land; leaving the
+    # block waits for both
+    with image_postprocess.PostProcessPipeline(POSTPROCESS_WORKERS) as pipeline, \
+            ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(generate_image, *image, client=client, pipeline=pipeline): image[1]
+                   for image in images}
+        try:
+            for done, future in enumerate(as_completed(futures), 1):
+                if future.result():
+                    success_count += 1
+                    print(f"[{done}/{len(images)}] {futures[future]} done")
+                else:
+                    fail_count += 1
+                    print(f"[{done}/{len(images)}] {futures[future]} failed")
+        except KeyboardInterrupt:
+            # Requests already sent are paid for, so let them land; drop the
+            # rest; the journal has them as queued for the next run
+            print("\n⏹️  Interrupted - finishing requests in flight")
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+    
+    client.close()
+    report_throttling(client.throttle.limiter, workers)
+    report_deadline()
+    return success_count - len(pipeline.failed), fail_count + len(pipeline.failed), client.stats
+
+
+def report_throttling(limiter, workers):
+    """Count 429/503 answers in the run metrics and say where concurrency ended"""
+    asset_metrics.count("throttled_total", limiter.throttled)
+    if limiter.throttled:
+        print(f"⚠️  API throttled {limiter.throttled} request(s); "
+              f"concurrency ended at {limiter.limit}/{workers}")
+
+
+def report_hedges(stats):
+    """Summarize request hedging, if it was on"""
+    if HEDGE:
+        print(f"🪁 Hedged requests: {stats.hedges} sent, {stats.hedge_wins} finished first, "
+              f"~{stats.hedge_saved:.1f}s saved")
+
+
+def report_deadline():
+    """Summarize the jobs the deadline dropped, if any"""
+    if not LATE:
+        return
+    missing = [filename for filename, fallback in LATE if fallback is None]
+    print(f"⏰ Deadline of {DEADLINE.seconds:g}s reached: {len(LATE)} image(s) left for the next run, "
+          f"{len(LATE) - len(missing)} kept an earlier image")
+    if missing:
+        print(f"   No image at all for: {', '.join(missing)}")
+
+
+async def generate_async(jobs, concurrency, rate=together_client.DEFAULT_RATE):
+    """Run {category: [image tuples]} on one asyncio job stream (needs aiohttp)
+
+    At most `concurrency` requests are in flight, fewer while the API
+    answers 429/503. Each body is decoded into its file as it streams in,
+    so decoding overlaps with the other requests; each image is reported
+    as it lands.
+    """
+    import together_async
+    
+    total = sum(len(images) for images in jobs.values())
+    counts = {"succeeded": 0, "failed": 0}
+    
+    pipeline = image_postprocess.PostProcessPipeline(POSTPROCESS_WORKERS)
+    async with together_async.AsyncTogetherClient(concurrency, rate) as client:
+        async def handle(image):
+            prompt, filename, width, height = image
+            pending = await asyncio.to_thread(pending_request, prompt, filename, width, height)
+            if pending is None:
+                return True
+            if DEADLINE.expired():
+                return await asyncio.to_thread(fall_back, filename, pending[0])
+            print(f"🎨 Generating: {filename}")
+            payload, key = pending
+            
+            async def consume(response, race=None):
+                if VARIANTS > 1:
+                    paths = candidate_paths(filename)
+                    paths[0].parent.mkdir(parents=True, exist_ok=True)
+                    out = image_stream.ImageResponseFiles(paths)
+                else:
+                    out = image_stream.ImageResponseFile(OUTPUT_DIR / filename)
+                with out:
+                    async for chunk in response.content.iter_chunked(image_stream.CHUNK_SIZE):
+                        out.feed(chunk)
+                    if race:
+                        race.claim()
+                    return await asyncio.to_thread(out.commit)
+            
+            journal(key, "in-flight", filename)
+            start = time.perf_counter()
+            if HEDGE:
+                result = await client.post_hedged(API_URL, consume, HEDGE, headers=api_headers(), json=payload)
+            else:
+                result = await client.post(API_URL, consume, headers=api_headers(), json=payload)
+            asset_metrics.asset(filename, outcome="built", seconds=time.perf_counter() - start)
+            if VARIANTS > 1:
+                await asyncio.to_thread(select_variant, filename, payload, result)
+            await asyncio.to_thread(finish_image, filename, key, payload, pipeline)
+            return True
+        
+        def on_complete(category, image, ok, error):
+            done = counts["succeeded"] + counts["failed"] + 1
+            if error is not None:
+                print(f"❌ Error generating {image[1]}: {error}")
+                record_failure(job_key(*image), image[1], str(error))
+            counts["succeeded" if ok else "failed"] += 1
+            print(f"[{done}/{total}] {category}/{image[1]} {'done' if ok else 'failed'}")
+        
+        # One spare worker per slot keeps the limiter full while others
+        # commit files and update the manifest
+        queues = {"all": together_async.priority_queue(jobs, job_priority)}
+        await together_async.run_stream(queues, handle, 2 * concurrency, on_complete)
+    await asyncio.to_thread(pipeline.close)
+    report_throttling(client.limiter, concurrency)
+    failed = len(pipeline.failed)
+    return counts["succeeded"] - failed, counts["failed"] + failed, client.stats
+
+
+def generate_all_images(workers=1, rate=together_client.DEFAULT_RATE, use_async=False):
+    """Generate all images, `workers` requests at a time
+
+    Returns generate_batch's (succeeded, failed, stats), or None without an API key.
+    """
     
     print("=" * 70)
     print("GET A BIKE - LUXURY IMAGE GENERATION SYSTEM")
@@ -395,46 +953,15 @@ def generate_all_images():
         print()
         return
     
-    # Combine all images to generate
-    all_images = []
-    
-    # Add hero images
-    for img in HERO_IMAGES:
-        all_images.append((img["prompt"], img["filename"], img.get("width", IMAGE_WIDTH), img.get("height", IMAGE_HEIGHT)))
-    
-    # Add bike images
-    for img in BIKE_IMAGES:
-        all_images.append((img["prompt"], img["filename"], IMAGE_WIDTH, IMAGE_HEIGHT))
-    
-    # Add avatar images
-    for img in AVATAR_IMAGES:
-        all_images.append((img["prompt"], img["filename"], img.get("width", 1024), img.get("height", 1024)))
+    # Every category feeds the same job stream
+    jobs = queue_jobs({category: category_images(category) for category in CATEGORIES})
     
-    # Add Instagram images
-    for img in INSTAGRAM_IMAGES:
-        all_images.append((img["prompt"], img["filename"], img.get("width", 1024), img.get("height", 1024)))
-    
-    # Add additional images
-    for img in ADDITIONAL_IMAGES:
-        all_images.append((img["prompt"], img["filename"], img.get("width", IMAGE_WIDTH), img.get("height", IMAGE_HEIGHT)))
-    
-    print(f"Total images to generate: {len(all_images)}")
+    print(f"Total images to generate: {sum(len(images) for images in jobs.values())}")
     print("-" * 70)
     print()
     
-    # Generate images with progress tracking
-    success_count = 0
-    fail_count = 0
-    
-    for i, (prompt, filename, width, height) in enumerate(all_images, 1):
-        print(f"[{i}/{len(all_images)}] ", end="")
-        if generate_image(prompt, filename, width, height):
-            success_count += 1
-        else:
-            fail_count += 1
-        
-        # Small delay to avoid rate limiting
-        sleep(0.5)
+    success_count, fail_count, stats = generate_batch(jobs, workers, rate, use_async)
+    asset_metrics.record_requests(stats)
     
     print()
     print("=" * 70)
@@ -442,46 +969,208 @@ def generate_all_images():
     print("=" * 70)
     print(f"✅ Successful: {success_count}")
     print(f"❌ Failed: {fail_count}")
+    print(f"🔁 Retried requests: {stats.retries}")
+    report_hedges(stats)
     print(f"📁 Output: {OUTPUT_DIR.absolute()}")
     print()
+    return success_count, fail_count, stats
 
 
-def generate_single_category(category):
+def generate_single_category(category, workers=1, rate=together_client.DEFAULT_RATE, use_async=False):
     """Generate images for a specific category"""
     
     if not TOGETHER_API_KEY:
         print("❌ No API key found. Set TOGETHER_API_KEY environment variable.")
         return
     
-    categories = {
-        "hero": [(img["prompt"], img["filename"], img.get("width", IMAGE_WIDTH), img.get("height", IMAGE_HEIGHT)) for img in HERO_IMAGES],
-        "bikes": [(img["prompt"], img["filename"], IMAGE_WIDTH, IMAGE_HEIGHT) for img in BIKE_IMAGES],
-        "avatars": [(img["prompt"], img["filename"], img.get("width", 1024), img.get("height", 1024)) for img in AVATAR_IMAGES],
-        "instagram": [(img["prompt"], img["filename"], img.get("width", 1024), img.get("height", 1024)) for img in INSTAGRAM_IMAGES],
-        "extra": [(img["prompt"], img["filename"], img.get("width", IMAGE_WIDTH), img.get("height", IMAGE_HEIGHT)) for img in ADDITIONAL_IMAGES],
-    }
-    
-    if category not in categories:
+    if category not in CATEGORIES:
         print(f"❌ Unknown category: {category}")
-        print(f"Available: {', '.join(categories.keys())}")
+        print(f"Available: {', '.join(CATEGORIES.keys())}")
         return
     
-    images = categories[category]
+    images = queue_jobs({category: category_images(category)}).get(category, [])
     print(f"Generating {len(images)} {category} images...")
     print()
     
-    for prompt, filename, width, height in images:
-        generate_image(prompt, filename, width, height)
-        sleep(0.5)
+    success_count, fail_count, stats = generate_batch({category: images}, workers, rate, use_async)
+    asset_metrics.record_requests(stats)
+    print(f"\n✅ {success_count} succeeded, ❌ {fail_count} failed, 🔁 {stats.retries} retried requests")
+    report_hedges(stats)
+
+
+def write_contact_sheet(categories):
+    """Lay out the previews of the given categories on the contact sheet"""
+    names = [filename for category in categories if category in CATEGORIES
+             for _, filename, _, _ in category_images(category)]
+    path = image_previews.contact_sheet({name: PREVIEWS[name] for name in names if name in PREVIEWS},
+                                        OUTPUT_DIR)
+    if path:
+        print(f"🗂️  Contact sheet: {path}")
+        print(f"   Approve previews in {OUTPUT_DIR / image_previews.INDEX_NAME} or run --promote NAME ...")
+
+
+def promote_previews(names, workers=1, rate=together_client.DEFAULT_RATE, use_async=False):
+    """Render the named previews at full quality, reusing each preview's seed"""
+    if not TOGETHER_API_KEY:
+        print("❌ No API key found. Set TOGETHER_API_KEY environment variable.")
+        return
+    
+    for name in names:
+        PREVIEWS[name].update(approved=True, promoted=True)
+    image_previews.save_index(PREVIEWS)
+    
+    jobs = {category: [image for image in category_images(category) if image[1] in names]
+            for category in CATEGORIES}
+    jobs = queue_jobs({category: images for category, images in jobs.items() if images})
+    for images in jobs.values():
+        for prompt, filename, _, _ in images:
+            if PREVIEWS[filename]["prompt"] != prompt:
+                print(f"⚠️  {filename}: prompt changed since its preview; rendering with a new seed")
+    print(f"Promoting {sum(len(images) for images in jobs.values())} previews to final renders...")
+    print()
+    
+    success_count, fail_count, stats = generate_batch(jobs, workers, rate, use_async)
+    asset_metrics.record_requests(stats)
+    print(f"\n✅ {success_count} succeeded, ❌ {fail_count} failed, 🔁 {stats.retries} retried requests")
+    report_hedges(stats)
 
 
 if __name__ == "__main__":
-    import sys
+    import argparse
+    import importlib.util
     
-    if len(sys.argv) > 1:
+    parser = argparse.ArgumentParser(description="Generate luxury images with Together AI")
+    parser.add_argument("category", nargs="?", help="hero, bikes, avatars, instagram or extra (default: all)")
+    parser.add_argument("--force", action="store_true",
+                        help="call the API even for images that are up to date or cached")
+    parser.add_argument("--no-cache", action="store_true",
+                        help=f"neither read nor fill the image cache in {response_cache.CACHE_DIR}")
+    parser.add_argument("--cache-mb", type=float, default=response_cache.DEFAULT_MAX_BYTES / 2**20,
+                        help="evict least recently used cached images beyond this size (default 2048)")
+    parser.add_argument("--no-postprocess", action="store_true",
+                        help="keep the API's bytes instead of fitting images to their display size")
+    parser.add_argument("--postprocess-workers", type=int,
+                        help="post-processing threads (default: one per CPU)")
+    parser.add_argument("--journal", default=str(job_journal.JOURNAL_PATH),
+                        help=f"job state journal used to resume interrupted runs (default {job_journal.JOURNAL_PATH})")
+    parser.add_argument("--no-journal", action="store_true", help="don't read or write the job journal")
+    parser.add_argument("--retry-failed", action="store_true",
+                        help="only run the jobs the journal last recorded as failed")
+    parser.add_argument("--preview", action="store_true",
+                        help=f"render quick low-step previews into {image_previews.PREVIEW_DIR}/ with a contact sheet")
+    parser.add_argument("--preview-scale", action="append", default=[], metavar="CATEGORY=SCALE",
+                        help=f"preview size for a category as a fraction of the final size "
+                             f"(default {image_previews.DEFAULT_SCALE}); repeatable")
+    parser.add_argument("--preview-steps", type=int, default=PREVIEW_STEPS,
+                        help=f"diffusion steps for previews (default {PREVIEW_STEPS})")
+    parser.add_argument("--preview-model", default=PREVIEW_MODEL,
+                        help="model for previews (default: the final model, so seeds carry over)")
+    parser.add_argument("--promote", nargs="*", metavar="NAME",
+                        help="render these previews (default: those marked approved) at full quality "
+                             "with their preview seeds")
+    parser.add_argument("--variants", type=int, default=VARIANTS, metavar="N",
+                        help="ask for N candidates per prompt in one request and keep the best-scoring "
+                             "one; the rest go to the image cache (default 1)")
+    parser.add_argument("--workers", "-j", type=int, default=together_client.DEFAULT_WORKERS,
+                        help=f"maximum concurrent requests (default {together_client.DEFAULT_WORKERS})")
+    parser.add_argument("--rate", type=float, default=together_client.DEFAULT_RATE,
+                        help=f"maximum request starts per second (default {together_client.DEFAULT_RATE})")
+    parser.add_argument("--deadline", type=float, metavar="SECONDS",
+                        help="start no new requests after this many seconds; the rest keep their "
+                             "current or cached image")
+    parser.add_argument("--hedge", nargs="?", type=float, const=together_client.HEDGE_PERCENTILE, metavar="PCT",
+                        help="send a duplicate of any request still running past this percentile of recent "
+                             f"latencies; the first response wins (default {together_client.HEDGE_PERCENTILE})")
+    parser.add_argument("--hedge-budget", type=float, default=together_client.HEDGE_BUDGET, metavar="FRACTION",
+                        help="at most this many duplicates per request, counted over the whole run "
+                             f"(default {together_client.HEDGE_BUDGET})")
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="run requests on an asyncio job stream (needs aiohttp); "
+                             "--workers is then the in-flight limit")
+    parser.add_argument("--profile", nargs="?", const="asset-trace.json", metavar="TRACE",
+                        help="time every request stage and write a Chrome trace (default asset-trace.json)")
+    parser.add_argument("--metrics", nargs="?", const="asset-metrics", metavar="PREFIX",
+                        help="write per-image latency, bytes, retries and cache hits to PREFIX.json "
+                             "and PREFIX.prom (default asset-metrics)")
+    args = parser.parse_args()
+    DEADLINE = asset_schedule.Deadline(args.deadline)
+    FORCE = args.force
+    POSTPROCESS = not args.no_postprocess
+    POSTPROCESS_WORKERS = args.postprocess_workers
+    if args.preview and args.promote is not None:
+        parser.error("--preview and --promote are separate passes")
+    if args.variants < 1:
+        parser.error("--variants must be at least 1")
+    if args.variants > 1 and (args.preview or args.promote is not None):
+        parser.error("--variants can't be combined with --preview or --promote; "
+                     "their seeds only reproduce single images")
+    VARIANTS = args.variants
+    if args.workers < 1 or args.rate <= 0:
+        parser.error("--workers must be at least 1 and --rate must be positive")
+    if args.hedge is not None:
+        if not 0 < args.hedge < 100 or args.hedge_budget <= 0:
+            parser.error("--hedge takes a percentile between 0 and 100 and --hedge-budget must be positive")
+        HEDGE = together_client.HedgePolicy(args.hedge, args.hedge_budget)
+    for option in args.preview_scale:
+        category, _, scale = option.partition("=")
+        try:
+            PREVIEW_SCALE[category] = float(scale)
+        except ValueError:
+            parser.error(f"--preview-scale expects CATEGORY=SCALE, got {option!r}")
+        if category not in CATEGORIES or not 0 < PREVIEW_SCALE[category] <= 1:
+            parser.error(f"--preview-scale: unknown category or scale outside (0, 1]: {option!r}")
+    PREVIEWS = image_previews.load_index()
+    if args.preview:
+        PREVIEW = True
+        PREVIEW_STEPS = args.preview_steps
+        PREVIEW_MODEL = args.preview_model
+        OUTPUT_DIR = image_previews.PREVIEW_DIR
+        OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+    if args.promote is not None:
+        promote = args.promote or [name for name, entry in PREVIEWS.items() if entry.get("approved")]
+        unknown = [name for name in promote if name not in PREVIEWS]
+        if unknown:
+            parser.error(f"no preview for {', '.join(unknown)}")
+        if not promote:
+            parser.error(f"nothing approved in {image_previews.PREVIEW_DIR / image_previews.INDEX_NAME}; "
+                         "name the previews to promote")
+    if not args.no_cache:
+        CACHE = response_cache.ResponseCache(max_bytes=int(args.cache_mb * 2**20))
+    if args.retry_failed and args.no_journal:
+        parser.error("--retry-failed needs the job journal")
+    if not args.no_journal:
+        try:
+            JOURNAL = job_journal.JobJournal(args.journal)
+        except job_journal.JournalLocked as e:
+            parser.error(f"{e}; wait for it, or use --journal PATH or --no-journal")
+        RETRY_FAILED = args.retry_failed
+        counts = JOURNAL.counts()
+        interrupted = sum(counts[state] for state in job_journal.UNFINISHED)
+        if interrupted or counts["failed"]:
+            print(f"📓 Journal: {interrupted} interrupted, {counts['failed']} failed job(s) from earlier runs")
+    if args.use_async and importlib.util.find_spec("aiohttp") is None:
+        parser.error("--async needs aiohttp (pip install aiohttp)")
+    if args.profile:
+        asset_profile.enable()
+    if args.metrics:
+        asset_metrics.enable(script="generate-luxury-images", mode="preview" if PREVIEW else "final")
+    
+    start = time.perf_counter()
+    if args.promote is not None:
+        promote_previews(promote, args.workers, args.rate, args.use_async)
+    elif args.category:
         # Generate specific category
-        category = sys.argv[1].lower()
-        generate_single_category(category)
+        generate_single_category(args.category.lower(), args.workers, args.rate, args.use_async)
     else:
         # Generate all images
-        generate_all_images()
+        generate_all_images(args.workers, args.rate, args.use_async)
+    if PREVIEW:
+        write_contact_sheet([args.category.lower()] if args.category else CATEGORIES)
+    
+    if JOURNAL:
+        JOURNAL.close()
+    if args.profile:
+        asset_profile.report(args.profile, asset_profile.take_events())
+    if args.metrics:
+        asset_metrics.gauge("run_seconds", time.perf_counter() - start)
+        asset_metrics.report(args.metrics)
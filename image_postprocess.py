@@ -0,0 +1,152 @@
+"""
+GET A BIKE - API IMAGE POST-PROCESSING
+Pipelined format check, transcode, resize and metadata strip for downloaded images
+
+The API hands back whatever it renders (often PNG, always larger than the
+page shows) and the bytes used to land as-is behind a .jpg name.
+process_image() rewrites a downloaded file in place: it sniffs the real
+format, fits the image to the size the page displays it at, drops EXIF/XMP
+and comments, and re-encodes it in the format its suffix promises.
+
+PostProcessPipeline runs that on worker threads fed by a bounded queue, so
+images are processed while the rest of the batch is still downloading.
+Pillow releases the GIL while decoding, resampling and encoding.
+"""
+
+import io
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+
+from PIL import Image, ImageOps
+
+from asset_encoder import FORMATS, encode_bytes
+from image_stream import AtomicImageFile, sniff_image
+
+# Encoder quality for post-processed images
+DEFAULT_QUALITY = 85
+# Images waiting for a worker before submit() blocks the downloader
+QUEUE_FACTOR = 4
+
+
+def target_format(filename):
+    """asset_encoder format name promised by filename's suffix"""
+    suffix = Path(filename).suffix.lower()
+    if suffix == ".jpeg":
+        suffix = ".jpg"
+    for name, (_, fmt_suffix, _, _) in FORMATS.items():
+        if fmt_suffix == suffix:
+            return name
+    raise ValueError(f"no encoder for {suffix!r} files")
+
+
+def make_spec(filename, width, height=None, quality=DEFAULT_QUALITY):
+    """Processing settings for one image, JSON-serializable so they can key the manifest.
+
+    With both width and height the image is cropped to that aspect ratio
+    around its center (as object-fit: cover would show it) and resized;
+    with only width it is scaled down to fit. Images are never enlarged.
+    """
+    return {"format": target_format(filename), "width": width, "height": height, "quality": quality}
+
+
+def fit(img, width, height=None):
+    """img cropped and/or downscaled per make_spec's rules"""
+    if height is None:
+        if img.width <= width:
+            return img
+        return img.resize((width, round(img.height * width / img.width)), Image.LANCZOS)
+    # Crop to the display aspect first; never scale up past the source
+    scale = min(1.0, img.width / width, img.height / height)
+    size = (round(width * scale), round(height * scale))
+    return ImageOps.fit(img, size, Image.LANCZOS)
+
+
+def process_image(path, spec):
+    """Rewrite the image at path per spec, atomically; returns a summary dict"""
+    path = Path(path)
+    data = path.read_bytes()
+    source_format = sniff_image(data[:16])
+    if source_format is None:
+        raise ValueError(f"{path.name} is not a recognized image")
+    with Image.open(io.BytesIO(data)) as img:
+        source_size = img.size
+        # Honor the EXIF orientation before the tag is dropped
+        img = ImageOps.exif_transpose(img).convert("RGB")
+    img = fit(img, spec["width"], spec["height"])
+    # A fresh encode without exif=/icc_profile= leaves all metadata behind
+    start = time.perf_counter()
+    encoded = encode_bytes(img, spec["format"], spec["quality"])
+    encode_seconds = time.perf_counter() - start
+    with AtomicImageFile(path) as out:
+        out.write(encoded)
+        out.commit()
+    return {
+        "source_format": source_format,
+        "source_size": source_size,
+        "source_bytes": len(data),
+        "format": spec["format"],
+        "size": img.size,
+        "bytes": len(encoded),
+        "encode_seconds": encode_seconds,
+    }
+
+
+def describe(filename, result):
+    """One status line for a process_image result"""
+    (sw, sh), (w, h) = result["source_size"], result["size"]
+    return (f"🪄 Processed: {filename} - {result['source_format']} {sw}x{sh} "
+            f"{result['source_bytes'] / 1024:.0f}K -> {result['format']} {w}x{h} {result['bytes'] / 1024:.0f}K")
+
+
+class PostProcessPipeline:
+    """Worker threads running process_image on submitted files.
+
+    submit(path, spec, on_done) queues a file and returns at once unless
+    the queue is full; on_done(result, error) is called from the worker
+    with exactly one of them set. Use as a context manager: leaving the
+    block waits until every queued image is processed. `failed` lists
+    (path, error) for images whose processing or on_done raised.
+    """
+
+    def __init__(self, workers=None):
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.queue = queue.Queue(maxsize=self.workers * QUEUE_FACTOR)
+        self.failed = []
+        self.lock = threading.Lock()
+        self.threads = [threading.Thread(target=self._work, daemon=True) for _ in range(self.workers)]
+        for thread in self.threads:
+            thread.start()
+
+    def submit(self, path, spec, on_done):
+        self.queue.put((path, spec, on_done))
+
+    def _work(self):
+        while (item := self.queue.get()) is not None:
+            path, spec, on_done = item
+            result = error = None
+            try:
+                result = process_image(path, spec)
+            except Exception as e:
+                error = e
+            try:
+                on_done(result, error)
+            except Exception as e:
+                error = error or e
+            if error is not None:
+                with self.lock:
+                    self.failed.append((path, error))
+
+    def close(self):
+        for _ in self.threads:
+            self.queue.put(None)
+        for thread in self.threads:
+            thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
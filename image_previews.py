@@ -0,0 +1,95 @@
+"""
+GET A BIKE - PREVIEW PASS HELPERS
+Index, sizing and contact sheet for quick low-step previews of API prompts
+
+A preview pass renders every selected prompt small and with few steps into
+previews/, records each one's seed in previews/previews.json and lays them
+out on previews/contact-sheet.jpg. Marking an entry "approved": true (or
+naming it on the command line) lets the final pass render it at full
+quality with the same seed.
+"""
+
+import json
+import random
+from pathlib import Path
+
+from PIL import Image, ImageDraw, ImageFont
+
+from asset_manifest import write_json_atomic
+
+PREVIEW_DIR = Path("previews")
+INDEX_NAME = "previews.json"
+SHEET_NAME = "contact-sheet.jpg"
+
+# Fraction of the final size each category is previewed at
+DEFAULT_SCALE = 0.5
+# The API wants dimensions in multiples of this
+SIZE_STEP = 64
+MIN_SIZE = 256
+
+THUMB_WIDTH = 320
+LABEL_HEIGHT = 36
+GUTTER = 12
+SHEET_COLUMNS = 5
+SHEET_BACKGROUND = (10, 10, 10)
+LABEL_COLOR = (212, 175, 55)
+
+
+def preview_size(width, height, scale):
+    """Scaled (width, height), snapped to SIZE_STEP and at least MIN_SIZE"""
+    def snap(value):
+        return max(MIN_SIZE, round(value * scale / SIZE_STEP) * SIZE_STEP)
+    return snap(width), snap(height)
+
+
+def new_seed():
+    return random.randrange(1, 2**31)
+
+
+def load_index(preview_dir=PREVIEW_DIR):
+    """{filename: entry} for every preview rendered so far"""
+    try:
+        with open(Path(preview_dir) / INDEX_NAME, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_index(index, preview_dir=PREVIEW_DIR):
+    Path(preview_dir).mkdir(parents=True, exist_ok=True)
+    write_json_atomic(Path(preview_dir) / INDEX_NAME, index)
+
+
+def contact_sheet(entries, preview_dir=PREVIEW_DIR, columns=SHEET_COLUMNS):
+    """Tile the previews for `entries` ({filename: entry}) into the contact sheet.
+
+    Each thumbnail is labelled with its filename and seed, approved ones
+    with [x]. Returns the sheet's path, or None if no preview exists yet.
+    """
+    preview_dir = Path(preview_dir)
+    names = [name for name in entries if (preview_dir / name).exists()]
+    if not names:
+        return None
+    thumbs = []
+    for name in names:
+        with Image.open(preview_dir / name) as img:
+            img = img.convert("RGB")
+            img.thumbnail((THUMB_WIDTH, THUMB_WIDTH))
+            thumbs.append(img)
+    cell_width = THUMB_WIDTH + GUTTER
+    cell_height = max(thumb.height for thumb in thumbs) + LABEL_HEIGHT + GUTTER
+    columns = min(columns, len(thumbs))
+    rows = -(-len(thumbs) // columns)
+    sheet = Image.new("RGB", (columns * cell_width + GUTTER, rows * cell_height + GUTTER), SHEET_BACKGROUND)
+    draw = ImageDraw.Draw(sheet)
+    font = ImageFont.load_default()
+    for i, (name, thumb) in enumerate(zip(names, thumbs)):
+        x, y = GUTTER + (i % columns) * cell_width, GUTTER + (i // columns) * cell_height
+        sheet.paste(thumb, (x + (THUMB_WIDTH - thumb.width) // 2, y))
+        entry = entries[name]
+        mark = "[x] " if entry.get("approved") else ""
+        draw.text((x, y + thumb.height + 4), f"{mark}{name}", fill=LABEL_COLOR, font=font)
+        draw.text((x, y + thumb.height + 18), f"seed {entry['seed']}", fill=LABEL_COLOR, font=font)
+    path = preview_dir / SHEET_NAME
+    sheet.save(path, "JPEG", quality=85)
+    return path
@@ -0,0 +1,98 @@
+"""
+GET A BIKE - CANDIDATE SCORING
+Cheap local quality metrics for picking the best of several generated images
+
+With --variants N the API script asks for N candidates per prompt in one
+request. Each candidate is measured on a downscaled grayscale copy:
+
+- sharpness: variance of the Laplacian; blurry or smeared renders score low
+- exposure: share of pixels not clipped to black or white
+- detail: bytes per pixel of a fixed-quality JPEG; flat, empty frames
+  compress smallest
+
+Metrics are min-max normalized across the candidates of one prompt and
+combined with WEIGHTS, so a score only ranks candidates against each other.
+
+    python image_scoring.py public/assets/bike-1.jpg candidates/*.jpg
+"""
+
+import argparse
+import io
+import sys
+from pathlib import Path
+
+from PIL import Image, ImageFilter
+
+# Long side of the copy every metric is computed on
+ANALYSIS_SIZE = 512
+# Luma at or below / at or above these counts as clipped
+SHADOW_CLIP = 2
+HIGHLIGHT_CLIP = 253
+DETAIL_QUALITY = 75
+
+WEIGHTS = {"sharpness": 0.45, "exposure": 0.35, "detail": 0.2}
+
+LAPLACIAN = ImageFilter.Kernel((3, 3), [0, 1, 0, 1, -4, 1, 0, 1, 0], scale=1, offset=128)
+
+
+def measure(path):
+    """{metric: raw value} for the image at path"""
+    with Image.open(path) as img:
+        gray = img.convert("L")
+    gray.thumbnail((ANALYSIS_SIZE, ANALYSIS_SIZE), Image.BILINEAR)
+    pixels = gray.width * gray.height
+
+    edges = gray.filter(LAPLACIAN).histogram()
+    mean = sum(i * n for i, n in enumerate(edges)) / pixels
+    sharpness = sum(n * (i - mean) ** 2 for i, n in enumerate(edges)) / pixels
+
+    histogram = gray.histogram()
+    clipped = sum(histogram[:SHADOW_CLIP + 1]) + sum(histogram[HIGHLIGHT_CLIP:])
+
+    buf = io.BytesIO()
+    gray.save(buf, "JPEG", quality=DETAIL_QUALITY)
+    return {
+        "sharpness": sharpness,
+        "exposure": 1 - clipped / pixels,
+        "detail": len(buf.getvalue()) / pixels,
+    }
+
+
+def scores(measurements, weights=WEIGHTS):
+    """Weighted score in [0, 1] for each measurement, relative to the others"""
+    totals = [0.0] * len(measurements)
+    for metric, weight in weights.items():
+        values = [m[metric] for m in measurements]
+        low, high = min(values), max(values)
+        for i, value in enumerate(values):
+            # A metric every candidate shares doesn't separate them
+            totals[i] += weight * ((value - low) / (high - low) if high > low else 1.0)
+    return totals
+
+
+def pick_best(paths, weights=WEIGHTS):
+    """(index of the best image, scores, measurements) for a list of image paths"""
+    measurements = [measure(path) for path in paths]
+    ranked = scores(measurements, weights)
+    best = max(range(len(paths)), key=ranked.__getitem__)
+    return best, ranked, measurements
+
+
+def describe(measurement, score):
+    return (f"score {score:.2f} (sharpness {measurement['sharpness']:.0f}, "
+            f"exposure {measurement['exposure']:.1%}, detail {measurement['detail']:.2f} B/px)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score candidate images against each other")
+    parser.add_argument("images", nargs="+", help="candidates of one prompt")
+    args = parser.parse_args(argv)
+    best, ranked, measurements = pick_best(args.images)
+    for i, path in enumerate(args.images):
+        mark = "*" if i == best else " "
+        print(f"{mark} {Path(path).name:<32} {describe(measurements[i], ranked[i])}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,244 @@
+"""
+GET A BIKE - STREAMING IMAGE WRITER
+Decode a b64_json API response straight to disk, atomically
+
+Together returns each image base64-encoded inside a JSON body. Instead of
+parsing the whole body and holding both the base64 text and the decoded
+bytes, B64JsonDecoder scans the byte stream for the "b64_json" value and
+decodes it chunk by chunk, so memory per request stays at one chunk.
+
+AtomicImageFile collects the bytes in a temp file outside public/assets,
+checks the image signature, fsyncs and renames it into place. An
+interrupted download never leaves a truncated image at the final path.
+ImageResponseFile combines the two for a response body, and
+ImageResponseFiles splits an n>1 reply into one file per image.
+"""
+
+import base64
+import binascii
+import os
+import tempfile
+from pathlib import Path
+
+# Read size for streamed response bodies
+CHUNK_SIZE = 64 * 1024
+
+# Temp files live here, on the same filesystem as the output, but outside
+# the directory the site serves
+TEMP_DIR = Path(".asset-tmp")
+
+SIGNATURES = (
+    (b"\xff\xd8\xff", "jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"RIFF", "webp"),
+)
+
+
+def sniff_image(header):
+    """Image format for the first bytes of a file, or None"""
+    for magic, name in SIGNATURES:
+        if header.startswith(magic):
+            if name == "webp" and header[8:12] != b"WEBP":
+                continue
+            return name
+    return None
+
+
+class B64JsonDecoder:
+    """Incrementally extract and decode the first "b64_json" string of a JSON body.
+
+    feed() takes raw body chunks and returns the image bytes decoded so far;
+    finish() returns the rest and raises ValueError if the field was missing
+    or cut off. Once the value is complete, `tail` holds the body bytes that
+    followed it in the last chunk.
+    """
+
+    KEY = b'"b64_json"'
+
+    def __init__(self):
+        self.state = "key"
+        self.buffer = b""
+        self.pending = b""
+        self.tail = b""
+
+    def feed(self, chunk):
+        data = self.buffer + chunk
+        self.buffer = b""
+        if self.state == "key":
+            index = data.find(self.KEY)
+            if index < 0:
+                # Keep enough of the tail to match a key split across chunks
+                self.buffer = data[-(len(self.KEY) - 1):]
+                return b""
+            data = data[index + len(self.KEY):]
+            self.state = "colon"
+        if self.state == "colon":
+            data = data.lstrip(b" \t\r\n")
+            if not data:
+                return b""
+            if not data.startswith(b":"):
+                raise ValueError("malformed b64_json field")
+            data = data[1:]
+            self.state = "quote"
+        if self.state == "quote":
+            data = data.lstrip(b" \t\r\n")
+            if not data:
+                return b""
+            if not data.startswith(b'"'):
+                raise ValueError("b64_json is not a string")
+            data = data[1:]
+            self.state = "value"
+        if self.state == "value":
+            end = data.find(b'"')
+            if end >= 0:
+                self.tail = data[end + 1:]
+                data = data[:end]
+                self.state = "done"
+            return self._decode(data)
+        return b""
+
+    def _decode(self, text):
+        # JSON may escape "/" as "\/"; base64 never contains a backslash
+        text = self.pending + text.replace(b"\\", b"")
+        usable = len(text) - len(text) % 4 if self.state == "value" else len(text)
+        self.pending = text[usable:]
+        try:
+            return base64.b64decode(text[:usable], validate=True)
+        except binascii.Error as e:
+            raise ValueError(f"invalid base64 image data: {e}") from None
+
+    def finish(self):
+        if self.state == "key":
+            raise ValueError("no image data in response")
+        if self.state != "done":
+            raise ValueError("image data cut off")
+        return b""
+
+
+class AtomicImageFile:
+    """Write-then-rename file for one image; use as a context manager.
+
+    Nothing appears at `path` unless commit() succeeds. Leaving the block
+    without committing (or with an exception) deletes the temp file.
+    """
+
+    def __init__(self, path, temp_dir=TEMP_DIR):
+        self.path = Path(path)
+        self.temp_dir = Path(temp_dir)
+        self.header = b""
+        self.size = 0
+        self.file = None
+        self.temp_path = None
+
+    def __enter__(self):
+        self.temp_dir.mkdir(parents=True, exist_ok=True)
+        fd, self.temp_path = tempfile.mkstemp(dir=self.temp_dir, prefix=f"{self.path.stem}-",
+                                              suffix=".part")
+        self.file = os.fdopen(fd, "wb")
+        return self
+
+    def write(self, data):
+        if len(self.header) < 16:
+            self.header += data[:16 - len(self.header)]
+        self.size += len(data)
+        self.file.write(data)
+
+    def commit(self):
+        """Validate, flush to disk and move into place; returns the image format"""
+        image_format = sniff_image(self.header)
+        if image_format is None:
+            raise ValueError(f"response is not an image ({self.size} bytes)")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.file.close()
+        os.replace(self.temp_path, self.path)
+        self.temp_path = None
+        # Persist the rename itself
+        try:
+            dir_fd = os.open(self.path.parent, os.O_RDONLY)
+        except OSError:
+            return image_format
+        try:
+            os.fsync(dir_fd)
+        except OSError:
+            pass
+        finally:
+            os.close(dir_fd)
+        return image_format
+
+    def __exit__(self, *exc_info):
+        if not self.file.closed:
+            self.file.close()
+        if self.temp_path is not None:
+            os.unlink(self.temp_path)
+
+
+class ImageResponseFile(AtomicImageFile):
+    """AtomicImageFile fed raw response-body chunks of a b64_json reply"""
+
+    def __init__(self, path, temp_dir=TEMP_DIR):
+        super().__init__(path, temp_dir)
+        self.decoder = B64JsonDecoder()
+
+    def feed(self, chunk):
+        self.write(self.decoder.feed(chunk))
+
+    def commit(self):
+        self.write(self.decoder.finish())
+        return super().commit()
+
+
+class ImageResponseFiles:
+    """Write every b64_json image of one reply (n > 1) to its own path, atomically.
+
+    Image i goes to paths[i]; extra images in the body are ignored. Use as
+    a context manager. commit() moves the complete images into place and
+    returns their paths, so a reply with fewer images than paths still
+    yields what it had.
+    """
+
+    def __init__(self, paths, temp_dir=TEMP_DIR):
+        self.paths = [Path(path) for path in paths]
+        self.temp_dir = temp_dir
+        self.files = []
+        self.decoder = None
+
+    def __enter__(self):
+        return self
+
+    def _next_file(self):
+        if len(self.files) == len(self.paths):
+            return False
+        self.files.append(AtomicImageFile(self.paths[len(self.files)], self.temp_dir).__enter__())
+        self.decoder = B64JsonDecoder()
+        return True
+
+    def feed(self, chunk):
+        if self.decoder is None and not self._next_file():
+            return
+        while chunk:
+            if self.decoder.state == "done":
+                return
+            self.files[-1].write(self.decoder.feed(chunk))
+            if self.decoder.state != "done":
+                return
+            chunk = self.decoder.tail
+            if not self._next_file():
+                return
+
+    def commit(self):
+        """Move every complete image into place; returns their paths in order"""
+        if self.decoder is None or (self.decoder.state == "key" and len(self.files) == 1):
+            raise ValueError("no image data in response")
+        if self.decoder.state != "done":
+            # Only the last file can be unfinished: past the final image, or cut off
+            if self.decoder.state != "key":
+                raise ValueError("image data cut off")
+            self.files.pop().__exit__(None, None, None)
+        for file in self.files:
+            file.commit()
+        return [file.path for file in self.files]
+
+    def __exit__(self, *exc_info):
+        for file in self.files:
+            file.__exit__(*exc_info)
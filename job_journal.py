@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+GET A BIKE - GENERATION JOB JOURNAL
+Append-only record of every API job, so an interrupted run can pick up where it stopped
+
+Each line of .image-journal.jsonl is one state change for one job (a
+request, identified by its manifest key):
+
+    queued     the run picked the job up; `force` says it was a --force run
+    in-flight  the request was sent
+    done       the image is on disk; `sha256` is its hash
+    failed     the request gave up; `error` says why
+
+Lines are flushed and fsynced as they are written, so after a crash or
+Ctrl-C the last line for each job still says how far it got. A run that
+writes the journal holds an exclusive lock on it (.image-journal.jsonl.lock)
+and compacts it to one line per job when it opens it; reading it, as the
+commands below do, neither locks nor rewrites it.
+
+    python job_journal.py              # counts by state
+    python job_journal.py --failed     # failed jobs and their errors
+"""
+
+import argparse
+import fcntl
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+JOURNAL_PATH = Path(".image-journal.jsonl")
+
+STATES = ("queued", "in-flight", "done", "failed")
+UNFINISHED = ("queued", "in-flight")
+
+
+class JournalLocked(Exception):
+    """Raised when another process already has the journal open for writing"""
+
+
+class JobJournal:
+    """Latest state of each job, backed by an append-only JSONL file.
+
+    Safe to share between the threads of one process. Opened for writing,
+    it holds an exclusive lock until close(), so one process at a time
+    appends to and compacts the file; with `read_only=True` it only
+    replays the file and record() can't be used.
+    """
+
+    def __init__(self, path=JOURNAL_PATH, read_only=False):
+        self.path = Path(path)
+        self.lock = threading.Lock()
+        self.file = self.lock_file = None
+        if not read_only:
+            self._lock()
+        self.jobs = self._replay()
+        if not read_only:
+            self._compact()
+            self.file = open(self.path, "a", encoding="utf-8")
+
+    def _lock(self):
+        # A separate file, since compaction replaces the journal itself
+        self.lock_file = open(self.path.with_name(f".{self.path.name}.lock"), "w")
+        try:
+            fcntl.flock(self.lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            self.lock_file.close()
+            raise JournalLocked(f"{self.path} is in use by another run") from None
+
+    def _replay(self):
+        jobs = {}
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # A line cut off by a crash mid-write
+                        continue
+                    previous = jobs.get(record["job"], {})
+                    if record["state"] != "queued" and "force" in previous:
+                        record.setdefault("force", previous["force"])
+                    jobs[record["job"]] = record
+        except OSError:
+            pass
+        return jobs
+
+    def _compact(self):
+        if not self.jobs:
+            return
+        tmp_path = self.path.with_name(f".{self.path.name}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for record in sorted(self.jobs.values(), key=lambda r: r["time"]):
+                f.write(json.dumps(record, sort_keys=True) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def record(self, job, state, **fields):
+        """Append a state change for job; fields (filename, sha256, error...) are stored with it"""
+        record = {"time": time.time(), "job": job, "state": state, **fields}
+        with self.lock:
+            previous = self.jobs.get(job, {})
+            if state != "queued" and "force" in previous:
+                record.setdefault("force", previous["force"])
+            self.jobs[job] = record
+            self.file.write(json.dumps(record, sort_keys=True) + "\n")
+            self.file.flush()
+            os.fsync(self.file.fileno())
+
+    def state(self, job):
+        """Last recorded state of job, or None if it was never journaled"""
+        record = self.jobs.get(job)
+        return record["state"] if record else None
+
+    def interrupted_force(self, job):
+        """True if a --force run queued job but never finished it"""
+        record = self.jobs.get(job)
+        return bool(record and record["state"] != "done" and record.get("force"))
+
+    def counts(self):
+        return Counter(record["state"] for record in self.jobs.values())
+
+    def records(self, state=None):
+        """Latest records, oldest first, optionally only those in `state`"""
+        return sorted((r for r in self.jobs.values() if state is None or r["state"] == state),
+                      key=lambda r: r["time"])
+
+    def close(self):
+        if self.file:
+            self.file.close()
+        if self.lock_file:
+            self.lock_file.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Show the image generation job journal")
+    parser.add_argument("--path", default=str(JOURNAL_PATH), help=f"journal file (default {JOURNAL_PATH})")
+    parser.add_argument("--failed", action="store_true", help="list failed jobs with their errors")
+    args = parser.parse_args(argv)
+
+    if not Path(args.path).exists():
+        print(f"No journal at {args.path}")
+        return 0
+    journal = JobJournal(args.path, read_only=True)
+    counts = journal.counts()
+    print(", ".join(f"{counts[state]} {state}" for state in STATES))
+    for record in journal.records("failed" if args.failed else None):
+        if args.failed or record["state"] != "done":
+            detail = record.get("error", "")
+            print(f"{record['state']:<10} {record.get('filename', '?'):<28} {record['job'][:12]}  {detail}")
+    journal.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
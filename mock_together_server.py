@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+GET A BIKE - MOCK TOGETHER API
+Local stand-in for /v1/images/generations, for tests and load tests
+
+Answers generation requests with a synthetic JPEG (or PNG) of the requested size
+after a simulated latency, and can inject failures the real endpoint
+produces under load:
+
+    python mock_together_server.py --port 8765 --latency lognormal:1.5,0.4 \\
+        --throttle-rate 0.05 --error-rate 0.02 --max-concurrent 6 --body-rate 512k
+
+Point the generator at it with TOGETHER_API_URL=http://127.0.0.1:8765/v1/images/generations.
+GET /stats returns request counts by status.
+"""
+
+import argparse
+import base64
+import io
+import json
+import math
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from PIL import Image, ImageFilter
+
+GENERATIONS_PATH = "/v1/images/generations"
+ERROR_STATUSES = (500, 502, 503, 504)
+# Most images returned for one request's "n"
+MAX_N = 8
+
+
+def parse_latency(spec):
+    """Latency sampler from 'fixed:S', 'uniform:LO,HI' or 'lognormal:MEDIAN,SIGMA' (seconds)"""
+    kind, _, params = spec.partition(":")
+    try:
+        values = [float(v) for v in params.split(",")] if params else []
+        if kind == "fixed" and len(values) == 1:
+            return lambda: values[0]
+        if kind == "uniform" and len(values) == 2:
+            return lambda: random.uniform(*values)
+        if kind == "lognormal" and len(values) == 2:
+            mu = math.log(values[0])
+            return lambda: random.lognormvariate(mu, values[1])
+    except ValueError:
+        pass
+    raise ValueError(f"bad latency spec {spec!r}; use fixed:S, uniform:LO,HI or lognormal:MEDIAN,SIGMA")
+
+
+def parse_rate(text):
+    """Bytes per second from '65536', '512k' or '2m'; 0 means unthrottled"""
+    text = text.strip().lower()
+    scale = {"k": 1024, "m": 1024 ** 2}.get(text[-1:], 1)
+    return int(float(text.rstrip("km")) * scale)
+
+
+@lru_cache(maxsize=32)
+def synthetic_image(width, height, image_format="jpeg", variant=0):
+    """A base64 noise image of the given size, roughly as large as a real generation.
+
+    Each `variant` is a different image, softened a little more than the
+    last, so candidates of an n > 1 request score differently.
+    """
+    noise = Image.effect_noise((width, height), 64).convert("RGB")
+    if variant:
+        noise = noise.filter(ImageFilter.GaussianBlur(variant * 0.5))
+    buf = io.BytesIO()
+    if image_format == "png":
+        noise.save(buf, "PNG")
+    else:
+        noise.save(buf, "JPEG", quality=85)
+    return base64.b64encode(buf.getvalue())
+
+
+class MockConfig:
+    def __init__(self, latency="fixed:0.2", throttle_rate=0.0, error_rate=0.0,
+                 max_concurrent=0, retry_after=1, body_rate=0, image_format="jpeg", max_size=2048):
+        self.latency = parse_latency(latency)
+        self.throttle_rate = throttle_rate
+        self.error_rate = error_rate
+        self.max_concurrent = max_concurrent
+        self.retry_after = retry_after
+        self.body_rate = body_rate
+        self.image_format = image_format
+        # Synthetic images are capped at this size per side to bound server memory
+        self.max_size = max_size
+
+
+class MockTogetherServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, config):
+        super().__init__(address, MockHandler)
+        self.config = config
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.statuses = Counter()
+
+    def count(self, status):
+        with self.lock:
+            self.statuses[status] += 1
+
+    def handle_error(self, request, client_address):
+        # Clients hanging up on idle keep-alive connections is routine
+        if not isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            super().handle_error(request, client_address)
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, body, headers=()):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+        self.server.count(status)
+
+    def do_GET(self):
+        if self.path == "/stats":
+            with self.server.lock:
+                stats = {str(status): n for status, n in self.server.statuses.items()}
+            self.send_json(200, stats)
+        else:
+            self.send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self.path != GENERATIONS_PATH:
+            self.send_json(404, {"error": "not found"})
+            return
+        payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        server, config = self.server, self.server.config
+        with server.lock:
+            server.in_flight += 1
+            over_limit = config.max_concurrent and server.in_flight > config.max_concurrent
+        try:
+            if over_limit or random.random() < config.throttle_rate:
+                self.send_json(429, {"error": "rate limited"}, [("Retry-After", str(config.retry_after))])
+                return
+            time.sleep(config.latency())
+            if random.random() < config.error_rate:
+                self.send_json(random.choice(ERROR_STATUSES), {"error": "injected failure"})
+                return
+            self.send_image(payload)
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def send_image(self, payload):
+        config = self.server.config
+        width = min(int(payload.get("width", 1024)), config.max_size)
+        height = min(int(payload.get("height", 1024)), config.max_size)
+        count = max(1, min(int(payload.get("n", 1)), MAX_N))
+        head = json.dumps({"id": "mock", "model": payload.get("model"), "object": "list",
+                           "data": [{"index": i, "b64_json": ""} for i in range(count)]}).encode()
+        # Splice the base64 in without building a second copy of the body
+        parts = []
+        marker = b'"b64_json": "'
+        for i in range(count):
+            split = head.index(marker) + len(marker)
+            parts += [head[:split], synthetic_image(width, height, config.image_format, i)]
+            head = head[split:]
+        parts.append(head)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(sum(len(p) for p in parts)))
+        self.end_headers()
+        chunk = 16 * 1024
+        for part in parts:
+            for start in range(0, len(part), chunk):
+                self.wfile.write(part[start:start + chunk])
+                if config.body_rate:
+                    time.sleep(min(chunk, len(part) - start) / config.body_rate)
+        self.server.count(200)
+
+
+def start_server(config, host="127.0.0.1", port=0):
+    """Serve in a daemon thread; returns the server (its URL port is server.server_port)"""
+    server = MockTogetherServer((host, port), config)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def add_arguments(parser):
+    """Mock behaviour options, shared with the load-test harness"""
+    parser.add_argument("--latency", default="fixed:0.2",
+                        help="fixed:S, uniform:LO,HI or lognormal:MEDIAN,SIGMA in seconds (default fixed:0.2)")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="fraction of requests answered 429")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered 5xx")
+    parser.add_argument("--max-concurrent", type=int, default=0,
+                        help="answer 429 above this many requests in flight (0 = unlimited)")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--body-rate", default="0", help="stream bodies at this many bytes/s, e.g. 512k")
+    parser.add_argument("--image-format", choices=("jpeg", "png"), default="jpeg",
+                        help="encoding of the returned images (default jpeg)")
+
+
+def config_from_args(args):
+    return MockConfig(args.latency, args.throttle_rate, args.error_rate, args.max_concurrent,
+                      args.retry_after, parse_rate(args.body_rate), args.image_format)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a mock Together image generation API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765, help="0 picks a free port")
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+    try:
+        config = config_from_args(args)
+    except ValueError as e:
+        parser.error(str(e))
+
+    server = MockTogetherServer((args.host, args.port), config)
+    print(f"Mock Together API on http://{args.host}:{server.server_port}{GENERATIONS_PATH}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
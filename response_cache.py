@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+GET A BIKE - GENERATED IMAGE CACHE
+Content-addressed store of API results so the same request is never paid twice
+
+Every image the API returns is kept under .image-cache/, keyed by the
+request fields that determine it (model, prompt, width, height, steps,
+seed, and n when the image is the best of several candidates). Renaming
+an output, switching checkouts or rebuilding a fresh clone then
+materializes the file from the cache with a copy instead of calling the
+API. Outputs never share an inode with the cache, so the generators can
+rewrite them in place; cached objects are read-only and checked against
+their recorded size before use. The least recently used entries are
+evicted once the cache grows past its byte cap.
+
+    python response_cache.py list
+    python response_cache.py prune --max-mb 500 --older-than-days 30
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from asset_manifest import input_key, write_json_atomic
+
+CACHE_DIR = Path(".image-cache")
+INDEX_NAME = "index.json"
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+# Cached objects are read-only so nothing edits them behind the index
+OBJECT_MODE = 0o444
+
+# Request fields that determine the generated image; with n > 1 the
+# cached image is the best of n candidates, so n is part of the key
+KEY_FIELDS = ("model", "prompt", "width", "height", "steps", "seed", "n")
+
+
+def cache_key(payload):
+    """Cache key for an API request payload; fields outside KEY_FIELDS are ignored"""
+    fields = {field: payload.get(field) for field in KEY_FIELDS}
+    if fields["n"] in (None, 1):
+        # Single-image requests keep the keys cached before n was added
+        del fields["n"]
+    return input_key(fields)
+
+
+def candidate_key(payload, index):
+    """Cache key for candidate `index` of an n > 1 request that was not picked"""
+    return input_key(cache_key(payload), "candidate", index)
+
+
+def copy_atomic(source, dest, mode=None):
+    """Atomically place a copy of source at dest, with permissions `mode` if given"""
+    dest = Path(dest)
+    fd, tmp_path = tempfile.mkstemp(dir=dest.parent, prefix=f".{dest.stem}-", suffix=".tmp")
+    os.close(fd)
+    try:
+        shutil.copyfile(source, tmp_path)
+        if mode is not None:
+            os.chmod(tmp_path, mode)
+        os.replace(tmp_path, dest)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class ResponseCache:
+    """LRU image cache in `root`, capped at `max_bytes`.
+
+    Safe to share between the threads of one process; the index is
+    rewritten atomically after every change.
+    """
+
+    def __init__(self, root=CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.index = self._load()
+
+    def _load(self):
+        try:
+            with open(self.root / INDEX_NAME, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self):
+        self.root.mkdir(parents=True, exist_ok=True)
+        write_json_atomic(self.root / INDEX_NAME, self.index)
+
+    def _object_path(self, key):
+        return self.root / "objects" / key[:2] / self.index[key]["file"]
+
+    def get(self, key):
+        """Path of the cached image for key (marking it recently used), or None"""
+        with self.lock:
+            if key not in self.index:
+                return None
+            path = self._object_path(key)
+            try:
+                intact = path.stat().st_size == self.index[key]["bytes"]
+            except OSError:
+                intact = False
+            if not intact:
+                # Missing or changed since it was cached: never serve it
+                self._remove(key)
+                self._save()
+                return None
+            self.index[key]["last_used"] = time.time()
+            self._save()
+            return path
+
+    def materialize(self, key, dest):
+        """Place the cached image for key at dest; False on a cache miss"""
+        path = self.get(key)
+        if path is None:
+            return False
+        copy_atomic(path, dest)
+        return True
+
+    def latest(self, filename, **fields):
+        """Key of the newest cached image stored for this output filename, or None.
+
+        Only entries whose recorded `fields` (e.g. model, steps, width,
+        height) all equal the given values count; an entry that didn't
+        record a field never matches it. Candidates that lost to another
+        image of their request are skipped.
+        """
+        with self.lock:
+            matches = [(entry["created"], key) for key, entry in self.index.items()
+                       if entry.get("filename") == filename and "candidate" not in entry
+                       and all(field in entry and entry[field] == value for field, value in fields.items())]
+        return max(matches)[1] if matches else None
+
+    def put(self, key, source, **meta):
+        """Add the file at source under key, then evict down to max_bytes"""
+        source = Path(source)
+        with self.lock:
+            name = key + source.suffix
+            path = self.root / "objects" / key[:2] / name
+            path.parent.mkdir(parents=True, exist_ok=True)
+            copy_atomic(source, path, OBJECT_MODE)
+            now = time.time()
+            self.index[key] = {
+                "file": name,
+                "bytes": path.stat().st_size,
+                "created": now,
+                "last_used": now,
+                **meta,
+            }
+            self._evict(self.max_bytes, keep=key)
+            self._save()
+
+    def _evict(self, max_bytes, keep=None, older_than=None):
+        """Drop entries older than `older_than` seconds, then LRU down to max_bytes"""
+        removed = []
+        by_age = sorted(self.index, key=lambda k: self.index[k]["last_used"])
+        total = sum(entry["bytes"] for entry in self.index.values())
+        now = time.time()
+        for key in by_age:
+            if key == keep:
+                continue
+            stale = older_than is not None and now - self.index[key]["last_used"] > older_than
+            if not stale and (max_bytes is None or total <= max_bytes):
+                continue
+            total -= self.index[key]["bytes"]
+            removed.append((key, self._remove(key)))
+        return removed
+
+    def _remove(self, key):
+        """Drop key's entry and object file; returns the entry"""
+        path = self._object_path(key)
+        try:
+            path.unlink()
+            path.parent.rmdir()
+        except OSError:
+            # Missing file, or other entries still share the directory
+            pass
+        return self.index.pop(key)
+
+    def prune(self, max_bytes=None, older_than=None):
+        """Evict by size and/or age; returns the removed (key, entry) pairs"""
+        with self.lock:
+            removed = self._evict(max_bytes, older_than=older_than)
+            self._save()
+        return removed
+
+    def entries(self):
+        """(key, entry) pairs, most recently used first"""
+        return sorted(self.index.items(), key=lambda item: item[1]["last_used"], reverse=True)
+
+    def total_bytes(self):
+        return sum(entry["bytes"] for entry in self.index.values())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect or prune the generated image cache")
+    parser.add_argument("--dir", default=str(CACHE_DIR), help=f"cache directory (default {CACHE_DIR})")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="show cached images, most recently used first")
+    prune = commands.add_parser("prune", help="evict least recently used images")
+    prune.add_argument("--max-mb", type=float, help="shrink the cache to this many MiB")
+    prune.add_argument("--older-than-days", type=float, help="drop images unused for this many days")
+    args = parser.parse_args(argv)
+
+    cache = ResponseCache(args.dir)
+    if args.command == "list":
+        now = time.time()
+        for key, entry in cache.entries():
+            idle_days = (now - entry["last_used"]) / 86400
+            print(f"{key[:12]}  {entry['bytes'] / 1024:>9.1f}K  {idle_days:>6.1f}d idle  "
+                  f"{entry.get('filename', '?'):<28} {entry.get('width', '?')}x{entry.get('height', '?')}")
+        print(f"{len(cache.index)} images, {cache.total_bytes() / 2**20:.1f} MiB in {cache.root}")
+        return 0
+
+    if args.max_mb is None and args.older_than_days is None:
+        parser.error("prune needs --max-mb and/or --older-than-days")
+    max_bytes = int(args.max_mb * 2**20) if args.max_mb is not None else None
+    older_than = args.older_than_days * 86400 if args.older_than_days is not None else None
+    removed = cache.prune(max_bytes, older_than)
+    freed = sum(entry["bytes"] for _, entry in removed)
+    print(f"Removed {len(removed)} images ({freed / 2**20:.1f} MiB); "
+          f"{len(cache.index)} left, {cache.total_bytes() / 2**20:.1f} MiB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
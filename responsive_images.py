@@ -0,0 +1,101 @@
+"""
+GET A BIKE - RESPONSIVE IMAGE VARIANTS
+Builds a downscale pyramid from one full-size render and a srcset manifest
+
+Each asset is rendered once at its largest size. save_variants() writes
+bike-1-320w.jpg, bike-1-640w.jpg, ... next to it, and update_srcset() records
+them in public/assets/srcset.json, ready to drop into <img srcset> / sizes.
+"""
+
+import json
+from pathlib import Path
+
+from PIL import Image
+
+from asset_manifest import write_json_atomic
+
+# Target widths for responsive variants; widths >= the original are skipped
+VARIANT_WIDTHS = (320, 640, 960, 1280, 1920)
+SRCSET_NAME = "srcset.json"
+URL_PREFIX = "/assets/"
+
+
+def variant_name(filename, width):
+    """bike-1.jpg -> bike-1-640w.jpg"""
+    path = Path(filename)
+    return f"{path.stem}-{width}w{path.suffix}"
+
+
+def build_pyramid(img, widths=VARIANT_WIDTHS):
+    """Downscaled copies of img as [(width, image)], largest first.
+
+    Each level is resampled with Lanczos from the smallest already-built
+    level that is still at least twice its width (or the original), which
+    keeps quality high while the big levels do most of the work only once.
+    """
+    width, height = img.size
+    levels = []
+    sources = [img]
+    for target in sorted((w for w in widths if w < width), reverse=True):
+        source = next(s for s in reversed(sources) if s is img or s.width >= 2 * target)
+        size = (target, max(1, round(height * target / width)))
+        level = source.resize(size, Image.LANCZOS)
+        levels.append((target, level))
+        sources.append(level)
+    return levels
+
+
+def save_variants(img, output_dir, filename, save, widths=VARIANT_WIDTHS):
+    """Write the pyramid for an already-saved full-size image.
+
+    `save(image, path)` encodes one file, so variants share the generator's
+    encoder settings. Returns the srcset entry for update_srcset().
+    """
+    variants = []
+    for width, level in build_pyramid(img, widths):
+        name = variant_name(filename, width)
+        save(level, Path(output_dir) / name)
+        variants.append({"src": URL_PREFIX + name, "width": width, "height": level.height})
+    variants.reverse()
+    variants.append({"src": URL_PREFIX + filename, "width": img.width, "height": img.height})
+    return {
+        "src": URL_PREFIX + filename,
+        "width": img.width,
+        "height": img.height,
+        "variants": variants,
+        "srcset": ", ".join(f"{v['src']} {v['width']}w" for v in variants),
+    }
+
+
+def add_sources(entry, sources):
+    """Add <picture> <source> sets for sibling encodings of every variant.
+
+    `sources` is [(mime_type, suffix)], e.g. [("image/webp", ".webp")]; the
+    files themselves must already sit next to the JPEGs.
+    """
+    for mime, suffix in sources:
+        srcset = ", ".join(
+            f"{Path(v['src']).with_suffix(suffix).as_posix()} {v['width']}w" for v in entry["variants"]
+        )
+        entry.setdefault("sources", []).append({"type": mime, "srcset": srcset})
+    return entry
+
+
+def variant_files(entry):
+    """Filenames of the downscaled variants and alternate encodings in a srcset entry"""
+    files = [v["src"][len(URL_PREFIX):] for v in entry["variants"][:-1]]
+    for source in entry.get("sources", []):
+        files += [item.split()[0][len(URL_PREFIX):] for item in source["srcset"].split(", ")]
+    return files
+
+
+def update_srcset(output_dir, entries):
+    """Merge {filename: entry} into the srcset manifest"""
+    path = Path(output_dir) / SRCSET_NAME
+    try:
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = {}
+    manifest.update(entries)
+    write_json_atomic(path, manifest)
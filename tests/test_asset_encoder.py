@@ -0,0 +1,32 @@
+import pytest
+from PIL import Image
+
+import asset_encoder
+
+
+def make_image(path):
+    Image.new("RGB", (32, 24), (40, 40, 48)).save(path, quality=95)
+    return path.read_bytes()
+
+
+def test_inputs_are_never_overwritten(tmp_path):
+    src = tmp_path / "bike-1.jpg"
+    original = make_image(src)
+
+    with pytest.raises(SystemExit):
+        asset_encoder.main([str(src), "--formats", "jpeg,webp"])
+    with pytest.raises(SystemExit):
+        asset_encoder.main([str(src), "--formats", "jpeg", "--out-dir", str(tmp_path)])
+    assert src.read_bytes() == original
+    assert not (tmp_path / "bike-1.webp").exists()
+
+
+def test_other_formats_are_written_next_to_the_input(tmp_path):
+    src = tmp_path / "bike-1.jpg"
+    original = make_image(src)
+
+    assert asset_encoder.main([str(src), "--formats", "webp"]) == 0
+    assert (tmp_path / "bike-1.webp").exists()
+    assert asset_encoder.main([str(src), "--formats", "jpeg", "--out-dir", str(tmp_path / "out")]) == 0
+    assert (tmp_path / "out" / "bike-1.jpg").exists()
+    assert src.read_bytes() == original
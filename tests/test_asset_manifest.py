@@ -0,0 +1,34 @@
+import importlib
+import sys
+
+import pytest
+
+import asset_manifest
+
+
+@pytest.fixture
+def render_modules(tmp_path, monkeypatch):
+    """A render module that draws through a helper module, both 'in the repo'"""
+    (tmp_path / "sprite_helpers.py").write_text(
+        "SUPERSAMPLE = 4\n\n\ndef stamp(size):\n    return size * SUPERSAMPLE\n")
+    (tmp_path / "render_assets.py").write_text(
+        "import sprite_helpers\nfrom sprite_helpers import stamp\n\n\n"
+        "def render_bike(size):\n    return stamp(size)\n\n\n"
+        "def render_wheel(size):\n    return size * sprite_helpers.SUPERSAMPLE\n")
+    monkeypatch.setattr(asset_manifest, "REPO_ROOT", tmp_path.resolve())
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield importlib.import_module("sprite_helpers"), importlib.import_module("render_assets")
+    for name in ("sprite_helpers", "render_assets"):
+        sys.modules.pop(name, None)
+
+
+def test_imported_helper_constants_change_the_fingerprint(render_modules, monkeypatch):
+    helpers, render = render_modules
+    bike = asset_manifest.function_fingerprint(render.render_bike)
+    wheel = asset_manifest.function_fingerprint(render.render_wheel)
+    assert asset_manifest.function_fingerprint(render.render_bike) == bike
+
+    monkeypatch.setattr(helpers, "SUPERSAMPLE", 3)
+    assert asset_manifest.function_fingerprint(render.render_bike) != bike
+    assert asset_manifest.function_fingerprint(render.render_wheel) != wheel
+
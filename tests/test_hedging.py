@@ -0,0 +1,112 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import together_async
+import together_client
+from mock_together_server import GENERATIONS_PATH, MockConfig, start_server
+
+JOBS = 16
+CONCURRENCY = 2
+PAYLOAD = {"model": "mock", "prompt": "bike", "width": 64, "height": 64, "steps": 1, "n": 1}
+
+
+@pytest.fixture
+def api_url():
+    server = start_server(MockConfig(latency="fixed:0.3"))
+    yield f"http://127.0.0.1:{server.server_port}{GENERATIONS_PATH}"
+    server.shutdown()
+
+
+def test_queued_requests_are_not_hedged(api_url):
+    client = together_client.TogetherClient(workers=CONCURRENCY, rate=100)
+    policy = together_client.HedgePolicy(budget=1.0)
+
+    def request(_):
+        return client.post_hedged(api_url, lambda response, race: response.content, policy, json=PAYLOAD)
+
+    # Twice as many callers as slots, like generate_batch, so most requests queue
+    with ThreadPoolExecutor(2 * CONCURRENCY) as pool:
+        list(pool.map(request, range(JOBS)))
+    client.close()
+    assert client.stats.requests == JOBS
+    assert client.stats.hedges == 0
+
+
+def test_queued_async_requests_are_not_hedged(api_url):
+    policy = together_client.HedgePolicy(budget=1.0)
+
+    async def run():
+        async with together_async.AsyncTogetherClient(CONCURRENCY, rate=100) as client:
+            async def consume(response, race):
+                return await response.read()
+            # Enough history for the policy to start timing requests
+            for _ in range(together_client.HEDGE_MIN_SAMPLES):
+                await client.post_hedged(api_url, consume, policy, json=PAYLOAD)
+            await asyncio.gather(*(client.post_hedged(api_url, consume, policy, json=PAYLOAD)
+                                   for _ in range(JOBS)))
+            return client.stats
+
+    stats = asyncio.run(run())
+    assert stats.requests == together_client.HEDGE_MIN_SAMPLES + JOBS
+    assert stats.hedges == 0
+
+
+class ScriptedHandler(BaseHTTPRequestHandler):
+    """Fast 200s for the warm-up, a slow 200 for the primary, 503s after that"""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        with self.server.lock:
+            index = self.server.requests
+            self.server.requests += 1
+        if index < together_client.HEDGE_MIN_SAMPLES:
+            status = 200
+        elif index == together_client.HEDGE_MIN_SAMPLES:
+            time.sleep(0.3)
+            status = 200
+        else:
+            # The hedge fails only after the primary has won
+            time.sleep(0.6)
+            status = 503
+        self.send_response(status)
+        self.send_header("Content-Length", "2")
+        self.send_header("Retry-After", "0")
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+
+def test_losing_hedge_does_not_retry():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ScriptedHandler)
+    server.lock, server.requests = threading.Lock(), 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/"
+    client = together_client.TogetherClient(workers=2, rate=100)
+    policy = together_client.HedgePolicy(budget=1.0)
+
+    def consume(response, race):
+        body = response.content
+        race.claim()
+        return body
+
+    try:
+        for _ in range(together_client.HEDGE_MIN_SAMPLES):
+            client.post_hedged(url, consume, policy)
+        assert client.post_hedged(url, consume, policy) == b"{}"
+        assert client.stats.hedges == 1
+        # Let the hedge's 503 arrive and any retry go out
+        time.sleep(1.0)
+    finally:
+        server.shutdown()
+        client.close()
+    assert server.requests == together_client.HEDGE_MIN_SAMPLES + 2
+    assert client.stats.requests == together_client.HEDGE_MIN_SAMPLES + 2
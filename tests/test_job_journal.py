@@ -0,0 +1,33 @@
+import pytest
+
+import job_journal
+
+
+def test_status_command_does_not_rewrite_an_open_journal(tmp_path, capsys):
+    path = tmp_path / "journal.jsonl"
+    writer = job_journal.JobJournal(path)
+    writer.record("a", "queued", filename="bike-1.jpg")
+    writer.record("a", "in-flight", filename="bike-1.jpg")
+    inode = path.stat().st_ino
+
+    assert job_journal.main(["--path", str(path)]) == 0
+    assert "1 in-flight" in capsys.readouterr().out
+    writer.record("a", "done", filename="bike-1.jpg")
+    writer.close()
+
+    assert path.stat().st_ino == inode
+    assert job_journal.JobJournal(path, read_only=True).state("a") == "done"
+
+
+def test_second_writer_is_refused_until_the_first_closes(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    writer = job_journal.JobJournal(path)
+    writer.record("a", "done", filename="bike-1.jpg")
+
+    with pytest.raises(job_journal.JournalLocked):
+        job_journal.JobJournal(path)
+    writer.close()
+
+    second = job_journal.JobJournal(path)
+    assert second.state("a") == "done"
+    second.close()
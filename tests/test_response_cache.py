@@ -0,0 +1,71 @@
+import response_cache
+
+PAYLOAD = {"model": "mock", "prompt": "bike", "width": 64, "height": 64, "steps": 1,
+           "response_format": "b64_json"}
+
+
+def test_single_image_entry_is_not_reused_for_variants(tmp_path):
+    cache = response_cache.ResponseCache(tmp_path / "cache")
+    image = tmp_path / "bike-1.jpg"
+    image.write_bytes(b"single")
+    cache.put(response_cache.cache_key({**PAYLOAD, "n": 1}), image, filename=image.name)
+
+    assert cache.get(response_cache.cache_key({**PAYLOAD, "n": 1})) is not None
+    assert cache.get(response_cache.cache_key({**PAYLOAD, "n": 3})) is None
+    assert not cache.materialize(response_cache.cache_key({**PAYLOAD, "n": 3}), tmp_path / "out.jpg")
+
+
+def test_single_image_key_matches_requests_without_n():
+    assert response_cache.cache_key({**PAYLOAD, "n": 1}) == response_cache.cache_key(PAYLOAD)
+
+
+def test_outputs_do_not_share_the_cached_object(tmp_path):
+    cache = response_cache.ResponseCache(tmp_path / "cache")
+    image = tmp_path / "bike-1.jpg"
+    image.write_bytes(b"from the api")
+    key = response_cache.cache_key(PAYLOAD)
+    cache.put(key, image, filename=image.name)
+
+    # Writers that rewrite the output in place must not reach the cache
+    with open(image, "wb") as f:
+        f.write(b"post-processed")
+    restored = tmp_path / "restored.jpg"
+    assert cache.materialize(key, restored)
+    assert restored.read_bytes() == b"from the api"
+    assert restored.stat().st_ino != cache.get(key).stat().st_ino
+
+
+def test_changed_object_is_not_served(tmp_path):
+    cache = response_cache.ResponseCache(tmp_path / "cache")
+    image = tmp_path / "bike-1.jpg"
+    image.write_bytes(b"from the api")
+    key = response_cache.cache_key(PAYLOAD)
+    cache.put(key, image, filename=image.name)
+    obj = cache.get(key)
+    obj.chmod(0o644)
+    obj.write_bytes(b"truncated")
+
+    assert cache.get(key) is None
+    assert key not in cache.index
+    assert not obj.exists()
+
+
+def test_latest_only_matches_entries_made_like_the_request(tmp_path):
+    cache = response_cache.ResponseCache(tmp_path / "cache")
+    image = tmp_path / "bike-1.jpg"
+    final = {**PAYLOAD, "steps": 50, "width": 1200, "height": 900}
+    preview = {**PAYLOAD, "steps": 4, "width": 512, "height": 384}
+    image.write_bytes(b"final")
+    cache.put(response_cache.cache_key(final), image, filename=image.name,
+              model=final["model"], steps=50, width=1200, height=900, preview=False)
+    image.write_bytes(b"untagged")
+    cache.put(response_cache.cache_key({**final, "seed": 1}), image, filename=image.name,
+              model=final["model"], width=1200, height=900)
+    image.write_bytes(b"preview")
+    cache.put(response_cache.cache_key(preview), image, filename=image.name,
+              model=preview["model"], steps=4, width=512, height=384, preview=True)
+
+    match = {field: final[field] for field in ("model", "steps", "width", "height")}
+    assert cache.latest(image.name, **match) == response_cache.cache_key(final)
+    assert cache.latest(image.name) == response_cache.cache_key(preview)
+    assert cache.latest("bike-2.jpg", **match) is None
@@ -0,0 +1,99 @@
+import asyncio
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import aiohttp
+import pytest
+import requests
+
+import together_async
+import together_client
+
+
+class AcceptedHandler(BaseHTTPRequestHandler):
+    """Accepts every job, then either cuts the body off or never answers in time"""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        with self.server.lock:
+            self.server.requests += 1
+        if self.path == "/slow":
+            time.sleep(1.0)
+        self.send_response(200)
+        self.send_header("Content-Length", "1000")
+        self.end_headers()
+        self.wfile.write(b"{" * 10)
+        self.close_connection = True
+
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.setattr(together_client, "backoff_delay", lambda attempt: 0.0)
+    monkeypatch.setattr(together_async, "backoff_delay", lambda attempt: 0.0)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), AcceptedHandler)
+    server.daemon_threads = True
+    server.lock, server.requests = threading.Lock(), 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+
+
+def closed_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.mark.parametrize("path", ["/cut", "/slow"])
+def test_accepted_requests_are_not_retried(server, path):
+    client = together_client.TogetherClient(workers=1, rate=100, timeout=(1, 0.3))
+    with pytest.raises(requests.RequestException):
+        client.post(f"http://127.0.0.1:{server.server_port}{path}", lambda response: response.content)
+    client.close()
+    assert server.requests == 1
+    assert client.stats.retries == 0
+
+
+def test_refused_connections_are_retried(monkeypatch):
+    monkeypatch.setattr(together_client, "backoff_delay", lambda attempt: 0.0)
+    client = together_client.TogetherClient(workers=1, rate=100, retries=2)
+    with pytest.raises(requests.ConnectionError):
+        client.post(f"http://127.0.0.1:{closed_port()}/", lambda response: response.content)
+    client.close()
+    assert client.stats.requests == 3
+
+
+@pytest.mark.parametrize("path", ["/cut", "/slow"])
+def test_async_accepted_requests_are_not_retried(server, path):
+    async def run():
+        async with together_async.AsyncTogetherClient(1, rate=100, timeout=(1, 0.3)) as client:
+            async def consume(response):
+                return await response.read()
+            with pytest.raises((aiohttp.ClientError, asyncio.TimeoutError)):
+                await client.post(f"http://127.0.0.1:{server.server_port}{path}", consume)
+            return client.stats
+
+    stats = asyncio.run(run())
+    assert server.requests == 1
+    assert stats.retries == 0
+
+
+def test_async_refused_connections_are_retried(monkeypatch):
+    monkeypatch.setattr(together_async, "backoff_delay", lambda attempt: 0.0)
+
+    async def run():
+        async with together_async.AsyncTogetherClient(1, rate=100, retries=2) as client:
+            async def consume(response):
+                return await response.read()
+            with pytest.raises(aiohttp.ClientConnectionError):
+                await client.post(f"http://127.0.0.1:{closed_port()}/", consume)
+            return client.stats
+
+    assert asyncio.run(run()).requests == 3
@@ -0,0 +1,26 @@
+import asyncio
+
+import together_async
+from mock_together_server import GENERATIONS_PATH, MockConfig, start_server
+
+PAYLOAD = {"model": "mock", "prompt": "bike", "width": 64, "height": 64, "steps": 1, "n": 1}
+
+
+def test_async_client_backs_off_on_429():
+    server = start_server(MockConfig(latency="fixed:0.1", max_concurrent=2, retry_after=0))
+    url = f"http://127.0.0.1:{server.server_port}{GENERATIONS_PATH}"
+
+    async def run():
+        async with together_async.AsyncTogetherClient(6, rate=100) as client:
+            async def consume(response):
+                return await response.read()
+            await asyncio.gather(*(client.post(url, consume, json=PAYLOAD) for _ in range(12)))
+            return client
+
+    try:
+        client = asyncio.run(run())
+    finally:
+        server.shutdown()
+    assert client.limiter.throttled > 0
+    assert client.limiter.in_flight == 0
+    assert client.limiter.limit < 6
@@ -0,0 +1,267 @@
+"""
+GET A BIKE - ASYNC TOGETHER API CLIENT
+asyncio job stream for queueing hundreds of image prompts in one run
+
+Threads top out around a few dozen requests; one event loop can keep any
+number of jobs queued while an adaptive limiter decides how many are in
+flight, backing off on 429/503 like the threaded client. Jobs wait in one
+priority queue, ordered by where app/page.js shows their image, so the
+hero starts first however many inventory bikes are queued behind it. Each
+job's result goes to a completion callback the moment it finishes.
+
+Requires aiohttp; retry, backoff and rate settings match together_client.
+"""
+
+import asyncio
+import itertools
+import time
+
+import aiohttp
+
+from together_client import (
+    CONNECT_TIMEOUT,
+    DEFAULT_RATE,
+    MAX_RETRIES,
+    READ_TIMEOUT,
+    RETRY_STATUSES,
+    THROTTLE_STATUSES,
+    AdaptiveLimiter,
+    HedgeCancelled,
+    HedgeRace,
+    RequestStats,
+    backoff_delay,
+    retry_after,
+)
+
+
+class AsyncTokenBucket:
+    """Token bucket for coroutines; waiters are served in arrival order"""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        async with self.lock:
+            self._refill()
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1
+
+
+class AsyncAdaptiveLimiter(AdaptiveLimiter):
+    """together_client.AdaptiveLimiter for coroutines.
+
+    acquire() is awaited; release() stays synchronous so a cancelled
+    request still frees its slot from a finally block.
+    """
+
+    def __init__(self, limit, max_limit=None, min_limit=1):
+        super().__init__(limit, max_limit, min_limit)
+        self.changed = asyncio.Event()
+
+    async def acquire(self):
+        while self.in_flight >= self.limit:
+            self.changed.clear()
+            await self.changed.wait()
+        self.in_flight += 1
+        return time.monotonic()
+
+    def release(self, ticket, throttled=False):
+        self._record(ticket, throttled)
+        self.changed.set()
+
+
+class AsyncTogetherClient:
+    """aiohttp session with an adaptive in-flight limit, rate limit and retries.
+
+    Use as `async with AsyncTogetherClient(...) as client:`. Retries the
+    same failures as together_client.TogetherClient (never a read timeout
+    or a cut-off body), sleeping outside the limiter, and halves the
+    in-flight limit on 429/503 the same way.
+    """
+
+    def __init__(self, concurrency, rate=DEFAULT_RATE, retries=MAX_RETRIES,
+                 timeout=(CONNECT_TIMEOUT, READ_TIMEOUT)):
+        self.concurrency = concurrency
+        self.limiter = AsyncAdaptiveLimiter(concurrency)
+        self.bucket = AsyncTokenBucket(rate, capacity=concurrency)
+        self.retries = retries
+        self.timeout = aiohttp.ClientTimeout(connect=timeout[0], sock_read=timeout[1])
+        self.stats = RequestStats()
+        self.session = None
+
+    async def __aenter__(self):
+        connector = aiohttp.TCPConnector(limit=self.concurrency)
+        self.session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.session.close()
+
+    async def post(self, url, consume, on_send=None, **kwargs):
+        """POST and return `await consume(response)` for the first successful attempt.
+
+        consume runs inside the request slot, so it can stream the body; a
+        connection lost mid-body is not retried. `on_send()` is called as
+        each attempt goes out, once it holds its slot and token.
+        """
+        for attempt in range(self.retries + 1):
+            self.stats.count("requests")
+            delay = None
+            received = False
+            try:
+                ticket = await self.limiter.acquire()
+                throttled = False
+                try:
+                    await self.bucket.acquire()
+                    if on_send is not None:
+                        on_send()
+                    started = time.monotonic()
+                    async with self.session.post(url, **kwargs) as response:
+                        received = True
+                        if response.status < 400:
+                            result = await consume(response)
+                            self.stats.record_latency(time.monotonic() - started)
+                            return result
+                        throttled = response.status in THROTTLE_STATUSES
+                        delay = retry_after(response)
+                        error = aiohttp.ClientResponseError(
+                            response.request_info, response.history, status=response.status,
+                            message=response.reason or "", headers=response.headers,
+                        )
+                finally:
+                    self.limiter.release(ticket, throttled)
+                if error.status not in RETRY_STATUSES:
+                    self.stats.count("failures")
+                    raise error
+            except (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError) as e:
+                # Once a response has started, or while waiting for one, the
+                # job is already accepted and paid for
+                if received or (isinstance(e, asyncio.TimeoutError)
+                                and not isinstance(e, aiohttp.ConnectionTimeoutError)):
+                    self.stats.count("failures")
+                    raise
+                error = e
+            if attempt == self.retries:
+                self.stats.count("failures")
+                raise error
+            self.stats.count("retries")
+            await asyncio.sleep(backoff_delay(attempt) if delay is None else delay)
+
+    async def post_hedged(self, url, consume, policy, **kwargs):
+        """post() with a duplicate sent if the first attempt is slow (see HedgePolicy).
+
+        `await consume(response, race)` gets a together_client.HedgeRace.
+        The hedge delay counts from when the first attempt is sent, not
+        while it waits for the limiter or a token. The first attempt to
+        succeed wins and the other is cancelled, which aborts its
+        connection. Raises only if every attempt failed.
+        """
+        race = HedgeRace()
+        sent = asyncio.Event()
+        start = None
+
+        def on_send():
+            nonlocal start
+            start = time.monotonic()
+            sent.set()
+
+        delay = policy.start(self.stats)
+        primary = asyncio.ensure_future(
+            self.post(url, lambda response: consume(response, race), on_send=on_send, **kwargs))
+        attempts = {primary}
+        watch = asyncio.ensure_future(sent.wait())
+        hedged, error = delay is None, None
+        try:
+            while attempts:
+                waiting, timeout = set(attempts), None
+                if not hedged:
+                    if start is None:
+                        waiting.add(watch)
+                    else:
+                        timeout = max(0.0, start + delay - time.monotonic())
+                done, _ = await asyncio.wait(waiting, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                done.discard(watch)
+                attempts -= done
+                if not done:
+                    # A retry of the primary restarts the clock, so check it again
+                    if start is not None and time.monotonic() >= start + delay and not hedged:
+                        hedged = True
+                        if policy.spend(self.stats):
+                            attempts.add(asyncio.ensure_future(
+                                self.post(url, lambda response: consume(response, race), **kwargs)))
+                    continue
+                for attempt in done:
+                    if attempt.exception() is None:
+                        if attempt is not primary:
+                            policy.won(self.stats, time.monotonic() - start)
+                        return attempt.result()
+                    if not isinstance(attempt.exception(), HedgeCancelled):
+                        error = attempt.exception()
+            raise error
+        finally:
+            watch.cancel()
+            for attempt in attempts:
+                attempt.cancel()
+
+
+def priority_queue(jobs_by_category, priority):
+    """One asyncio.Queue of every (category, job), in ascending priority(job) order.
+
+    Pass it to run_stream() as {name: queue}.
+    """
+    items = sorted(((category, job) for category, jobs in jobs_by_category.items() for job in jobs),
+                   key=lambda item: priority(item[1]))
+    queue = asyncio.Queue()
+    for item in items:
+        queue.put_nowait(item)
+    return queue
+
+
+async def run_stream(queues, handle, workers, on_complete=None):
+    """Drain the queues through `workers` tasks, taking jobs in queue order.
+
+    `queues` is {name: asyncio.Queue of (category, job)}, normally the one
+    queue from priority_queue(); with several, each free worker takes the
+    next job of the next non-empty queue in turn. Each job is passed to
+    `await handle(job)`. As soon as it finishes, `on_complete(category, job,
+    result, error)` is called, with `error` set instead of `result` if
+    handle raised. Returns the number of jobs run. Queues are read until
+    empty, so fill them before starting.
+    """
+    order = itertools.cycle(list(queues))
+    completed = 0
+
+    def next_item():
+        for _ in range(len(queues)):
+            try:
+                return queues[next(order)].get_nowait()
+            except asyncio.QueueEmpty:
+                continue
+        return None
+
+    async def worker():
+        nonlocal completed
+        while (item := next_item()) is not None:
+            category, job = item
+            result = error = None
+            try:
+                result = await handle(job)
+            except Exception as e:
+                error = e
+            completed += 1
+            if on_complete:
+                on_complete(category, job, result, error)
+
+    await asyncio.gather(*(worker() for _ in range(max(1, workers))))
+    return completed
@@ -0,0 +1,444 @@
+"""
+GET A BIKE - TOGETHER API CLIENT
+Rate limiting, adaptive concurrency and retries for image generation requests
+
+A full regeneration is ~22 FLUX.1-pro calls of 10-60 s each. Sending them
+one at a time makes the build as slow as the sum of their latencies; this
+module lets several run at once while staying inside the API's limits:
+
+- TokenBucket spaces request starts to a steady rate with a small burst.
+- AdaptiveLimiter caps requests in flight, halving the cap when the API
+  answers 429/503 and growing it by one after a full window of successes
+  (together_async has the same limiter for coroutines).
+- TogetherClient sends every request over one keep-alive connection pool
+  and retries transient failures with jittered exponential backoff,
+  honoring Retry-After; a request the API may already have accepted (and
+  billed) is never sent twice.
+- HedgePolicy (optional) sends a duplicate of a request that has run past
+  a percentile of recent latencies; the first to finish wins, within a
+  cap on how many extra requests a batch may send.
+
+generate-luxury-images.py sends its POSTs through `TogetherClient.post()`.
+"""
+
+import email.utils
+import math
+import queue
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Statuses that mean "slow down" rather than "this request is bad"
+THROTTLE_STATUSES = (429, 503)
+# Statuses worth another attempt; the request had no lasting effect
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+DEFAULT_WORKERS = 4
+# Request starts per second; the old serial loop slept 0.5 s between calls
+DEFAULT_RATE = 2.0
+
+MAX_RETRIES = 4
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 60.0
+# Seconds to establish a connection / to wait for the generated image
+CONNECT_TIMEOUT = 10
+READ_TIMEOUT = 120
+
+# Hedging: latency percentile that triggers a duplicate, extra requests
+# allowed per request in the batch, and the successful requests needed
+# before latencies are trusted
+HEDGE_PERCENTILE = 95
+HEDGE_BUDGET = 0.1
+HEDGE_MIN_SAMPLES = 5
+# A request is hedged only once it runs this much past the percentile;
+# jitter of a few percent around a steady latency is not a straggler
+HEDGE_SLACK = 1.2
+# Only this many of the latest latencies set the hedge delay
+HEDGE_WINDOW = 50
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, up to `capacity` banked"""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available, then take it"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class AdaptiveLimiter:
+    """Concurrency cap with additive increase / multiplicative decrease.
+
+    Only throttles from requests started after the last decrease count, so
+    a burst of 429s from requests already in flight halves the cap once.
+    """
+
+    def __init__(self, limit, max_limit=None, min_limit=1):
+        self.max_limit = max_limit or limit
+        self.min_limit = min_limit
+        self.limit = max(min_limit, min(limit, self.max_limit))
+        self.in_flight = 0
+        self.successes = 0
+        self.last_decrease = 0.0
+        self.throttled = 0
+        self.cond = threading.Condition()
+
+    def acquire(self):
+        """Wait for a free slot; returns a ticket to pass to release()"""
+        with self.cond:
+            while self.in_flight >= self.limit:
+                self.cond.wait()
+            self.in_flight += 1
+            return time.monotonic()
+
+    def release(self, ticket, throttled=False):
+        with self.cond:
+            self._record(ticket, throttled)
+            self.cond.notify_all()
+
+    def _record(self, ticket, throttled):
+        """Free a slot and apply the increase/decrease rule"""
+        self.in_flight -= 1
+        if throttled:
+            self.throttled += 1
+            self.successes = 0
+            if ticket >= self.last_decrease:
+                self.limit = max(self.min_limit, self.limit // 2)
+                self.last_decrease = time.monotonic()
+        else:
+            self.successes += 1
+            if self.successes >= self.limit and self.limit < self.max_limit:
+                self.limit += 1
+                self.successes = 0
+
+
+class Throttle:
+    """Token bucket plus adaptive limiter around each API request"""
+
+    def __init__(self, workers=DEFAULT_WORKERS, rate=DEFAULT_RATE):
+        self.bucket = TokenBucket(rate, capacity=workers)
+        self.limiter = AdaptiveLimiter(workers)
+
+    @contextmanager
+    def request(self):
+        """Hold a concurrency slot and a rate token for one request.
+
+        The body should call raise_for_status(); an HTTPError with a 429 or
+        503 status is what tells the limiter to back off.
+        """
+        ticket = self.limiter.acquire()
+        throttled = False
+        try:
+            self.bucket.acquire()
+            yield
+        except requests.HTTPError as e:
+            throttled = e.response is not None and e.response.status_code in THROTTLE_STATUSES
+            raise
+        finally:
+            self.limiter.release(ticket, throttled)
+
+
+def backoff_delay(attempt, base=BACKOFF_BASE, cap=BACKOFF_CAP):
+    """Full-jitter exponential backoff for the given 0-based retry attempt"""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def retry_after(response, cap=BACKOFF_CAP):
+    """Seconds requested by a Retry-After header (delta or HTTP date), or None"""
+    value = response.headers.get("Retry-After") if response is not None else None
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            when = email.utils.parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        seconds = when.timestamp() - time.time()
+    return min(cap, max(0.0, seconds))
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile (0-100) of a list of numbers, or None if empty"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class RequestStats:
+    """Thread-safe request counters for the end-of-run summary.
+
+    `latencies` holds the seconds each successful attempt took, from
+    sending the request to the body being consumed; queueing and backoff
+    are excluded.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+        self.latencies = []
+        # Duplicates sent by a HedgePolicy, how many finished first, and
+        # the estimated seconds those wins saved
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.hedge_saved = 0.0
+
+    def count(self, field):
+        with self.lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    def record_latency(self, seconds):
+        with self.lock:
+            self.latencies.append(seconds)
+
+    def percentile(self, pct, recent=None):
+        """Percentile of all latencies, or of the `recent` latest ones"""
+        with self.lock:
+            return percentile(self.latencies[-recent:] if recent else self.latencies, pct)
+
+
+class HedgeCancelled(Exception):
+    """Raised inside a losing attempt's consume() once another attempt has won"""
+
+
+class HedgeRace:
+    """Shared by the attempts of one hedged request so only one writes its result.
+
+    consume(response, race) should call race.check() while reading and
+    race.claim() just before making its result visible (e.g. renaming a
+    file into place); both raise HedgeCancelled for the loser.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.winner = None
+
+    def check(self):
+        if self.winner is not None:
+            raise HedgeCancelled()
+
+    def claim(self):
+        with self.lock:
+            if self.winner is not None:
+                raise HedgeCancelled()
+            self.winner = threading.get_ident()
+
+    def close(self):
+        """Decide the race once a result is returned, if claim() didn't"""
+        with self.lock:
+            if self.winner is None:
+                self.winner = threading.get_ident()
+
+
+class HedgePolicy:
+    """When to send a duplicate of a slow request; share one across a batch.
+
+    A request still running after the `pct` percentile of the client's
+    recent latencies, times `slack`, gets one duplicate, as long as the
+    batch has sent fewer than `budget` duplicates per request so far.
+    Until `min_samples` requests have succeeded there is no history and
+    nothing is hedged.
+    """
+
+    def __init__(self, pct=HEDGE_PERCENTILE, budget=HEDGE_BUDGET, min_samples=HEDGE_MIN_SAMPLES,
+                 slack=HEDGE_SLACK):
+        self.pct = pct
+        self.budget = budget
+        self.min_samples = min_samples
+        self.slack = slack
+        self.lock = threading.Lock()
+        self.posts = 0
+
+    def start(self, stats):
+        """Count a new request; returns the seconds to wait before hedging it, or None"""
+        with self.lock:
+            self.posts += 1
+        if len(stats.latencies) < self.min_samples:
+            return None
+        return stats.percentile(self.pct, HEDGE_WINDOW) * self.slack
+
+    def spend(self, stats):
+        """Take one duplicate from the budget; False once it is used up"""
+        with self.lock:
+            if stats.hedges + 1 > self.budget * self.posts:
+                return False
+            stats.count("hedges")
+            return True
+
+    def won(self, stats, elapsed):
+        """Record a duplicate that beat its original, `elapsed` seconds after the original started.
+
+        The time saved is estimated from recent requests that took longer
+        than `elapsed`: their mean is what the original could still have
+        taken. With no such request on record, nothing is claimed.
+        """
+        with stats.lock:
+            slower = [seconds for seconds in stats.latencies[-HEDGE_WINDOW:] if seconds > elapsed]
+        stats.count("hedge_wins")
+        if slower:
+            with stats.lock:
+                stats.hedge_saved += sum(slower) / len(slower) - elapsed
+
+
+class TogetherClient:
+    """Pooled, throttled, retrying HTTP client shared by a batch of requests.
+
+    Connection errors, connect timeouts and RETRY_STATUSES are retried up
+    to `retries` times. A read timeout or a body cut off midway is not:
+    the API has accepted the job by then, and generation is billed per
+    request, so another attempt would pay for it again. Each attempt takes
+    its own throttle slot; the backoff sleep happens outside it so waiting
+    requests don't block others.
+    """
+
+    def __init__(self, workers=DEFAULT_WORKERS, rate=DEFAULT_RATE, retries=MAX_RETRIES,
+                 timeout=(CONNECT_TIMEOUT, READ_TIMEOUT)):
+        self.throttle = Throttle(workers, rate)
+        self.retries = retries
+        self.timeout = timeout
+        self.stats = RequestStats()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, workers), max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def post(self, url, consume=None, on_send=None, check=None, **kwargs):
+        """POST with retries; returns a successful response or raises the last error.
+
+        With `consume`, the body is streamed through consume(response), and
+        its return value is returned instead of the response. `on_send()` is
+        called as each attempt goes out, once it holds its throttle slot.
+        `check()` runs before every send and every backoff sleep and may
+        raise to abandon the request, e.g. HedgeRace.check for a loser.
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        if consume is not None:
+            kwargs["stream"] = True
+        for attempt in range(self.retries + 1):
+            response = None
+            try:
+                if check is not None:
+                    check()
+                self.stats.count("requests")
+                with self.throttle.request():
+                    if check is not None:
+                        check()
+                    if on_send is not None:
+                        on_send()
+                    started = time.monotonic()
+                    response = self.session.post(url, **kwargs)
+                    response.raise_for_status()
+                    if consume is not None:
+                        with response:
+                            result = consume(response)
+                        self.stats.record_latency(time.monotonic() - started)
+                        return result
+                self.stats.record_latency(time.monotonic() - started)
+                return response
+            except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError) as e:
+                # Once a response has started, or while waiting for one, the
+                # job is already accepted and paid for
+                if response is not None or (isinstance(e, requests.Timeout)
+                                            and not isinstance(e, requests.ConnectTimeout)):
+                    self.stats.count("failures")
+                    raise
+                error = e
+            except requests.HTTPError as e:
+                if response.status_code not in RETRY_STATUSES:
+                    self.stats.count("failures")
+                    raise
+                error = e
+                # Read the short error body of a streamed response so its
+                # connection goes back to the pool before the backoff
+                try:
+                    response.content
+                except requests.RequestException:
+                    pass
+                response.close()
+            if attempt == self.retries:
+                self.stats.count("failures")
+                raise error
+            if check is not None:
+                check()
+            delay = retry_after(response)
+            self.stats.count("retries")
+            time.sleep(backoff_delay(attempt) if delay is None else delay)
+
+    def post_hedged(self, url, consume, policy, **kwargs):
+        """post() with a duplicate sent if the first attempt is slow (see HedgePolicy).
+
+        consume(response, race) gets a HedgeRace. Each attempt runs post()
+        with its own retries on a helper thread; this returns the first
+        result and tells the other attempt to stop. The hedge delay counts
+        from when the first attempt is sent, not while it waits for a
+        throttle slot. A loser still waiting for its response holds its
+        concurrency slot until the response arrives; then it drops the
+        body, or gives up instead of retrying an error, so it sends no
+        further requests. Raises only if every attempt failed.
+        """
+        race = HedgeRace()
+        results = queue.Queue()
+
+        def attempt(kind):
+            # The primary reports each send so the hedge clock skips queueing
+            on_send = (lambda: results.put(("sent", time.monotonic(), None))) if kind == "primary" else None
+            try:
+                result = self.post(url, lambda response: consume(response, race), on_send=on_send,
+                                   check=race.check, **kwargs)
+                results.put((kind, result, None))
+            except Exception as e:
+                results.put((kind, None, e))
+
+        delay = policy.start(self.stats)
+        threading.Thread(target=attempt, args=("primary",), daemon=True).start()
+        start, running, hedged, error = None, 1, delay is None, None
+        while running:
+            wait = None if hedged or start is None else max(0.0, start + delay - time.monotonic())
+            try:
+                kind, result, attempt_error = results.get(timeout=wait)
+            except queue.Empty:
+                hedged = True
+                if policy.spend(self.stats):
+                    threading.Thread(target=attempt, args=("hedge",), daemon=True).start()
+                    running += 1
+                continue
+            if kind == "sent":
+                start = result
+                continue
+            running -= 1
+            if attempt_error is None:
+                # Also stops a loser whose consume() never claimed the race
+                race.close()
+                if kind == "hedge":
+                    policy.won(self.stats, time.monotonic() - start)
+                return result
+            if not isinstance(attempt_error, HedgeCancelled):
+                error = attempt_error
+        raise error
+
+    def close(self):
+        self.session.close()